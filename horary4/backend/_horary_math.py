@@ -15,16 +15,174 @@ Created for computational functions used in horary judgment
 
 import math
 import datetime
-from typing import Tuple, Optional, Dict, Any
+from concurrent.futures import Future
+from typing import Callable, Tuple, Optional, Dict, Any, List
 import swisseph as swe
 
 
+# Coarse search step (days) per planet when bracketing stations. No planet
+# stations twice within its step, and the step shrinks while the planet is slow.
+STATION_SEARCH_STEPS = {
+    swe.MERCURY: 4.0,
+    swe.VENUS: 8.0,
+    swe.MARS: 8.0,
+    swe.JUPITER: 16.0,
+    swe.SATURN: 16.0
+}
+
+# Typical absolute speed (degrees/day) used to scale the search step
+TYPICAL_SPEEDS = {
+    swe.MERCURY: 1.2,
+    swe.VENUS: 1.0,
+    swe.MARS: 0.5,
+    swe.JUPITER: 0.1,
+    swe.SATURN: 0.05
+}
+
+# Station times are refined to about 1.5 minutes
+STATION_TIME_TOLERANCE = 0.001
+
+# The luminaries never station
+NON_STATIONING_PLANETS = (swe.SUN, swe.MOON)
+
+
+def find_root_brent(func: Callable[[float], float], a: float, b: float,
+                    fa: Optional[float] = None, fb: Optional[float] = None,
+                    tolerance: float = 1e-6, max_iterations: int = 100) -> float:
+    """
+    Find a root of func in [a, b] with Brent's method.
+    
+    Combines bisection with secant and inverse quadratic interpolation, so it
+    never does worse than bisection but usually converges in a handful of
+    evaluations.
+    
+    Args:
+        func: Continuous function with a sign change in [a, b]
+        a, b: Bracket
+        fa, fb: func(a) and func(b) if already known
+        tolerance: Absolute tolerance on the root
+        max_iterations: Safety limit
+    
+    Returns:
+        Root location
+    
+    Raises:
+        ValueError: If func(a) and func(b) have the same sign
+    """
+    fa = func(a) if fa is None else fa
+    fb = func(b) if fb is None else fb
+    
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if (fa > 0) == (fb > 0):
+        raise ValueError("Root is not bracketed")
+    
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    
+    c, fc = a, fa
+    d = c
+    bisected = True
+    
+    for _ in range(max_iterations):
+        if fb == 0 or abs(b - a) <= tolerance:
+            return b
+        
+        if fa != fc and fb != fc:
+            # Inverse quadratic interpolation
+            s = (a * fb * fc / ((fa - fb) * (fa - fc)) +
+                 b * fa * fc / ((fb - fa) * (fb - fc)) +
+                 c * fa * fb / ((fc - fa) * (fc - fb)))
+        else:
+            # Secant step
+            s = b - fb * (b - a) / (fb - fa)
+        
+        bisect_needed = (
+            not ((3 * a + b) / 4 < s < b or b < s < (3 * a + b) / 4) or
+            (bisected and abs(s - b) >= abs(b - c) / 2) or
+            (not bisected and abs(s - b) >= abs(c - d) / 2) or
+            (bisected and abs(b - c) < tolerance) or
+            (not bisected and abs(c - d) < tolerance)
+        )
+        if bisect_needed:
+            s = (a + b) / 2
+        bisected = bisect_needed
+        
+        fs = func(s)
+        d, c, fc = c, b, fb
+        
+        if (fa > 0) != (fs > 0):
+            b, fb = s, fs
+        else:
+            a, fa = s, fs
+        
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+    
+    return b
+
+
+def _planet_speed(planet_id: int, jd: float) -> float:
+    """Longitudinal speed in degrees/day"""
+    planet_data, _ = swe.calc_ut(jd, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    return planet_data[3]
+
+
+def find_station_times(planet_id: int, jd_start: float, jd_end: float,
+                       first_only: bool = False) -> List[float]:
+    """
+    Find every station (speed sign change) of a planet in (jd_start, jd_end].
+    
+    Brackets sign changes of the speed with coarse steps that shrink while
+    the planet is slow, then refines each bracket with Brent's method.
+    
+    Args:
+        planet_id: Swiss Ephemeris planet ID
+        jd_start: Start of the search window
+        jd_end: End of the search window
+        first_only: Stop after the first station
+    
+    Returns:
+        Julian Days of the stations in time order
+    """
+    if planet_id in NON_STATIONING_PLANETS:
+        return []
+    
+    base_step = STATION_SEARCH_STEPS.get(planet_id, 8.0)
+    typical_speed = TYPICAL_SPEEDS.get(planet_id, 0.05)
+    speed = lambda jd: _planet_speed(planet_id, jd)
+    
+    stations = []
+    jd_before = jd_start
+    speed_before = speed(jd_before)
+    
+    while jd_before < jd_end:
+        step = base_step * min(1.0, max(0.125, abs(speed_before) / typical_speed))
+        jd_after = min(jd_before + step, jd_end)
+        speed_after = speed(jd_after)
+        
+        if (speed_before > 0 and speed_after <= 0) or (speed_before < 0 and speed_after >= 0):
+            stations.append(find_root_brent(speed, jd_before, jd_after, speed_before, speed_after,
+                                            tolerance=STATION_TIME_TOLERANCE))
+            if first_only:
+                break
+        
+        jd_before, speed_before = jd_after, speed_after
+    
+    return stations
+
+
 def calculate_next_station_time(planet_id: int, jd_start: float, 
                                max_days: int = 365) -> Optional[float]:
     """
     Calculate when a planet will next station (turn retrograde/direct)
     using Swiss Ephemeris.
     
+    Answered by binary search in the precomputed station calendar when it
+    covers the window; otherwise found by bracketing and Brent refinement.
+    
     Args:
         planet_id: Swiss Ephemeris planet ID
         jd_start: Starting Julian Day 
@@ -35,69 +193,18 @@ def calculate_next_station_time(planet_id: int, jd_start: float,
     
     Classical source: Lilly III Chap. XXI - "Of the frustration of Planets"
     """
-    step_size = 0.1  # Check every 0.1 days
+    from horary_events import get_station_calendar
     
-    try:
-        # Get initial speed
-        initial_data, _ = swe.calc_ut(jd_start, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
-        initial_speed = initial_data[3]
-        
-        # Search forward in time
-        current_jd = jd_start + step_size
-        max_jd = jd_start + max_days
-        
-        previous_speed = initial_speed
-        
-        while current_jd < max_jd:
-            try:
-                planet_data, _ = swe.calc_ut(current_jd, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
-                current_speed = planet_data[3]
-                
-                # Check for sign change in speed (station)
-                if (previous_speed > 0 and current_speed < 0) or (previous_speed < 0 and current_speed > 0):
-                    # Found a station, refine the timing
-                    return _refine_station_time(planet_id, current_jd - step_size, current_jd)
-                
-                previous_speed = current_speed
-                current_jd += step_size
-                
-            except Exception:
-                # Skip errors and continue
-                current_jd += step_size
-                continue
+    calendar = get_station_calendar()
+    if calendar is not None and calendar.covers(planet_id, jd_start, jd_start + max_days):
+        return calendar.next_station(planet_id, jd_start, max_days)
     
+    try:
+        stations = find_station_times(planet_id, jd_start, jd_start + max_days, first_only=True)
     except Exception:
-        pass
-    
-    return None
-
-
-def _refine_station_time(planet_id: int, jd_before: float, jd_after: float) -> float:
-    """Refine station time to higher precision using binary search"""
-    tolerance = 0.001  # About 1.5 minutes
+        return None
     
-    while (jd_after - jd_before) > tolerance:
-        jd_mid = (jd_before + jd_after) / 2
-        
-        try:
-            data_before, _ = swe.calc_ut(jd_before, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
-            data_mid, _ = swe.calc_ut(jd_mid, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
-            
-            speed_before = data_before[3]
-            speed_mid = data_mid[3]
-            
-            # Check which side of midpoint the station is on
-            if (speed_before > 0 and speed_mid > 0) or (speed_before < 0 and speed_mid < 0):
-                # Station is after midpoint
-                jd_before = jd_mid
-            else:
-                # Station is before midpoint
-                jd_after = jd_mid
-                
-        except Exception:
-            break
-    
-    return (jd_before + jd_after) / 2
+    return stations[0] if stations else None
 
 
 def calculate_future_longitude(longitude: float, speed: float, days: float, 
@@ -155,19 +262,34 @@ def calculate_sign_boundary_longitude(current_longitude: float, direction: int)
     return next_boundary
 
 
-def days_to_sign_exit(longitude: float, speed: float) -> Optional[float]:
+def days_to_sign_exit(longitude: float, speed: float, planet_id: Optional[int] = None,
+                      jd_ut: Optional[float] = None) -> Optional[float]:
     """
     Calculate days until planet exits current sign based on motion direction.
     
+    With planet_id and jd_ut the answer comes from the precomputed ingress
+    index, which follows the planet's real motion (Moon's varying speed,
+    stations and retrograde re-entries). Otherwise, or outside the index
+    span, the current speed is extrapolated linearly.
+    
     Args:
         longitude: Current longitude in degrees
         speed: Speed in degrees per day (negative for retrograde)
+        planet_id: Swiss Ephemeris planet ID, enables the ingress index
+        jd_ut: Julian Day of the position, enables the ingress index
     
     Returns:
         Days until sign exit, or None if stationary
     
     Classical source: Lilly III Chap. XXV - "Of timing in horary questions"
     """
+    if planet_id is not None and jd_ut is not None:
+        from horary_events import get_ingress_index
+        
+        index = get_ingress_index()
+        if index is not None and index.covers(planet_id, jd_ut):
+            return index.days_to_sign_exit(planet_id, jd_ut)
+    
     if abs(speed) < 0.001:  # Nearly stationary
         return None
     
@@ -332,10 +454,21 @@ class LocationError(Exception):
     pass
 
 
+class LocationNotFoundError(LocationError):
+    """The geocoder answered, but knows no such place (cacheable, unlike service failures)"""
+    pass
+
+
 def safe_geocode(location_string: str, timeout: int = 10) -> Tuple[float, float, str]:
     """
     Geocode location with fail-fast behavior (no silent defaults).
     
+    The offline gazetteer is tried first; Nominatim is only contacted for
+    places it cannot resolve (or when no gazetteer has been built), unless
+    geocoding.nominatim_fallback is disabled. Nominatim answers, including
+    "not found", go through the persistent geocode cache, and lookups are
+    queued to respect the service's rate limit.
+    
     Args:
         location_string: Location to geocode
         timeout: Timeout in seconds
@@ -348,23 +481,114 @@ def safe_geocode(location_string: str, timeout: int = 10) -> Tuple[float, float,
     
     Classical source: Traditional requirement for accurate locality in horary
     """
+    return wait_for_geocode(safe_geocode_async(location_string, timeout), location_string)
+
+
+def safe_geocode_async(location_string: str, timeout: int = 10) -> Future:
+    """
+    Start geocoding a location and return a future of safe_geocode's result.
+    
+    Gazetteer and cache answers come back as completed futures; anything
+    else is queued for Nominatim (identical pending lookups share a future).
+    Pass the future to wait_for_geocode().
+    """
+    from horary_config import cfg
+    from horary_gazetteer import get_gazetteer
+    from horary_geocache import get_geocode_cache, NOT_FOUND
+    from horary_geoqueue import get_geocode_scheduler
+    
+    future = Future()
+    
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        match = gazetteer.lookup(location_string)
+        if match is not None:
+            future.set_result((match.latitude, match.longitude, match.name))
+            return future
+    
+    try:
+        nominatim_fallback = cfg().geocoding.nominatim_fallback
+    except AttributeError:
+        nominatim_fallback = True
+    if not nominatim_fallback:
+        future.set_exception(LocationNotFoundError(
+            f"Location not found: '{location_string}'. Please provide a more specific location."))
+        return future
+    
+    cache = get_geocode_cache()
+    cached = cache.get(location_string) if cache is not None else None
+    if cached == NOT_FOUND:
+        future.set_exception(LocationNotFoundError(
+            f"Location not found: '{location_string}'. Please provide a more specific location."))
+        return future
+    if cached is not None:
+        future.set_result(cached)
+        return future
+    
+    return get_geocode_scheduler().submit(
+        location_string, lambda: _cached_nominatim_geocode(location_string, timeout))
+
+
+def wait_for_geocode(future: Future, location_string: str) -> Tuple[float, float, str]:
+    """Result of safe_geocode_async(), bounded by geocoding.queue_timeout_seconds"""
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from horary_geoqueue import GeocodeQueueFull, queue_timeout
+    
+    try:
+        return future.result(timeout=queue_timeout())
+    except (FutureTimeoutError, GeocodeQueueFull):
+        raise LocationError(f"Geocoding service busy, please retry shortly: '{location_string}'")
+
+
+async def await_geocode(future: Future, location_string: str) -> Tuple[float, float, str]:
+    """wait_for_geocode() for asyncio callers; the event loop stays free while a lookup is queued"""
+    import asyncio
+    from horary_geoqueue import GeocodeQueueFull, queue_timeout
+    
+    try:
+        # Shielded: a caller timing out must not cancel a lookup other callers share
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), queue_timeout())
+    except (asyncio.TimeoutError, GeocodeQueueFull):
+        raise LocationError(f"Geocoding service busy, please retry shortly: '{location_string}'")
+
+
+def _cached_nominatim_geocode(location_string: str, timeout: int) -> Tuple[float, float, str]:
+    """Nominatim lookup whose answer (or "not found") is stored in the geocode cache"""
+    from horary_geocache import get_geocode_cache
+    
+    cache = get_geocode_cache()
+    try:
+        result = _nominatim_geocode(location_string, timeout)
+    except LocationNotFoundError:
+        if cache is not None:
+            cache.put_not_found(location_string)
+        raise
+    if cache is not None:
+        cache.put(location_string, result)
+    return result
+
+
+def _nominatim_geocode(location_string: str, timeout: int) -> Tuple[float, float, str]:
+    """Geocode with the Nominatim web service"""
     try:
-        from geopy.geocoders import Nominatim
         from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+        from horary_services import get_services
         
-        geolocator = Nominatim(user_agent="horary_astrology_precise")
+        geolocator = get_services().geocoder
         
         location = geolocator.geocode(location_string, timeout=timeout)
         
         if location is None:
-            raise LocationError(f"Location not found: '{location_string}'. Please provide a more specific location.")
+            raise LocationNotFoundError(f"Location not found: '{location_string}'. Please provide a more specific location.")
         
         return (location.latitude, location.longitude, location.address)
         
-    except (GeocoderTimedOut, GeocoderUnavailable) as e:
-        raise LocationError(f"Geocoding service unavailable: {str(e)}")
+    except LocationError:
+        raise
     except ImportError:
         raise LocationError("Geocoding library not available. Please install geopy.")
+    except (GeocoderTimedOut, GeocoderUnavailable) as e:
+        raise LocationError(f"Geocoding service unavailable: {str(e)}")
     except Exception as e:
         raise LocationError(f"Geocoding failed for '{location_string}': {str(e)}")
 
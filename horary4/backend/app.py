@@ -20,7 +20,7 @@ Updated with enhanced engine and all new capabilities
 
 
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 
 from flask_cors import CORS
 
@@ -32,17 +32,41 @@ import time
 
 import logging
 
-from datetime import datetime, timezone
+from contextlib import nullcontext
 
-from functools import wraps
+from datetime import datetime, timedelta, timezone
 
-from collections import defaultdict
+from functools import wraps
 
 
 
 # UPDATED IMPORT: Use the new enhanced engine
 
-from horary_engine import HoraryEngine, LocationError, serialize_planet_with_solar
+from horary_engine import (HoraryEngine, LocationError, serialize_planet_with_solar,
+
+                           serialize_chart_for_frontend)
+
+from _horary_math import safe_geocode
+
+from horary_config import cfg
+
+from horary_services import get_services
+
+from horary_metrics import SimpleMetrics, PROMETHEUS_CONTENT_TYPE, component_prometheus_lines
+
+from horary_requests import ChartRequestError, parse_chart_request, calculation_metadata
+
+from horary_pool import get_chart_pool, max_batch_size
+
+from horary_batch import sweep_charts, time_range, max_sweep_charts
+
+from horary_health import get_health_prober, overall_status
+
+from horary_tracing import start_trace, wants_trace
+
+from horary_profiling import (PROFILE_HEADER, PROFILE_MODE_HEADER, REQUEST_ID_HEADER, profiling_mode,
+
+                              request_id_for, profile_call, stored_profile)
 
 
 
@@ -82,69 +106,51 @@ horary_engine = HoraryEngine()
 
 
 
-# Simple metrics collection
-
-class SimpleMetrics:
-
-    def __init__(self):
-
-        self.request_count = defaultdict(int)
-
-        self.error_count = defaultdict(int)
-
-        self.response_times = defaultdict(list)
+# Load shared services before workers fork (gunicorn --preload) or the first request
 
-    
-
-    def record_request(self, endpoint):
+try:
 
-        self.request_count[endpoint] += 1
-
-    
+    preload_services = cfg().services.preload
 
-    def record_error(self, endpoint, error_type):
+except AttributeError:
 
-        self.error_count[f"{endpoint}_{error_type}"] += 1
+    preload_services = True
 
-    
+if preload_services:
 
-    def record_response_time(self, endpoint, duration):
+    get_services().preload()
 
-        self.response_times[endpoint].append(duration)
 
-        # Keep only last 100 response times per endpoint
 
-        if len(self.response_times[endpoint]) > 100:
+# Start the batch workers now rather than on the first batch
 
-            self.response_times[endpoint] = self.response_times[endpoint][-100:]
+try:
 
-    
+    prewarm_chart_pool = cfg().chart_pool.prewarm
 
-    def get_stats(self):
+except AttributeError:
 
-        stats = {
+    prewarm_chart_pool = False
 
-            'requests': dict(self.request_count),
+# Chart pool workers started by forkserver or spawn import this module as __mp_main__; they only judge
 
-            'errors': dict(self.error_count),
+in_pool_worker = __name__ == '__mp_main__'
 
-            'avg_response_times': {}
+if prewarm_chart_pool and not in_pool_worker:
 
-        }
+    get_chart_pool().warm()
 
-        
 
-        for endpoint, times in self.response_times.items():
 
-            if times:
+# Service health checks run in the background; /api/health reads their results
 
-                stats['avg_response_times'][endpoint] = sum(times) / len(times)
+if not in_pool_worker:
 
-        
+    get_health_prober()
 
-        return stats
 
 
+# Simple metrics collection
 
 metrics = SimpleMetrics()
 
@@ -210,7 +216,7 @@ def timing_decorator(endpoint_name):
 
 def health_check():
 
-    """Enhanced health check with service validation"""
+    """Enhanced health check with service validation (cached, see horary_health.py)"""
 
     
 
@@ -252,151 +258,43 @@ def health_check():
 
     
 
-    # Test timezone finder
-
-    try:
-
-        from timezonefinder import TimezoneFinder
-
-        tf = TimezoneFinder()
-
-        test_tz = tf.timezone_at(lat=51.5074, lng=-0.1278)  # London
-
-        health_status['services']['timezone_finder'] = {
-
-            'status': 'healthy' if test_tz else 'degraded',
-
-            'test_result': test_tz
-
-        }
-
-    except Exception as e:
-
-        health_status['services']['timezone_finder'] = {
-
-            'status': 'unhealthy',
-
-            'error': str(e)
-
-        }
-
-    
-
-    # Test Swiss Ephemeris
-
-    try:
-
-        import swisseph as swe
-
-        jd = swe.julday(2025, 5, 29, 12.0)
-
-        sun_pos = swe.calc_ut(jd, swe.SUN)
-
-        health_status['services']['swiss_ephemeris'] = {
-
-            'status': 'healthy',
-
-            'test_calculation': f"Sun at {sun_pos[0][0]:.2f}°"
-
-        }
-
-    except Exception as e:
-
-        health_status['services']['swiss_ephemeris'] = {
-
-            'status': 'unhealthy',
-
-            'error': str(e)
-
-        }
-
-    
-
-    # Test geocoding with enhanced error handling
-
-    try:
-
-        from geopy.geocoders import Nominatim
-
-        geolocator = Nominatim(user_agent="enhanced_health_check")
-
-        location = geolocator.geocode("London, UK", timeout=5)
-
-        health_status['services']['geocoding'] = {
-
-            'status': 'healthy' if location else 'degraded',
-
-            'test_result': location.address if location else None
-
-        }
-
-    except Exception as e:
-
-        health_status['services']['geocoding'] = {
-
-            'status': 'unhealthy',
-
-            'error': str(e)
-
-        }
-
-    
-
-    # Test computational helpers
-
-    try:
-
-        from _horary_math import calculate_elongation, normalize_longitude
-
-        test_elongation = calculate_elongation(120.0, 90.0)
-
-        test_normalize = normalize_longitude(380.0)
-
-        health_status['services']['computational_helpers'] = {
+    # Latest results of the background health checks
 
-            'status': 'healthy',
+    health_status['services'] = get_health_prober().snapshot()
 
-            'test_calculations': {
+    health_status['status'] = overall_status(health_status['services'])
 
-                'elongation_120_90': f"{test_elongation:.2f}°",
+    return jsonify(health_status), 503 if health_status['status'] == 'unhealthy' else 200
 
-                'normalize_380': f"{test_normalize:.2f}°"
 
-            }
-
-        }
-
-    except Exception as e:
 
-        health_status['services']['computational_helpers'] = {
+@app.route('/api/health/live', methods=['GET'])
 
-            'status': 'unhealthy',
+def liveness_check():
 
-            'error': str(e)
+    """Liveness: the process is up and serving requests (no service checks)"""
 
-        }
+    return jsonify({'status': 'alive', 'timestamp': datetime.now(timezone.utc).isoformat()}), 200
 
-    
 
-    # Overall status determination
 
-    service_statuses = [s['status'] for s in health_status['services'].values()]
+@app.route('/api/health/ready', methods=['GET'])
 
-    if 'unhealthy' in service_statuses:
+def readiness_check():
 
-        health_status['status'] = 'unhealthy'
+    """Readiness: the services charts depend on have passed their latest checks"""
 
-        return jsonify(health_status), 503
+    ready, services = get_health_prober().readiness()
 
-    elif 'degraded' in service_statuses:
+    return jsonify({
 
-        health_status['status'] = 'degraded'
+        'status': 'ready' if ready else 'not_ready',
 
-        return jsonify(health_status), 200
+        'timestamp': datetime.now(timezone.utc).isoformat(),
 
-    
+        'services': services
 
-    return jsonify(health_status), 200
+    }), 200 if ready else 503
 
 
 
@@ -446,9 +344,7 @@ def get_timezone():
 
             # Get timezone using enhanced timezone manager
 
-            from horary_engine import TimezoneManager
-
-            timezone_manager = TimezoneManager()
+            timezone_manager = get_services().timezone_manager
 
             timezone_str = timezone_manager.get_timezone_for_location(lat, lon)
 
@@ -574,9 +470,7 @@ def get_current_time():
 
             # Get current time using enhanced timezone manager
 
-            from horary_engine import TimezoneManager
-
-            timezone_manager = TimezoneManager()
+            timezone_manager = get_services().timezone_manager
 
             dt_local, dt_utc, timezone_used = timezone_manager.get_current_time_for_location(lat, lon)
 
@@ -662,193 +556,147 @@ def get_current_time():
 
 
 
-@app.route('/api/calculate-chart', methods=['POST'])
-
-@timing_decorator('calculate_chart')
-
-def calculate_chart():
+def wants_stream():
 
-    """
+    """Stream NDJSON when asked with ?stream=1 or Accept: application/x-ndjson"""
 
-    ENHANCED: Calculate horary chart with all new features
+    return (request.args.get('stream', '').lower() in ('1', 'true', 'yes')
 
-    Now includes future retrograde, directional motion, enhanced reception, and more
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
 
-    """
 
-    try:
 
-        data = request.get_json()
+def ndjson_response(lines, summary):
 
-        
+    """
 
-        if not data:
+    Stream one JSON document per line as the lines generator produces them,
 
-            return jsonify({
+    then summary() as the last line. A client that disconnects closes the
 
-                'error': 'No JSON data provided',
+    generator, which cancels the work not yet started.
 
-                'judgment': 'ERROR',
+    """
 
-                'confidence': 0,
+    def generate():
 
-                'reasoning': ['No JSON data provided']
+        count = 0
 
-            }), 400
+        try:
 
-        
+            for line in lines:
 
-        # Extract basic parameters
+                yield app.json.dumps(line) + '\n'
 
-        question = data.get('question', '').strip()
+                count += 1
 
-        location = data.get('location', 'London, UK').strip()
+            yield app.json.dumps(summary()) + '\n'
 
-        date_str = data.get('date')
+        except GeneratorExit:
 
-        time_str = data.get('time')
+            logger.info(f"Stream closed by the client after {count} lines")
 
-        timezone_str = data.get('timezone')
+            raise
 
-        use_current_time = data.get('useCurrentTime', True)
+        except Exception as e:
 
-        manual_houses = data.get('manualHouses')
+            # Headers are already sent; report the failure as the last line
 
-        
+            logger.error(f"Stream failed after {count} lines: {str(e)}")
 
-        # NEW: Extract enhanced parameters
+            logger.error(traceback.format_exc())
 
-        ignore_radicality = data.get('ignoreRadicality', False)
+            yield app.json.dumps({'error': f'Stream failed: {str(e)}', 'lines_sent': count}) + '\n'
 
-        ignore_void_moon = data.get('ignoreVoidMoon', False)
+        finally:
 
-        ignore_combustion = data.get('ignoreCombustion', False)
+            lines.close()
 
-        ignore_saturn_7th = data.get('ignoreSaturn7th', False)
+    
 
-        exaltation_confidence_boost = data.get('exaltationConfidenceBoost', 15.0)
+    return Response(generate(), mimetype='application/x-ndjson',
 
-        
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-        logger.info(f"ENHANCED chart calculation request:")
 
-        logger.info(f"  Question: {question[:100]}..." if len(question) > 100 else f"  Question: {question}")
 
-        logger.info(f"  Location: {location}")
+@app.route('/api/calculate-chart', methods=['POST'])
 
-        logger.info(f"  Date: {date_str}")
+@timing_decorator('calculate_chart')
 
-        logger.info(f"  Time: {time_str}")
+def calculate_chart():
 
-        logger.info(f"  Timezone: {timezone_str}")
+    """
 
-        logger.info(f"  Use current time: {use_current_time}")
+    ENHANCED: Calculate horary chart with all new features
 
-        
+    Now includes future retrograde, directional motion, enhanced reception, and more
 
-        # NEW: Log enhanced parameters
+    "trace": true (or ?trace=1) adds per-stage timings to calculation_metadata
 
-        if any([ignore_radicality, ignore_void_moon, ignore_combustion, ignore_saturn_7th]):
+    X-Horary-Profile: <admin token> profiles the request (see horary_profiling.py)
 
-            logger.info(f"  Override flags: radicality={ignore_radicality}, void_moon={ignore_void_moon}, combustion={ignore_combustion}, saturn_7th={ignore_saturn_7th}")
+    """
 
-        if exaltation_confidence_boost != 15.0:
+    try:
 
-            logger.info(f"  Enhanced reception boost: {exaltation_confidence_boost}%")
+        data = request.get_json()
 
         
 
-        # Validate required fields
-
-        if not question:
+        if not data:
 
             return jsonify({
 
-                'error': 'Question is required',
+                'error': 'No JSON data provided',
 
                 'judgment': 'ERROR',
 
                 'confidence': 0,
 
-                'reasoning': ['No horary question provided']
+                'reasoning': ['No JSON data provided']
 
             }), 400
 
         
 
-        if not location:
-
-            return jsonify({
-
-                'error': 'Location is required',
+        # Extract and validate parameters
 
-                'judgment': 'ERROR', 
+        try:
 
-                'confidence': 0,
+            question, settings = parse_chart_request(data)
 
-                'reasoning': ['No location provided']
+        except ChartRequestError as e:
 
-            }), 400
+            return jsonify(e.response()), 400
 
         
 
-        # Validate manual time inputs
-
-        if not use_current_time:
-
-            if not date_str or not time_str:
+        logger.info(f"ENHANCED chart calculation request:")
 
-                return jsonify({
+        logger.info(f"  Question: {question[:100]}..." if len(question) > 100 else f"  Question: {question}")
 
-                    'error': 'Date and time are required when not using current time',
+        logger.info(f"  Location: {settings['location']}")
 
-                    'judgment': 'ERROR',
+        logger.info(f"  Date: {settings['date']}")
 
-                    'confidence': 0,
+        logger.info(f"  Time: {settings['time']}")
 
-                    'reasoning': ['Date and time must be provided for manual time entry']
+        logger.info(f"  Timezone: {settings['timezone']}")
 
-                }), 400
+        logger.info(f"  Use current time: {settings['use_current_time']}")
 
         
 
-        # Convert manual houses if provided
-
-        houses_list = None
-
-        if manual_houses:
-
-            try:
-
-                houses_list = [int(h.strip()) for h in manual_houses.split(',') if h.strip()]
-
-                if len(houses_list) < 2:
-
-                    return jsonify({
-
-                        'error': 'Manual houses must include at least querent and quesited houses (e.g., "1,7")',
-
-                        'judgment': 'ERROR',
-
-                        'confidence': 0,
-
-                        'reasoning': ['Invalid manual house specification']
-
-                    }), 400
-
-            except ValueError:
-
-                return jsonify({
-
-                    'error': 'Manual houses must be numbers separated by commas (e.g., "1,7")',
+        # NEW: Log enhanced parameters
 
-                    'judgment': 'ERROR',
+        if any([settings['ignore_radicality'], settings['ignore_void_moon'], settings['ignore_combustion'], settings['ignore_saturn_7th']]):
 
-                    'confidence': 0,
+            logger.info(f"  Override flags: radicality={settings['ignore_radicality']}, void_moon={settings['ignore_void_moon']}, combustion={settings['ignore_combustion']}, saturn_7th={settings['ignore_saturn_7th']}")
 
-                    'reasoning': ['Invalid manual house format']
+        if settings['exaltation_confidence_boost'] != 15.0:
 
-                }), 400
+            logger.info(f"  Enhanced reception boost: {settings['exaltation_confidence_boost']}%")
 
         
 
@@ -858,39 +706,29 @@ def calculate_chart():
 
         
 
-        try:
-
-            settings = {
-
-                "location": location,
+        # Optional per-stage timings in calculation_metadata['trace'] and,
 
-                "date": date_str,
+        # for admins, a profile of the full computation
 
-                "time": time_str,
+        profile_mode = profiling_mode(request.headers.get(PROFILE_HEADER), request.headers.get(PROFILE_MODE_HEADER))
 
-                "timezone": timezone_str,
+        profile = None
 
-                "use_current_time": use_current_time,
-
-                "manual_houses": houses_list,
-
-                # NEW: Enhanced features
-
-                "ignore_radicality": ignore_radicality,
+        try:
 
-                "ignore_void_moon": ignore_void_moon,
+            with (start_trace() if wants_trace(data, request.args.get('trace')) else nullcontext()) as trace:
 
-                "ignore_combustion": ignore_combustion,
+                if profile_mode:
 
-                "ignore_saturn_7th": ignore_saturn_7th,
+                    result, profile = profile_call(lambda: horary_engine.judge(question, settings, shared=False),
 
-                "exaltation_confidence_boost": exaltation_confidence_boost
+                                                   request_id_for(request.headers.get(REQUEST_ID_HEADER)),
 
-            }
+                                                   profile_mode)
 
-            
+                else:
 
-            result = horary_engine.judge(question, settings)
+                    result = horary_engine.judge(question, settings)
 
             
 
@@ -934,55 +772,11 @@ def calculate_chart():
 
         # ENHANCED: Add enhanced calculation metadata
 
-        result['calculation_metadata'] = {
-
-            'calculation_time_seconds': calculation_time,
-
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-
-            'api_version': '2.0.0',  # Enhanced version
-
-            'engine_version': 'Enhanced Traditional Horary 2.0',
-
-            'enhanced_features_used': {
-
-                'future_retrograde_checks': True,
-
-                'directional_motion_awareness': True,
-
-                'sequence_enforcement': True,
-
-                'enhanced_denial_conditions': True,
-
-                'reception_weighting_nuance': True,
-
-                'solar_condition_enhancements': True,
-
-                'variable_moon_timing': True,
-
-                'fail_fast_geocoding': True
-
-            },
-
-            'override_flags_applied': {
-
-                'ignore_radicality': ignore_radicality,
-
-                'ignore_void_moon': ignore_void_moon,
-
-                'ignore_combustion': ignore_combustion,
-
-                'ignore_saturn_7th': ignore_saturn_7th
-
-            },
+        result['calculation_metadata'] = calculation_metadata(settings, calculation_time, trace)
 
-            'enhanced_parameters': {
+        if profile is not None:
 
-                'exaltation_confidence_boost': exaltation_confidence_boost
-
-            }
-
-        }
+            result['calculation_metadata']['profile'] = profile.metadata()
 
         
 
@@ -1054,53 +848,501 @@ def calculate_chart():
 
 
 
-@app.route('/api/moon-debug', methods=['POST'])
+@app.route('/api/calculate-charts', methods=['POST'])
 
-@timing_decorator('moon_debug')
+@timing_decorator('calculate_charts')
 
-def moon_debug():
+def calculate_charts():
 
-    """Get detailed Moon void of course debug information"""
+    """
+
+    Batch chart calculation on the chart worker pool
+
+    Accepts {"charts": [...]} (or a bare array) of /api/calculate-chart requests;
+
+    each item succeeds or fails independently. With ?stream=1 the results are
+
+    streamed as NDJSON, one line per chart, then a calculation_metadata line
+
+    """
 
     try:
 
         data = request.get_json()
 
+        items = data.get('charts') if isinstance(data, dict) else data
+
         
 
-        if not data:
+        if not isinstance(items, list) or not items:
 
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return jsonify({
 
-        
+                'error': 'A non-empty array of chart requests is required',
 
-        return jsonify({
+                'reasoning': ['Send {"charts": [...]} with the same fields as /api/calculate-chart']
 
-            'message': 'Enhanced Moon debug information is included in chart calculation results',
+            }), 400
 
-            'instructions': 'Check the moon_aspects field in the calculate-chart response',
+        
 
-            'enhanced_features': {
+        if len(items) > max_batch_size():
 
-                'variable_moon_speed': 'Real-time Moon speed from ephemeris',
+            return jsonify({
 
-                'directional_sign_exit': 'Motion-aware sign boundary calculations',
+                'error': f'Batch too large: {len(items)} charts (limit {max_batch_size()})',
 
-                'enhanced_void_detection': 'Improved future aspect calculations',
+                'reasoning': ['Split the batch into smaller requests']
 
-                'solar_conditions': 'Check response.solar_factors for detailed analysis'
+            }), 413
 
-            },
+        
 
-            'example_usage': {
+        start_time = time.time()
 
-                'endpoint': '/api/calculate-chart',
+        
 
-                'moon_debug_location': 'response.moon_aspects',
+        # Invalid items are answered directly; the rest go to the workers
 
-                'solar_analysis_location': 'response.solar_factors'
+        invalid, valid_indexes, valid_requests = [], [], []
 
-            },
+        for index, item in enumerate(items):
+
+            try:
+
+                valid_requests.append(parse_chart_request(item))
+
+                valid_indexes.append(index)
+
+            except (ChartRequestError, AttributeError, TypeError) as e:
+
+                error = e.response() if isinstance(e, ChartRequestError) else {
+
+                    'error': f'Invalid chart request: {str(e)}',
+
+                    'judgment': 'ERROR',
+
+                    'confidence': 0,
+
+                    'reasoning': ['Invalid chart request']
+
+                }
+
+                invalid.append(dict(error, index=index, status='error', error_type='ValidationError'))
+
+        
+
+        pool = get_chart_pool()
+
+        tally = {'succeeded': 0}
+
+        
+
+        def batch_results():
+
+            yield from invalid
+
+            outcomes = pool.iter_batch(valid_requests)
+
+            try:
+
+                for i, outcome in outcomes:
+
+                    index = valid_indexes[i]
+
+                    if outcome['status'] == 'success':
+
+                        tally['succeeded'] += 1
+
+                        result = outcome['result']
+
+                        result['calculation_metadata'] = calculation_metadata(valid_requests[i][1], outcome['calculation_time_seconds'])
+
+                        yield {'index': index, 'status': 'success', 'result': result}
+
+                    else:
+
+                        yield dict(outcome, index=index)
+
+            finally:
+
+                outcomes.close()
+
+        
+
+        def batch_metadata():
+
+            calculation_time = time.time() - start_time
+
+            succeeded = tally['succeeded']
+
+            logger.info(f"Batch of {len(items)} charts completed in {calculation_time:.2f}s ({succeeded} succeeded)")
+
+            return {
+
+                'batch_size': len(items),
+
+                'succeeded': succeeded,
+
+                'failed': len(items) - succeeded,
+
+                'calculation_time_seconds': calculation_time,
+
+                'charts_per_second': len(items) / calculation_time if calculation_time > 0 else None,
+
+                'execution': pool.execution,
+
+                'workers': pool.stats()['workers'],
+
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+
+                'api_version': '2.0.0',
+
+                'engine_version': 'Enhanced Traditional Horary 2.0'
+
+            }
+
+        
+
+        # Streamed results arrive as each chart completes, in completion order
+
+        if wants_stream():
+
+            return ndjson_response(batch_results(), lambda: {'calculation_metadata': batch_metadata()})
+
+        
+
+        results = sorted(batch_results(), key=lambda result: result['index'])
+
+        return jsonify({
+
+            'results': results,
+
+            'calculation_metadata': batch_metadata()
+
+        })
+
+        
+
+    except Exception as e:
+
+        error_msg = f"Error calculating chart batch: {str(e)}"
+
+        logger.error(error_msg)
+
+        logger.error(traceback.format_exc())
+
+        
+
+        return jsonify({
+
+            'error': error_msg,
+
+            'reasoning': [f'Batch calculation error: {str(e)}'],
+
+            'calculation_metadata': {
+
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+
+                'api_version': '2.0.0'
+
+            }
+
+        }), 500
+
+
+
+@app.route('/api/chart-sweep', methods=['POST'])
+
+@timing_decorator('chart_sweep')
+
+def chart_sweep():
+
+    """
+
+    Charts for one location at regular steps between two moments
+
+    Takes location, date/time, endDate/endTime, stepMinutes and timezone;
+
+    with ?stream=1 the charts are streamed as NDJSON while they are calculated
+
+    """
+
+    try:
+
+        data = request.get_json()
+
+        
+
+        if not data:
+
+            return jsonify({'error': 'No JSON data provided'}), 400
+
+        
+
+        location = data.get('location', 'London, UK').strip()
+
+        timezone_str = data.get('timezone')
+
+        date_str, time_str = data.get('date'), data.get('time')
+
+        end_date_str, end_time_str = data.get('endDate'), data.get('endTime')
+
+        
+
+        if not location or not all([date_str, time_str, end_date_str, end_time_str]):
+
+            return jsonify({
+
+                'error': 'location, date, time, endDate and endTime are required',
+
+                'reasoning': ['A sweep needs a location and start and end moments']
+
+            }), 400
+
+        
+
+        try:
+
+            step = timedelta(minutes=float(data.get('stepMinutes', 60)))
+
+        except (TypeError, ValueError):
+
+            step = timedelta(0)
+
+        if step <= timedelta(0):
+
+            return jsonify({
+
+                'error': 'stepMinutes must be a positive number',
+
+                'reasoning': ['Invalid sweep step']
+
+            }), 400
+
+        
+
+        try:
+
+            lat, lon, full_location = safe_geocode(location)
+
+        except LocationError as e:
+
+            logger.error(f"Location error: {str(e)}")
+
+            return jsonify({
+
+                'error': str(e),
+
+                'judgment': 'LOCATION_ERROR',
+
+                'reasoning': [f'Location error: {str(e)}'],
+
+                'error_type': 'LocationError'
+
+            }), 400
+
+        
+
+        timezone_manager = get_services().timezone_manager
+
+        try:
+
+            start_local, start_utc, timezone_used = timezone_manager.parse_datetime_with_timezone(
+
+                date_str, time_str, timezone_str, lat, lon)
+
+            end_local, end_utc, _ = timezone_manager.parse_datetime_with_timezone(
+
+                end_date_str, end_time_str, timezone_str, lat, lon)
+
+        except ValueError as e:
+
+            return jsonify({
+
+                'error': f'Invalid date or time: {str(e)}',
+
+                'reasoning': ['Dates must be YYYY-MM-DD and times HH:MM']
+
+            }), 400
+
+        
+
+        if end_utc < start_utc:
+
+            return jsonify({
+
+                'error': 'The sweep ends before it starts',
+
+                'reasoning': ['endDate/endTime must not be earlier than date/time']
+
+            }), 400
+
+        
+
+        chart_count = int((end_utc - start_utc) / step) + 1
+
+        if chart_count > max_sweep_charts():
+
+            return jsonify({
+
+                'error': f'Sweep too large: {chart_count} charts (limit {max_sweep_charts()})',
+
+                'reasoning': ['Use a larger stepMinutes or a shorter range']
+
+            }), 413
+
+        
+
+        start_time = time.time()
+
+        calculator = horary_engine.engine.calculator
+
+        
+
+        def sweep_results():
+
+            charts = sweep_charts(calculator, time_range(start_local, end_local, step), (lat, lon, full_location))
+
+            for index, chart in enumerate(charts):
+
+                yield {
+
+                    'index': index,
+
+                    'local_time': chart.date_time.isoformat(),
+
+                    'utc_time': chart.date_time_utc.isoformat(),
+
+                    'chart_data': serialize_chart_for_frontend(chart, chart.solar_analyses)
+
+                }
+
+        
+
+        def sweep_metadata():
+
+            calculation_time = time.time() - start_time
+
+            logger.info(f"Sweep of {chart_count} charts completed in {calculation_time:.2f}s")
+
+            return {
+
+                'chart_count': chart_count,
+
+                'step_minutes': step.total_seconds() / 60,
+
+                'timezone': timezone_used,
+
+                'location_name': full_location,
+
+                'coordinates': {'latitude': lat, 'longitude': lon},
+
+                'calculation_time_seconds': calculation_time,
+
+                'charts_per_second': chart_count / calculation_time if calculation_time > 0 else None,
+
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+
+                'api_version': '2.0.0'
+
+            }
+
+        
+
+        if wants_stream():
+
+            return ndjson_response(sweep_results(), lambda: {'calculation_metadata': sweep_metadata()})
+
+        
+
+        charts = list(sweep_results())
+
+        return jsonify({
+
+            'charts': charts,
+
+            'calculation_metadata': sweep_metadata()
+
+        })
+
+        
+
+    except Exception as e:
+
+        error_msg = f"Error calculating chart sweep: {str(e)}"
+
+        logger.error(error_msg)
+
+        logger.error(traceback.format_exc())
+
+        
+
+        return jsonify({
+
+            'error': error_msg,
+
+            'reasoning': [f'Sweep calculation error: {str(e)}'],
+
+            'calculation_metadata': {
+
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+
+                'api_version': '2.0.0'
+
+            }
+
+        }), 500
+
+
+
+@app.route('/api/moon-debug', methods=['POST'])
+
+@timing_decorator('moon_debug')
+
+def moon_debug():
+
+    """Get detailed Moon void of course debug information"""
+
+    try:
+
+        data = request.get_json()
+
+        
+
+        if not data:
+
+            return jsonify({'error': 'No JSON data provided'}), 400
+
+        
+
+        return jsonify({
+
+            'message': 'Enhanced Moon debug information is included in chart calculation results',
+
+            'instructions': 'Check the moon_aspects field in the calculate-chart response',
+
+            'enhanced_features': {
+
+                'variable_moon_speed': 'Real-time Moon speed from ephemeris',
+
+                'directional_sign_exit': 'Motion-aware sign boundary calculations',
+
+                'enhanced_void_detection': 'Improved future aspect calculations',
+
+                'solar_conditions': 'Check response.solar_factors for detailed analysis'
+
+            },
+
+            'example_usage': {
+
+                'endpoint': '/api/calculate-chart',
+
+                'moon_debug_location': 'response.moon_aspects',
+
+                'solar_analysis_location': 'response.solar_factors'
+
+            },
 
             'new_override_options': {
 
@@ -1132,12 +1374,34 @@ def get_metrics():
 
     try:
 
+        from horary_geocache import get_geocode_cache
+
+        from horary_singleflight import singleflight_stats
+
+        from horary_geoqueue import get_geocode_scheduler
+
+        from horary_response_cache import get_response_cache
+
+        geocode_cache = get_geocode_cache()
+
+        
+
         return jsonify({
 
             'status': 'success',
 
             'metrics': metrics.get_stats(),
 
+            'geocode_cache': geocode_cache.stats() if geocode_cache else None,
+
+            'coalescing': singleflight_stats(),
+
+            'geocode_queue': get_geocode_scheduler().stats(),
+
+            'chart_pool': get_chart_pool().stats(),
+
+            'response_cache': get_response_cache().stats(),
+
             'enhanced_engine_stats': {
 
                 'version': '2.0.0',
@@ -1160,6 +1424,60 @@ def get_metrics():
 
 
 
+@app.route('/api/metrics/prometheus', methods=['GET'])
+
+def get_metrics_prometheus():
+
+    """API and engine metrics in the Prometheus text exposition format"""
+
+    from horary_singleflight import singleflight_stats
+
+    from horary_geoqueue import get_geocode_scheduler
+
+    from horary_response_cache import get_response_cache
+
+    components = {
+
+        'response_cache': get_response_cache().stats(),
+
+        'coalescing': singleflight_stats(),
+
+        'geocode_queue': get_geocode_scheduler().stats(),
+
+        'chart_pool': get_chart_pool().stats()
+
+    }
+
+    lines = [metrics.prometheus_text().rstrip('\n')]
+
+    for component, stats in components.items():
+
+        lines.extend(component_prometheus_lines('horary', component, stats))
+
+    return Response('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+
+@app.route('/api/profiles/<request_id>', methods=['GET'])
+
+def get_profile(request_id):
+
+    """Download a stored request profile (same admin header as profiling)"""
+
+    if not profiling_mode(request.headers.get(PROFILE_HEADER)):
+
+        return jsonify({'error': 'Profiling is not enabled for this client', 'success': False}), 403
+
+    path = stored_profile(request_id)
+
+    if path is None:
+
+        return jsonify({'error': f'No stored profile for request {request_id}', 'success': False}), 404
+
+    return send_file(path, as_attachment=True, download_name=path.name)
+
+
+
 @app.route('/api/version', methods=['GET'])
 
 def get_version():
@@ -1484,8 +1802,16 @@ def not_found(error):
 
             '/api/health',
 
+            '/api/health/live',
+
+            '/api/health/ready',
+
             '/api/calculate-chart',
 
+            '/api/calculate-charts',
+
+            '/api/chart-sweep',
+
             '/api/get-timezone',
 
             '/api/current-time',
@@ -1494,6 +1820,10 @@ def not_found(error):
 
             '/api/metrics',
 
+            '/api/metrics/prometheus',
+
+            '/api/profiles/<request_id>',
+
             '/api/version'
 
         ],
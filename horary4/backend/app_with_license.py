@@ -11,7 +11,7 @@ Updated with license system on Jun 04, 2025
 @author: sabaa (enhanced with licensing)
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import json
 import traceback
@@ -20,13 +20,15 @@ import logging
 import os
 from datetime import datetime, timezone
 from functools import wraps
-from collections import defaultdict
 
 # License system imports
 from license_manager import LicenseManager, LicenseError, check_license, is_feature_available, get_license_info
 
 # UPDATED IMPORT: Use the new enhanced engine
 from horary_engine import HoraryEngine, LocationError, serialize_planet_with_solar
+from horary_config import cfg
+from horary_services import get_services
+from horary_metrics import SimpleMetrics, CounterSet, PROMETHEUS_CONTENT_TYPE
 
 # Configure logging
 logging.basicConfig(
@@ -47,6 +49,14 @@ CORS(app)  # Enable CORS for all routes
 license_manager = LicenseManager()
 horary_engine = HoraryEngine()
 
+# Load shared services before workers fork (gunicorn --preload) or the first request
+try:
+    preload_services = cfg().services.preload
+except AttributeError:
+    preload_services = True
+if preload_services:
+    get_services().preload()
+
 # Global license status
 _license_status = {'valid': False, 'error': 'Not checked'}
 
@@ -124,48 +134,32 @@ def require_feature(feature_name):
     """Decorator to require specific feature in license"""
     return require_license(feature_name)
 
-# Simple metrics collection (preserved from original)
-class SimpleMetrics:
+# Simple metrics collection (histograms in horary_metrics.py)
+class LicenseMetrics(SimpleMetrics):
     def __init__(self):
-        self.request_count = defaultdict(int)
-        self.error_count = defaultdict(int)
-        self.response_times = defaultdict(list)
-        self.license_checks = 0
-        self.feature_denials = defaultdict(int)
-    
-    def record_request(self, endpoint):
-        self.request_count[endpoint] += 1
-    
-    def record_error(self, endpoint, error_type):
-        self.error_count[f"{endpoint}_{error_type}"] += 1
-    
-    def record_response_time(self, endpoint, duration):
-        self.response_times[endpoint].append(duration)
-        if len(self.response_times[endpoint]) > 100:
-            self.response_times[endpoint] = self.response_times[endpoint][-100:]
+        super().__init__()
+        self.license_checks = CounterSet()
+        self.feature_denials = CounterSet()
     
     def record_license_check(self):
-        self.license_checks += 1
+        self.license_checks.increment('checks')
     
     def record_feature_denial(self, feature):
-        self.feature_denials[feature] += 1
+        self.feature_denials.increment(feature)
     
     def get_stats(self):
-        stats = {
-            'requests': dict(self.request_count),
-            'errors': dict(self.error_count),
-            'avg_response_times': {},
-            'license_checks': self.license_checks,
-            'feature_denials': dict(self.feature_denials)
-        }
-        
-        for endpoint, times in self.response_times.items():
-            if times:
-                stats['avg_response_times'][endpoint] = sum(times) / len(times)
-        
+        stats = super().get_stats()
+        stats['license_checks'] = self.license_checks.snapshot().get('checks', 0)
+        stats['feature_denials'] = self.feature_denials.snapshot()
         return stats
+    
+    def _extra_prometheus_lines(self, prefix):
+        lines = [f'{prefix}_license_checks_total {self.license_checks.snapshot().get("checks", 0)}']
+        for feature, count in sorted(self.feature_denials.snapshot().items()):
+            lines.append(f'{prefix}_feature_denials_total{{feature="{feature}"}} {count}')
+        return lines
 
-metrics = SimpleMetrics()
+metrics = LicenseMetrics()
 
 def timing_decorator(endpoint_name):
     """Decorator to time API endpoints (preserved from original)"""
@@ -321,8 +315,8 @@ def health_check():
     
     # Test timezone finder
     try:
-        from timezonefinder import TimezoneFinder
-        tf = TimezoneFinder()
+        from horary_timezones import get_timezone_finder
+        tf = get_timezone_finder()
         test_tz = tf.timezone_at(lat=51.5074, lng=-0.1278)
         health_status['services']['timezone_finder'] = {
             'status': 'healthy' if test_tz else 'degraded',
@@ -398,8 +392,7 @@ def get_timezone():
             from _horary_math import safe_geocode
             lat, lon, full_location = safe_geocode(location)
             
-            from horary_engine import TimezoneManager
-            timezone_manager = TimezoneManager()
+            timezone_manager = get_services().timezone_manager
             timezone_str = timezone_manager.get_timezone_for_location(lat, lon)
             
             result = {
@@ -462,8 +455,7 @@ def get_current_time():
             from _horary_math import safe_geocode
             lat, lon, full_location = safe_geocode(location)
             
-            from horary_engine import TimezoneManager
-            timezone_manager = TimezoneManager()
+            timezone_manager = get_services().timezone_manager
             dt_local, dt_utc, timezone_used = timezone_manager.get_current_time_for_location(lat, lon)
             
             result = {
@@ -744,6 +736,11 @@ def get_metrics():
         logger.error(f"Error getting enhanced metrics: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/metrics/prometheus', methods=['GET'])
+def get_metrics_prometheus():
+    """API and engine metrics in the Prometheus text exposition format"""
+    return Response(metrics.prometheus_text(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/api/version', methods=['GET'])
 def get_version():
     """Enhanced API version information with license details"""
@@ -829,6 +826,7 @@ def not_found(error):
             '/api/current-time',
             '/api/moon-debug',
             '/api/metrics',
+            '/api/metrics/prometheus',
             '/api/version',
             '/api/license/status',
             '/api/license/features',
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Astrology ASGI API
+Asyncio serving mode for the chart, timezone, current-time and health routes
+
+Serves the same JSON as app.py for /api/calculate-chart, /api/get-timezone,
+/api/current-time and /api/health, but waits for I/O on the event loop
+instead of holding a thread per request:
+- geocoding awaits the shared geocoding queue (web lookups are rate
+  limited and deduplicated there), so hundreds of requests can wait on
+  Nominatim at once;
+- timezone lookups and license checks run concurrently on the loop's
+  default executor, and /api/health answers from the background health
+  prober (horary_health.py);
+- ephemeris and judgment work runs on a bounded compute executor
+  (asgi.compute_threads), so CPU-bound requests queue there without
+  blocking the loop.
+
+Plain ASGI 3, no framework needed. Run it with any ASGI server:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 4
+    python asgi_app.py
+
+Configure it in horary_constants.yaml:
+    asgi:
+      compute_threads: 0
+      require_license: false
+      license_refresh_seconds: 3600
+
+Created for horary_engine.py performance work
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from horary_engine import HoraryEngine, LocationError
+from _horary_math import safe_geocode_async, await_geocode
+from horary_config import cfg
+from horary_services import get_services
+from horary_metrics import SimpleMetrics
+from horary_requests import ChartRequestError, parse_chart_request, calculation_metadata
+from horary_health import get_health_prober, overall_status
+from horary_tracing import start_trace, wants_trace
+from horary_profiling import (PROFILE_HEADER, PROFILE_MODE_HEADER, REQUEST_ID_HEADER, profiling_mode,
+                              request_id_for, profile_call)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('horary_api.log'),
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+
+JSON_HEADERS = [
+    (b'content-type', b'application/json'),
+    (b'access-control-allow-origin', b'*'),  # CORS for all routes, as in app.py
+]
+
+# Endpoints gated by license feature when asgi.require_license is on (as in app_with_license.py)
+LICENSED_FEATURES = {
+    'get_timezone': 'timezone_support',
+    'current_time': 'timezone_support',
+    'calculate_chart': 'enhanced_engine'
+}
+
+
+class Request:
+    """The parts of an ASGI HTTP request the handlers need"""
+
+    def __init__(self, scope: Dict[str, Any], body: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        self.body = body
+
+    def get_json(self) -> Optional[Any]:
+        """Parsed JSON body, or None when absent or invalid"""
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+
+Response = Tuple[Any, int]
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+def _setting(name: str, default):
+    try:
+        return getattr(cfg().asgi, name)
+    except AttributeError:
+        return default
+
+
+class HoraryASGI:
+    """ASGI application: routing, lifespan, metrics and license gating"""
+
+    def __init__(self):
+        self.horary_engine = HoraryEngine()
+        self.metrics = SimpleMetrics()
+        self.compute = ThreadPoolExecutor(max_workers=_setting('compute_threads', 0) or os.cpu_count() or 1,
+                                          thread_name_prefix='horary-compute')
+        self.license_status: Dict[str, Any] = {'valid': False, 'error': 'Not checked'}
+        self.require_license = _setting('require_license', False)
+        self._license_task: Optional[asyncio.Task] = None
+        self.routes: Dict[Tuple[str, str], Tuple[str, Handler]] = {
+            ('GET', '/api/health'): ('health', self.health_check),
+            ('GET', '/api/health/live'): ('liveness', self.liveness_check),
+            ('GET', '/api/health/ready'): ('readiness', self.readiness_check),
+            ('POST', '/api/get-timezone'): ('get_timezone', self.get_timezone),
+            ('POST', '/api/current-time'): ('current_time', self.get_current_time),
+            ('POST', '/api/calculate-chart'): ('calculate_chart', self.calculate_chart),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    # Lifespan
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                    await send({'type': 'lifespan.startup.complete'})
+                except Exception as e:
+                    logger.error(f"ASGI startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self):
+        loop = asyncio.get_running_loop()
+        try:
+            preload_services = cfg().services.preload
+        except AttributeError:
+            preload_services = True
+        if preload_services:
+            await loop.run_in_executor(None, get_services().preload)
+        get_health_prober()
+        if self.require_license:
+            await self.refresh_license()
+            self._license_task = asyncio.create_task(self._refresh_license_periodically())
+        logger.info("Horary ASGI API started")
+
+    async def shutdown(self):
+        if self._license_task is not None:
+            self._license_task.cancel()
+        self.compute.shutdown(wait=False, cancel_futures=True)
+
+    # License (file read and signature check off the loop)
+
+    async def refresh_license(self):
+        from license_manager import LicenseManager
+        loop = asyncio.get_running_loop()
+        try:
+            is_valid, license_info = await loop.run_in_executor(
+                None, lambda: LicenseManager().validate_license(force_reload=True))
+            self.license_status = {
+                'valid': is_valid,
+                'info': license_info,
+                'error': None if is_valid else license_info.get('error', 'Unknown license error'),
+                'last_checked': datetime.now(timezone.utc).isoformat()
+            }
+        except Exception as e:
+            logger.error(f"License check failed: {str(e)}")
+            self.license_status = {'valid': False, 'error': str(e),
+                                   'last_checked': datetime.now(timezone.utc).isoformat()}
+
+    async def _refresh_license_periodically(self):
+        while True:
+            await asyncio.sleep(_setting('license_refresh_seconds', 3600))
+            await self.refresh_license()
+
+    def _license_denial(self, endpoint: str) -> Optional[Response]:
+        feature = LICENSED_FEATURES.get(endpoint)
+        if not self.require_license or feature is None:
+            return None
+        if not self.license_status.get('valid', False):
+            return {
+                'error': 'Invalid or expired license',
+                'license_error': self.license_status.get('error', 'Unknown license error'),
+                'requires_license': True,
+                'success': False
+            }, 403
+        features = self.license_status.get('info', {}).get('features', [])
+        if feature not in features:
+            return {
+                'error': f'Feature not available in current license: {feature}',
+                'available_features': features,
+                'requires_upgrade': True,
+                'success': False
+            }, 403
+        return None
+
+    # HTTP
+
+    async def _http(self, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                break
+        request = Request(scope, body)
+        logger.info(f"{request.method} {request.path}")
+
+        if request.method == 'OPTIONS':
+            await self._send(send, None, 204, extra_headers=[
+                (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+                (b'access-control-allow-headers', b'Content-Type')])
+            return
+
+        route = self.routes.get((request.method, request.path))
+        if route is None:
+            if any(path == request.path for _, path in self.routes):
+                payload, status = {
+                    'error': 'Method not allowed',
+                    'message': 'The HTTP method is not allowed for this endpoint',
+                    'api_version': '2.0.0'
+                }, 405
+            else:
+                payload, status = {
+                    'error': 'Endpoint not found',
+                    'message': 'The requested API endpoint does not exist',
+                    'api_version': '2.0.0',
+                    'available_endpoints': sorted({path for _, path in self.routes})
+                }, 404
+            await self._send(send, payload, status)
+            return
+
+        endpoint, handler = route
+        payload, status = await self._timed(endpoint, request, handler)
+        logger.info(f"Response: {status} - {request.method} {request.path}")
+        await self._send(send, payload, status)
+
+    async def _timed(self, endpoint: str, request: Request, handler: Handler) -> Response:
+        """Metrics and the error fallback, like timing_decorator and the 500 handler in app.py"""
+        self.metrics.record_request(endpoint)
+        start_time = time.time()
+        try:
+            denial = self._license_denial(endpoint)
+            payload, status = denial if denial else await handler(request)
+            duration = time.time() - start_time
+            self.metrics.record_response_time(endpoint, duration)
+            logger.info(f"{endpoint} completed in {duration:.2f}s")
+            return payload, status
+        except Exception as e:
+            duration = time.time() - start_time
+            self.metrics.record_response_time(endpoint, duration)
+            self.metrics.record_error(endpoint, type(e).__name__)
+            logger.error(f"{endpoint} failed after {duration:.2f}s: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {
+                'error': 'Internal server error',
+                'message': 'An unexpected error occurred in the enhanced engine',
+                'api_version': '2.0.0',
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }, 500
+
+    async def _send(self, send, payload, status: int, extra_headers=()):
+        body = b'' if payload is None else json.dumps(payload, default=str).encode('utf-8')
+        headers = JSON_HEADERS + list(extra_headers) + [(b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _geocode(self, location: str) -> Tuple[float, float, str]:
+        """Gazetteer and cache answers return at once; web lookups are awaited on the queue"""
+        return await await_geocode(safe_geocode_async(location), location)
+
+    # Routes
+
+    async def calculate_chart(self, request: Request) -> Response:
+        """Same request and response as /api/calculate-chart in app.py"""
+        try:
+            data = request.get_json()
+
+            if not data:
+                return {
+                    'error': 'No JSON data provided',
+                    'judgment': 'ERROR',
+                    'confidence': 0,
+                    'reasoning': ['No JSON data provided']
+                }, 400
+
+            try:
+                question, settings = parse_chart_request(data)
+            except ChartRequestError as e:
+                return e.response(), 400
+
+            logger.info(f"ASGI chart calculation request: {question[:100]} @ {settings['location']}")
+            start_time = time.time()
+
+            # Resolve the location on the loop; judge() then finds it in the gazetteer or cache
+            try:
+                await self._geocode(settings['location'])
+            except LocationError as e:
+                logger.error(f"Location error: {str(e)}")
+                return {
+                    'error': str(e),
+                    'judgment': 'LOCATION_ERROR',
+                    'confidence': 0,
+                    'reasoning': [f'Location error: {str(e)}'],
+                    'error_type': 'LocationError'
+                }, 400
+
+            loop = asyncio.get_running_loop()
+            want_trace = wants_trace(data, (request.query.get('trace') or [None])[0])
+            profile_mode = profiling_mode(request.headers.get(PROFILE_HEADER.lower()),
+                                          request.headers.get(PROFILE_MODE_HEADER.lower()))
+            request_id = request_id_for(request.headers.get(REQUEST_ID_HEADER.lower()))
+
+            # Traced and profiled on the compute thread: executors do not carry the request's context
+            def judge():
+                with start_trace() if want_trace else nullcontext() as request_trace:
+                    if profile_mode:
+                        result, profile = profile_call(
+                            lambda: self.horary_engine.judge(question, settings, shared=False),
+                            request_id, profile_mode)
+                    else:
+                        result, profile = self.horary_engine.judge(question, settings), None
+                return result, request_trace, profile
+
+            result, trace, profile = await loop.run_in_executor(self.compute, judge)
+
+            calculation_time = time.time() - start_time
+            if result.get('error'):
+                logger.error(f"Chart calculation error: {result['error']}")
+                return result, 500
+
+            result['calculation_metadata'] = calculation_metadata(settings, calculation_time, trace)
+            if profile is not None:
+                result['calculation_metadata']['profile'] = profile.metadata()
+            logger.info(f"ASGI chart calculation successful - Judgment: {result.get('judgment')} "
+                        f"(Confidence: {result.get('confidence')}%) in {calculation_time:.2f}s")
+            return result, 200
+
+        except Exception as e:
+            error_msg = f"Error calculating enhanced chart: {str(e)}"
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
+            return {
+                'error': error_msg,
+                'judgment': 'ERROR',
+                'confidence': 0,
+                'reasoning': [f'Enhanced calculation error: {str(e)}'],
+                'calculation_metadata': {
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'api_version': '2.0.0'
+                }
+            }, 500
+
+    async def _location_request(self, request: Request, describe: str, lookup) -> Response:
+        """Shared body of get-timezone and current-time: geocode, then lookup(lat, lon, name) off the loop"""
+        data = request.get_json()
+        if not data:
+            return {'error': 'No JSON data provided', 'success': False}, 400
+
+        location = data.get('location', '').strip()
+        if not location:
+            return {'error': 'Location is required', 'success': False}, 400
+
+        logger.info(f"Getting {describe} for location: {location}")
+        try:
+            lat, lon, full_location = await self._geocode(location)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lookup, lat, lon, full_location), 200
+
+        except LocationError as e:
+            logger.warning(f"Location error: {str(e)}")
+            return {
+                'error': str(e),
+                'success': False,
+                'error_type': 'LocationError'
+            }, 404
+
+        except Exception as e:
+            error_msg = f'Error getting {describe} for {location}: {str(e)}'
+            logger.error(error_msg)
+            return {'error': error_msg, 'success': False}, 500
+
+    async def get_timezone(self, request: Request) -> Response:
+        def lookup(lat, lon, full_location):
+            timezone_str = get_services().timezone_manager.get_timezone_for_location(lat, lon)
+            return {
+                'location': full_location,
+                'latitude': lat,
+                'longitude': lon,
+                'timezone': timezone_str,
+                'success': True,
+                'enhanced_geocoding': True
+            }
+        return await self._location_request(request, 'timezone', lookup)
+
+    async def get_current_time(self, request: Request) -> Response:
+        def lookup(lat, lon, full_location):
+            dt_local, dt_utc, timezone_used = get_services().timezone_manager.get_current_time_for_location(lat, lon)
+            return {
+                'location': full_location,
+                'latitude': lat,
+                'longitude': lon,
+                'local_time': dt_local.isoformat(),
+                'utc_time': dt_utc.isoformat(),
+                'timezone': timezone_used,
+                'utc_offset': dt_local.strftime("%z") if hasattr(dt_local, 'strftime') else "Unknown",
+                'success': True,
+                'enhanced_processing': True
+            }
+        return await self._location_request(request, 'current time', lookup)
+
+    async def health_check(self, request: Request) -> Response:
+        """Same payload as /api/health in app.py, from the background health checks"""
+        health_status = {
+            'status': 'healthy',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'version': '2.0.0',
+            'serving_mode': 'asgi',
+            'services': get_health_prober().snapshot(),
+            'metrics': self.metrics.get_stats()
+        }
+        if self.require_license:
+            health_status['license'] = {'valid': self.license_status.get('valid', False),
+                                        'last_checked': self.license_status.get('last_checked')}
+
+        health_status['status'] = overall_status(health_status['services'])
+        return health_status, 503 if health_status['status'] == 'unhealthy' else 200
+
+    async def liveness_check(self, request: Request) -> Response:
+        return {'status': 'alive', 'timestamp': datetime.now(timezone.utc).isoformat()}, 200
+
+    async def readiness_check(self, request: Request) -> Response:
+        ready, services = get_health_prober().readiness()
+        return {
+            'status': 'ready' if ready else 'not_ready',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'services': services
+        }, 200 if ready else 503
+
+
+app = HoraryASGI()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is not installed: pip install uvicorn, then run uvicorn asgi_app:app")
+        exit(1)
+    logger.info("Starting Enhanced Traditional Horary Astrology ASGI API v2.0.0")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: batched calculate_charts versus the per-chart calculate_chart loop
+
+Usage:
+    python benchmarks/bench_calculate_charts.py --charts 2000
+    python benchmarks/bench_calculate_charts.py --charts 2000 --check
+
+Reports wall time for the array pass, for building HoraryChart objects from
+it, and for the equivalent calculate_chart loop. --check also verifies that
+the batched charts serialize like the loop's (floats within 1e-9).
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HORARY_DISABLE_AUTO_LOGGING', 'true')
+
+import pytz
+
+from horary_engine import EnhancedTraditionalAstrologicalCalculator, serialize_chart_for_frontend
+
+
+def build_corpus(n: int, seed: int = 0):
+    """Deterministic times (1900-2100) and locations"""
+    rng = random.Random(seed)
+    base = datetime.datetime(1900, 1, 1, tzinfo=pytz.UTC)
+    times = [base + datetime.timedelta(minutes=rng.randrange(0, 200 * 365 * 1440)) for _ in range(n)]
+    locations = [(rng.uniform(-60.0, 65.0), rng.uniform(-180.0, 180.0), f"site-{i}") for i in range(n)]
+    return times, locations
+
+
+def same_payload(a, b, tolerance: float = 1e-9) -> bool:
+    """Compare serialized charts, allowing float rounding differences"""
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= tolerance
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_payload(a[k], b[k], tolerance) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(same_payload(x, y, tolerance) for x, y in zip(a, b))
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched chart calculation')
+    parser.add_argument('--charts', type=int, default=1000, help='Number of charts (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed')
+    parser.add_argument('--check', action='store_true', help='Verify batch output against the loop')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    calculator = EnhancedTraditionalAstrologicalCalculator()
+    times, locations = build_corpus(args.charts, args.seed)
+
+    started = time.perf_counter()
+    batch = calculator.calculate_charts(times, locations)
+    batch_seconds = time.perf_counter() - started
+
+    # Each phase starts with a cold perfection cache
+    calculator.perfection_solver.clear()
+    started = time.perf_counter()
+    batch_charts = batch.to_charts()
+    build_seconds = time.perf_counter() - started
+
+    calculator.perfection_solver.clear()
+    started = time.perf_counter()
+    loop_charts = [
+        calculator.calculate_chart(dt, dt, str(dt.tzinfo), lat, lon, name)
+        for dt, (lat, lon, name) in zip(times, locations)
+    ]
+    loop_seconds = time.perf_counter() - started
+
+    result = {
+        "charts": args.charts,
+        "ephemeris_backend": calculator.ephemeris.name,
+        "batch_arrays_seconds": round(batch_seconds, 4),
+        "batch_build_charts_seconds": round(build_seconds, 4),
+        "loop_seconds": round(loop_seconds, 4),
+        "speedup_arrays": round(loop_seconds / batch_seconds, 2) if batch_seconds else None,
+        "speedup_with_charts": round(loop_seconds / (batch_seconds + build_seconds), 2),
+    }
+
+    if args.check:
+        mismatches = sum(
+            1 for a, b in zip(batch_charts, loop_charts)
+            if not same_payload(serialize_chart_for_frontend(a, a.solar_analyses),
+                                serialize_chart_for_frontend(b, b.solar_analyses))
+        )
+        result["mismatches"] = mismatches
+
+    print(json.dumps(result, indent=2))
+    return 1 if result.get("mismatches") else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: table-driven dignity scoring versus evaluating the rules per planet
+
+Usage:
+    python benchmarks/bench_dignity.py --planets 200000
+    python benchmarks/bench_dignity.py --planets 200000 --check
+
+Scores the same random (planet, sign, house, solar condition) placements
+three ways: the traditional rules evaluated per planet, the calculator's
+per-planet table lookup (_calculate_enhanced_dignity) and one array lookup
+over all placements. --check verifies that all three agree.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HORARY_DISABLE_AUTO_LOGGING', 'true')
+
+import numpy as np
+
+from horary_engine import EnhancedTraditionalAstrologicalCalculator, Sign, SolarCondition, SolarAnalysis
+
+
+def build_placements(calculator, n: int, seed: int = 0):
+    """Deterministic random placements with their solar analyses"""
+    rng = random.Random(seed)
+    planets = calculator.traditional_planets
+    signs = list(Sign)
+    conditions = list(SolarCondition)
+
+    placements = []
+    for _ in range(n):
+        planet = rng.choice(planets)
+        condition = rng.choice(conditions)
+        analysis = SolarAnalysis(
+            planet=planet,
+            distance_from_sun=0.0,
+            condition=condition,
+            exact_cazimi=condition == SolarCondition.CAZIMI and rng.random() < 0.2,
+            traditional_exception=condition != SolarCondition.CAZIMI and rng.random() < 0.2
+        )
+        placements.append((planet, rng.choice(signs), rng.randint(1, 12), analysis))
+    return placements
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark table-driven dignity scoring')
+    parser.add_argument('--planets', type=int, default=100000, help='Number of placements (default: 100000)')
+    parser.add_argument('--seed', type=int, default=0, help='Placement seed')
+    parser.add_argument('--check', action='store_true', help='Verify the three methods agree')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    calculator = EnhancedTraditionalAstrologicalCalculator()
+    placements = build_placements(calculator, args.planets, args.seed)
+
+    started = time.perf_counter()
+    rule_scores = [calculator._essential_dignity(planet, sign, house) + calculator._solar_dignity(analysis)
+                   for planet, sign, house, analysis in placements]
+    rules_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lookup_scores = [calculator._calculate_enhanced_dignity(planet, sign, house, analysis)
+                     for planet, sign, house, analysis in placements]
+    lookup_seconds = time.perf_counter() - started
+
+    # Index arrays as the batch path holds them
+    planet_index = np.array([calculator._planet_index[p[0]] for p in placements])
+    sign_index = np.array([calculator._sign_index[p[1]] for p in placements])
+    house = np.array([p[2] for p in placements])
+    condition = np.array([calculator._solar_index[p[3].condition] for p in placements])
+    exact = np.array([p[3].exact_cazimi for p in placements], dtype=np.int64)
+    exception = np.array([p[3].traditional_exception for p in placements], dtype=np.int64)
+
+    started = time.perf_counter()
+    array_scores = (calculator.dignity_table[planet_index, sign_index, house] +
+                    calculator.solar_dignity_table[condition, exact, exception])
+    array_seconds = time.perf_counter() - started
+
+    result = {
+        "planets": args.planets,
+        "rules_seconds": round(rules_seconds, 4),
+        "lookup_seconds": round(lookup_seconds, 4),
+        "array_seconds": round(array_seconds, 4),
+        "speedup_lookup": round(rules_seconds / lookup_seconds, 2) if lookup_seconds else None,
+        "speedup_array": round(rules_seconds / array_seconds, 2) if array_seconds else None,
+    }
+
+    if args.check:
+        result["mismatches"] = sum(
+            1 for a, b, c in zip(rule_scores, lookup_scores, array_scores.tolist())
+            if not a == b == c
+        )
+
+    print(json.dumps(result, indent=2))
+    return 1 if result.get("mismatches") else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: horary engine hot paths against a fixed chart corpus
+
+Usage:
+    python benchmarks/bench_engine.py
+    python benchmarks/bench_engine.py --charts 100 --repeat 5 --output results.json
+    python benchmarks/bench_engine.py --baseline benchmarks/baselines/engine.json
+    python benchmarks/bench_engine.py --baseline benchmarks/baselines/engine.json --stage-threshold judge=0.5
+    python benchmarks/bench_engine.py --save-baseline benchmarks/baselines/engine.json
+
+Times each stage per chart over a deterministic corpus (--charts dates from
+1900-2100, coordinates, time zones and questions from --seed):
+    calculate_chart          EnhancedTraditionalAstrologicalCalculator.calculate_chart
+    enhanced_aspects         _calculate_enhanced_aspects on the chart's planets
+    moon_void_of_course      _is_moon_void_of_course_enhanced
+    serialize_chart          serialize_chart_for_frontend
+    judge                    HoraryEngine.judge (shared=False: no response cache
+                             or coalescing, so every call computes)
+
+Geocoding answers from the corpus and every chart carries an explicit
+Etc/GMT time zone, so no network, gazetteer or timezone grid is involved.
+Each stage runs once to warm up, then --repeat passes; later passes see
+the engine's own warm caches, as a long-running server would.
+
+Prints JSON with per-stage call counts, mean/p50/p95/min milliseconds and
+calls per second. With --baseline the chosen --metric is compared per
+stage: a stage regresses when current / baseline exceeds 1 + its
+threshold (--threshold, a "thresholds" map in the baseline file, then
+--stage-threshold, in increasing precedence). The exit status is 1 on any
+regression. Baselines record the machine they were taken on; compare on
+the same kind of machine.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HORARY_DISABLE_AUTO_LOGGING', 'true')
+
+import horary_engine
+from horary_engine import HoraryEngine, serialize_chart_for_frontend
+
+
+STAGES = ('calculate_chart', 'enhanced_aspects', 'moon_void_of_course', 'serialize_chart', 'judge')
+METRICS = ('p50_ms', 'mean_ms', 'min_ms', 'p95_ms')
+
+QUESTIONS = [
+    "Will I get the job?",
+    "Where is my lost ring?",
+    "Will we marry?",
+    "Will my father recover from his illness?",
+    "Should I take the trip abroad?",
+    "Will I win the lawsuit?",
+    "Am I pregnant?",
+    "Will the house sell this year?",
+]
+
+
+def build_corpus(n: int, seed: int = 0):
+    """Deterministic chart requests: (question, settings, (lat, lon, name))"""
+    rng = random.Random(seed)
+    base = datetime.datetime(1900, 1, 1)
+    corpus = []
+    for i in range(n):
+        moment = base + datetime.timedelta(minutes=rng.randrange(0, 200 * 365 * 1440))
+        lat, lon = round(rng.uniform(-55.0, 65.0), 4), round(rng.uniform(-180.0, 180.0), 4)
+        offset = int(round(lon / 15.0))
+        timezone = "Etc/GMT" if offset == 0 else f"Etc/GMT{-offset:+d}"  # Etc/GMT+5 is UTC-5
+        name = f"Benchmark Site {i}"
+        settings = {
+            "location": name,
+            "date": moment.strftime("%Y-%m-%d"),
+            "time": moment.strftime("%H:%M"),
+            "timezone": timezone,
+            "use_current_time": False,
+            "manual_houses": None,
+            "ignore_radicality": False,
+            "ignore_void_moon": False,
+            "ignore_combustion": False,
+            "ignore_saturn_7th": False,
+            "exaltation_confidence_boost": 15.0
+        }
+        corpus.append((QUESTIONS[i % len(QUESTIONS)], settings, (lat, lon, name)))
+    return corpus
+
+
+def corpus_fingerprint(corpus) -> str:
+    blob = json.dumps([[q, s, loc] for q, s, loc in corpus], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def stub_geocoding(corpus) -> None:
+    """Answer geocoding from the corpus instead of the gazetteer, cache or Nominatim"""
+    places = {name: (lat, lon, name) for _, _, (lat, lon, name) in corpus}
+
+    def lookup(location_string):
+        if location_string not in places:
+            raise horary_engine.LocationError(f"Location not in benchmark corpus: {location_string}")
+        return places[location_string]
+
+    def safe_geocode_async(location_string, timeout=10):
+        future = Future()
+        try:
+            future.set_result(lookup(location_string))
+        except horary_engine.LocationError as e:
+            future.set_exception(e)
+        return future
+
+    horary_engine.safe_geocode_async = safe_geocode_async
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "per_second": round(len(ordered) / total, 2) if total else None
+    }
+
+
+def time_stage(calls, repeat: int):
+    """Per-call durations over repeat passes, after one warm-up pass"""
+    for call in calls:
+        call()
+    durations = []
+    for _ in range(repeat):
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            durations.append(time.perf_counter() - started)
+    return durations
+
+
+def stage_calls(engine, corpus, stage: str):
+    """One zero-argument callable per corpus chart for a stage"""
+    judgment_engine = engine.engine
+    calculator = judgment_engine.calculator
+    timezone_manager = judgment_engine.timezone_manager
+
+    if stage == 'judge':
+        return [lambda q=question, s=settings: engine.judge(q, s, shared=False)
+                for question, settings, _ in corpus]
+
+    charts = []
+    for _, settings, (lat, lon, name) in corpus:
+        dt_local, dt_utc, timezone_used = timezone_manager.parse_datetime_with_timezone(
+            settings["date"], settings["time"], settings["timezone"], lat, lon)
+        charts.append(((dt_local, dt_utc, timezone_used, lat, lon, name),
+                       calculator.calculate_chart(dt_local, dt_utc, timezone_used, lat, lon, name)))
+
+    if stage == 'calculate_chart':
+        return [lambda a=args: calculator.calculate_chart(*a) for args, _ in charts]
+    if stage == 'enhanced_aspects':
+        return [lambda c=chart: calculator._calculate_enhanced_aspects(c.planets, c.julian_day)
+                for _, chart in charts]
+    if stage == 'moon_void_of_course':
+        return [lambda c=chart: judgment_engine._is_moon_void_of_course_enhanced(c) for _, chart in charts]
+    if stage == 'serialize_chart':
+        return [lambda c=chart: serialize_chart_for_frontend(c, c.solar_analyses) for _, chart in charts]
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def environment(engine):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+        "ephemeris_backend": engine.engine.calculator.ephemeris.name
+    }
+
+
+def compare(results, baseline, metric: str, default_threshold: float, stage_thresholds):
+    """Per-stage ratio to the baseline and whether it exceeds the stage's threshold"""
+    thresholds = dict(baseline.get("thresholds", {}))
+    thresholds.update(stage_thresholds)
+    comparison = {}
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or not previous.get(metric):
+            comparison[stage] = {"baseline": None, "current": current[metric], "regressed": False}
+            continue
+        threshold = thresholds.get(stage, default_threshold)
+        ratio = current[metric] / previous[metric]
+        comparison[stage] = {
+            "baseline": previous[metric],
+            "current": current[metric],
+            "ratio": round(ratio, 3),
+            "threshold": threshold,
+            "regressed": ratio > 1.0 + threshold
+        }
+
+    warnings = []
+    if baseline.get("corpus", {}).get("fingerprint") != results["corpus"]["fingerprint"]:
+        warnings.append("baseline was measured on a different corpus (--charts/--seed)")
+    for key in ("python", "machine", "cpu_count", "ephemeris_backend"):
+        if baseline.get("environment", {}).get(key) != results["environment"].get(key):
+            warnings.append(f"baseline environment differs: {key}")
+    return comparison, warnings
+
+
+def parse_stage_thresholds(values):
+    thresholds = {}
+    for value in values:
+        stage, _, threshold = value.partition('=')
+        if stage not in STAGES or not threshold:
+            raise argparse.ArgumentTypeError(f"Expected STAGE=FRACTION with a stage from {', '.join(STAGES)}: {value}")
+        thresholds[stage] = float(threshold)
+    return thresholds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the horary engine hot paths')
+    parser.add_argument('--charts', type=int, default=50, help='Corpus size (default: 50)')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes per stage (default: 3)')
+    parser.add_argument('--stages', type=str, default=','.join(STAGES),
+                        help=f'Comma-separated stages (default: all of {",".join(STAGES)})')
+    parser.add_argument('--output', type=str, help='Also write the results JSON here')
+    parser.add_argument('--baseline', type=str, help='Baseline results JSON to compare against')
+    parser.add_argument('--save-baseline', type=str, help='Write these results as a new baseline')
+    parser.add_argument('--metric', choices=METRICS, default='p50_ms', help='Statistic compared (default: p50_ms)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown as a fraction of the baseline (default: 0.25)')
+    parser.add_argument('--stage-threshold', action='append', default=[], metavar='STAGE=FRACTION',
+                        help='Allowed slowdown for one stage (repeatable)')
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+    stage_thresholds = parse_stage_thresholds(args.stage_threshold)
+
+    logging.disable(logging.INFO)
+    corpus = build_corpus(args.charts, args.seed)
+    stub_geocoding(corpus)
+    engine = HoraryEngine()
+
+    results = {
+        "benchmark": "engine",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "corpus": {"charts": args.charts, "seed": args.seed, "fingerprint": corpus_fingerprint(corpus)},
+        "repeat": args.repeat,
+        "environment": environment(engine),
+        "stages": {}
+    }
+    for stage in stages:
+        results["stages"][stage] = summarize(time_stage(stage_calls(engine, corpus, stage), args.repeat))
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison, warnings = compare(results, baseline, args.metric, args.threshold, stage_thresholds)
+        regressions = sorted(stage for stage, entry in comparison.items() if entry["regressed"])
+        results["comparison"] = {"baseline": args.baseline, "metric": args.metric, "stages": comparison,
+                                 "regressions": regressions, "warnings": warnings}
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        baseline = {key: value for key, value in results.items() if key != "comparison"}
+        baseline["thresholds"] = stage_thresholds
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+    return status
+
+
+if __name__ == '__main__':
+    exit(main())
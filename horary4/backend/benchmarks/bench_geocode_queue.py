@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: rate-limited geocoding queue versus direct web geocoder calls
+
+Usage:
+    python benchmarks/bench_geocode_queue.py --requests 60 --clients 8 --rate 10
+    python benchmarks/bench_geocode_queue.py --requests 200 --locations 40 --rate 20 --latency 0.02
+
+Runs against the local Nominatim stand-in (benchmarks/nominatim_standin.py),
+which answers 429 above --rate requests per second. Client threads ask for
+--locations distinct places, --requests times in total, first by calling
+the geocoder directly and then through GeocodeScheduler. Reports
+throughput, latency percentiles, failures and how many requests the server
+saw and rejected.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('HORARY_DISABLE_AUTO_LOGGING', 'true')
+
+from geopy.geocoders import Nominatim
+
+from horary_geoqueue import GeocodeScheduler
+from nominatim_standin import start_standin
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def run(queries, clients, lookup):
+    """Issue queries from client threads; returns latencies, failures and wall time"""
+    latencies, failures = [], []
+    lock = threading.Lock()
+    work = list(queries)
+
+    def client():
+        while True:
+            with lock:
+                if not work:
+                    return
+                query = work.pop()
+            started = time.perf_counter()
+            try:
+                lookup(query)
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                with lock:
+                    failures.append(type(e).__name__)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures, time.perf_counter() - started
+
+
+def summarize(latencies, failures, seconds, state_before, state):
+    return {
+        "succeeded": len(latencies),
+        "failed": len(failures),
+        "seconds": round(seconds, 3),
+        "throughput_per_second": round(len(latencies) / seconds, 2) if seconds else None,
+        "latency_p50": round(percentile(latencies, 0.5) or 0.0, 4),
+        "latency_p95": round(percentile(latencies, 0.95) or 0.0, 4),
+        "server_requests": state["requests"] - state_before["requests"],
+        "server_rate_limited": state["rate_limited"] - state_before["rate_limited"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the rate-limited geocoding queue')
+    parser.add_argument('--requests', type=int, default=60, help='Lookups in total (default: 60)')
+    parser.add_argument('--locations', type=int, default=20, help='Distinct locations (default: 20)')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads (default: 8)')
+    parser.add_argument('--rate', type=float, default=10.0, help='Server policy and queue rate per second')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stand-in answer latency in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Query order seed')
+    args = parser.parse_args()
+
+    server, state = start_standin(0, args.latency, args.rate)
+    geocoder = Nominatim(user_agent="horary_benchmark", domain=f"127.0.0.1:{server.server_address[1]}",
+                         scheme="http")
+
+    rng = random.Random(args.seed)
+    places = [f"Benchmark Town {i}" for i in range(args.locations)]
+    queries = [rng.choice(places) for _ in range(args.requests)]
+
+    def direct(query):
+        location = geocoder.geocode(query, timeout=10)
+        if location is None:
+            raise LookupError(query)
+
+    before = dict(state.counts)
+    direct_result = summarize(*run(queries, args.clients, direct), before, state.counts)
+    time.sleep(1.0 / args.rate)
+
+    scheduler = GeocodeScheduler(rate_per_second=args.rate, workers=1, max_pending=10000)
+
+    def queued(query):
+        scheduler.submit(query, lambda: direct(query)).result(timeout=600)
+
+    before = dict(state.counts)
+    queued_result = summarize(*run(queries, args.clients, queued), before, state.counts)
+    queued_result["deduplicated"] = scheduler.stats()["deduplicated"]
+    queued_result["avg_queue_wait_seconds"] = scheduler.stats()["avg_queue_wait_seconds"]
+
+    server.shutdown()
+    print(json.dumps({
+        "requests": args.requests,
+        "locations": args.locations,
+        "clients": args.clients,
+        "rate_per_second": args.rate,
+        "direct": direct_result,
+        "queued": queued_result
+    }, indent=2))
+    return 1 if queued_result["server_rate_limited"] else 0
+
+
+if __name__ == '__main__':
+    exit(main())
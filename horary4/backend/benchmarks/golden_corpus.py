@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Golden chart corpus: reference charts and judgments, and a differential
+check of any other engine configuration against them
+
+Usage:
+    python benchmarks/golden_corpus.py build --charts 2000
+    python benchmarks/golden_corpus.py check
+    python benchmarks/golden_corpus.py check --set ephemeris.backend=tables
+    python benchmarks/golden_corpus.py check --config alternative.yaml --path batch --output report.json
+
+build judges a deterministic corpus (the bench_engine.py corpus: --charts
+dates from 1900-2100, coordinates, time zones and questions from --seed)
+with the reference configuration (horary_constants.yaml unless --config or
+--set say otherwise) and stores, per chart:
+    planets     longitude, latitude, speed, house, sign, retrograde, dignity
+    houses      the twelve cusps, ascendant and midheaven
+    aspects     planet pair, aspect, applying and orb
+    moon        the Moon's last and next aspect (planet and aspect)
+    judgment, confidence and reasoning
+as gzipped JSON lines (a header line, then one line per chart) in
+benchmarks/golden/charts.jsonl.gz by default. Floats are rounded to 1e-7.
+
+check recomputes the corpus with an alternative configuration and compares
+it field by field with the golden file: longitudes, latitudes, cusps and
+orbs within --tolerance degrees, speeds within --speed-tolerance degrees a
+day, everything else exactly. Reasoning is compared as codes: the text
+with its decimal numbers replaced by '#', so a line reading "Ascendant at
+3.5°" against "Ascendant at 3.6°" is the same code (the positions behind
+it are compared with tolerance on their own), while a different or missing
+line is a mismatch. Engine paths (--path):
+    engine      HoraryEngine.judge per chart (shared=False: no response
+                cache or coalescing)
+    batch       charts from one vectorized calculate_charts pass, judged by
+                the same HoraryEngine.judge
+The reference configuration is run again on this machine for the speedup
+(--no-reference-run uses the time recorded by build instead). Every run is
+a fresh process, so no module state carries over between configurations.
+
+Prints a JSON report with mismatch counts and the largest difference per
+field, the first --examples mismatches and the timing of both runs. The
+exit status is 1 on any mismatch.
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('HORARY_DISABLE_AUTO_LOGGING', 'true')
+
+DEFAULT_GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'charts.jsonl.gz')
+DEFAULT_CONFIG = os.path.join(BACKEND_DIR, 'horary_constants.yaml')
+FORMAT_VERSION = 1
+PATHS = ('engine', 'batch')
+
+# Order of the values stored per planet
+PLANET_FIELDS = ('longitude', 'latitude', 'speed', 'house', 'sign', 'retrograde', 'dignity')
+
+FIELDS = ('errors', 'judgment', 'confidence', 'reasoning', 'longitude', 'latitude', 'speed',
+          'placement', 'houses', 'aspects', 'aspect_orbs', 'moon_aspects')
+
+_DECIMAL = re.compile(r'\d+\.\d+')
+
+
+def reasoning_code(line: str) -> str:
+    return _DECIMAL.sub('#', line)
+
+
+def _round(value: float) -> float:
+    return round(float(value), 7)
+
+
+# ---------------------------------------------------------------------------
+# Replay: compute the corpus under the configuration of this process
+# ---------------------------------------------------------------------------
+
+def chart_record(chart):
+    return {
+        'planets': {planet.value: [_round(pos.longitude), _round(pos.latitude), _round(pos.speed), pos.house,
+                                   pos.sign.sign_name, bool(pos.retrograde), pos.dignity_score]
+                    for planet, pos in chart.planets.items()},
+        'houses': [_round(cusp) for cusp in chart.houses] + [_round(chart.ascendant), _round(chart.midheaven)],
+        'aspects': [[a.planet1.value, a.planet2.value, a.aspect.display_name, bool(a.applying), _round(a.orb)]
+                    for a in chart.aspects],
+        'moon': [f"{lunar.aspect.display_name} {lunar.planet.value}" if lunar else None
+                 for lunar in (chart.moon_last_aspect, chart.moon_next_aspect)]
+    }
+
+
+def judgment_record(result, chart):
+    record = chart_record(chart) if chart is not None else {}
+    if result.get('error'):
+        record['error'] = str(result['error'])
+    record.update({
+        'judgment': result.get('judgment'),
+        'confidence': result.get('confidence'),
+        'reasoning': list(result.get('reasoning') or [])
+    })
+    return record
+
+
+def replay(charts: int, seed: int, path: str):
+    """Judge the corpus in this process; returns (header, records)"""
+    logging.disable(logging.INFO)
+    from bench_engine import build_corpus, corpus_fingerprint, environment, stub_geocoding
+    from horary_config import config_hash
+    from horary_engine import HoraryEngine
+
+    corpus = build_corpus(charts, seed)
+    stub_geocoding(corpus)
+    engine = HoraryEngine()
+    calculator = engine.engine.calculator
+    timezone_manager = engine.engine.timezone_manager
+    calculate_chart = calculator.calculate_chart
+    computed = {}
+
+    started = time.perf_counter()
+    if path == 'batch':
+        moments = [timezone_manager.parse_datetime_with_timezone(
+            settings['date'], settings['time'], settings['timezone'], lat, lon)[0]
+            for _, settings, (lat, lon, _) in corpus]
+        batch = calculator.calculate_charts(moments, [location for _, _, location in corpus], build_charts=True)
+        prepared = {chart.location_name: chart for chart in batch}
+
+        def serve_chart(dt_local, dt_utc, timezone_info, lat, lon, location_name):
+            chart = prepared.get(location_name)
+            if chart is None:
+                chart = calculate_chart(dt_local, dt_utc, timezone_info, lat, lon, location_name)
+            computed[location_name] = chart
+            return chart
+    else:
+        def serve_chart(dt_local, dt_utc, timezone_info, lat, lon, location_name):
+            chart = computed[location_name] = calculate_chart(dt_local, dt_utc, timezone_info, lat, lon, location_name)
+            return chart
+
+    calculator.calculate_chart = serve_chart
+    results = [engine.judge(question, settings, shared=False) for question, settings, _ in corpus]
+    seconds = time.perf_counter() - started
+
+    records = [judgment_record(result, computed.get(name))
+               for result, (_, _, (_, _, name)) in zip(results, corpus)]
+    header = {
+        'format': FORMAT_VERSION,
+        'corpus': {'charts': charts, 'seed': seed, 'fingerprint': corpus_fingerprint(corpus)},
+        'path': path,
+        'config_hash': config_hash(),
+        'environment': environment(engine),
+        'timing': {'seconds': round(seconds, 4), 'per_chart_ms': round(seconds / charts * 1000, 4)}
+    }
+    return header, records
+
+
+def write_records(filename: str, header, records) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    with open(filename, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+        for entry in [header] + records:
+            f.write((json.dumps(entry, separators=(',', ':')) + "\n").encode('utf-8'))
+
+
+def read_records(filename: str):
+    with gzip.open(filename, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Configurations and child processes
+# ---------------------------------------------------------------------------
+
+def parse_overrides(values):
+    """KEY.PATH=VALUE pairs; values are parsed as YAML scalars ("true", "1.5", "tables")"""
+    overrides = []
+    for value in values:
+        key, separator, raw = value.partition('=')
+        if not separator or not key:
+            raise argparse.ArgumentTypeError(f"Expected KEY.PATH=VALUE: {value}")
+        overrides.append((key.split('.'), yaml.safe_load(raw)))
+    return overrides
+
+
+def write_config(base: str, overrides, directory: str, name: str) -> str:
+    """The base YAML file with overrides applied, or the base itself without overrides"""
+    if not overrides:
+        return os.path.abspath(base)
+    with open(base, encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    for keys, value in overrides:
+        section = config
+        for key in keys[:-1]:
+            section = section.setdefault(key, {})
+        section[keys[-1]] = value
+    filename = os.path.join(directory, f"{name}.yaml")
+    with open(filename, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return filename
+
+
+def run_replay(config: str, charts: int, seed: int, path: str, directory: str, name: str):
+    """Replay in a fresh interpreter with HORARY_CONFIG pointing at config"""
+    output = os.path.join(directory, f"{name}.jsonl.gz")
+    env = dict(os.environ, HORARY_CONFIG=config)
+    command = [sys.executable, os.path.abspath(__file__), 'replay', '--charts', str(charts),
+               '--seed', str(seed), '--path', path, '--output', output]
+    completed = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Replay of {name} failed:\n{completed.stderr[-4000:]}")
+    return read_records(output)
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def _angle(a: float, b: float) -> float:
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+class Differences:
+    """Mismatch counts, largest differences and the first examples per field"""
+
+    def __init__(self, max_examples: int):
+        self.counts = {field: 0 for field in FIELDS}
+        self.largest = {}
+        self.examples = []
+        self.max_examples = max_examples
+        self.charts = set()
+
+    def measure(self, field: str, difference: float) -> None:
+        self.largest[field] = max(self.largest.get(field, 0.0), difference)
+
+    def add(self, chart: int, field: str, expected, actual, detail: str = None) -> None:
+        self.counts[field] += 1
+        self.charts.add(chart)
+        if len(self.examples) < self.max_examples:
+            example = {'chart': chart, 'field': field, 'expected': expected, 'actual': actual}
+            if detail:
+                example['detail'] = detail
+            self.examples.append(example)
+
+    def summary(self):
+        return {field: {'mismatches': count, 'max_difference': self.largest.get(field)}
+                for field, count in self.counts.items()}
+
+
+def compare_chart(index: int, expected, actual, tolerance: float, speed_tolerance: float,
+                  differences: Differences) -> None:
+    if expected.get('error') or actual.get('error'):
+        if expected.get('error') != actual.get('error'):
+            differences.add(index, 'errors', expected.get('error'), actual.get('error'))
+        return
+
+    for field in ('judgment', 'confidence'):
+        if expected[field] != actual[field]:
+            differences.add(index, field, expected[field], actual[field])
+    expected_codes = [reasoning_code(line) for line in expected['reasoning']]
+    actual_codes = [reasoning_code(line) for line in actual['reasoning']]
+    if expected_codes != actual_codes:
+        missing = [line for line, code in zip(expected['reasoning'], expected_codes) if code not in actual_codes]
+        extra = [line for line, code in zip(actual['reasoning'], actual_codes) if code not in expected_codes]
+        differences.add(index, 'reasoning', missing, extra, None if missing or extra else "order differs")
+
+    for planet, values in expected['planets'].items():
+        other = actual['planets'].get(planet)
+        if other is None:
+            differences.add(index, 'placement', values, None, planet)
+            continue
+        for field, difference, limit in (('longitude', _angle(values[0], other[0]), tolerance),
+                                         ('latitude', abs(values[1] - other[1]), tolerance),
+                                         ('speed', abs(values[2] - other[2]), speed_tolerance)):
+            differences.measure(field, difference)
+            if difference > limit:
+                differences.add(index, field, values[PLANET_FIELDS.index(field)],
+                                other[PLANET_FIELDS.index(field)], planet)
+        if values[3:] != other[3:]:
+            differences.add(index, 'placement', dict(zip(PLANET_FIELDS[3:], values[3:])),
+                            dict(zip(PLANET_FIELDS[3:], other[3:])), planet)
+
+    difference = max(_angle(a, b) for a, b in zip(expected['houses'], actual['houses']))
+    differences.measure('houses', difference)
+    if len(expected['houses']) != len(actual['houses']) or difference > tolerance:
+        differences.add(index, 'houses', expected['houses'], actual['houses'])
+
+    expected_aspects = {tuple(a[:3]): a[3:] for a in expected['aspects']}
+    actual_aspects = {tuple(a[:3]): a[3:] for a in actual['aspects']}
+    if expected_aspects.keys() != actual_aspects.keys():
+        differences.add(index, 'aspects', sorted(expected_aspects.keys() - actual_aspects.keys()),
+                        sorted(actual_aspects.keys() - expected_aspects.keys()))
+    for key in expected_aspects.keys() & actual_aspects.keys():
+        (applying, orb), (other_applying, other_orb) = expected_aspects[key], actual_aspects[key]
+        if applying != other_applying:
+            differences.add(index, 'aspects', list(key) + [applying], list(key) + [other_applying])
+        differences.measure('aspect_orbs', abs(orb - other_orb))
+        if abs(orb - other_orb) > tolerance:
+            differences.add(index, 'aspect_orbs', orb, other_orb, ' '.join(key))
+
+    if expected['moon'] != actual['moon']:
+        differences.add(index, 'moon_aspects', expected['moon'], actual['moon'])
+
+
+def compare(golden, alternative, tolerance: float, speed_tolerance: float, max_examples: int) -> Differences:
+    differences = Differences(max_examples)
+    for index, (expected, actual) in enumerate(zip(golden, alternative)):
+        compare_chart(index, expected, actual, tolerance, speed_tolerance, differences)
+    return differences
+
+
+# ---------------------------------------------------------------------------
+# Commands
+# ---------------------------------------------------------------------------
+
+def command_replay(args) -> int:
+    header, records = replay(args.charts, args.seed, args.path)
+    write_records(args.output, header, records)
+    return 0
+
+
+def command_build(args) -> int:
+    with tempfile.TemporaryDirectory(prefix='golden-') as directory:
+        config = write_config(args.config, parse_overrides(args.set), directory, 'reference')
+        header, records = run_replay(config, args.charts, args.seed, 'engine', directory, 'reference')
+    header['created'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    header['overrides'] = args.set
+    write_records(args.output, header, records)
+    print(json.dumps({key: header[key] for key in ('corpus', 'config_hash', 'timing')}, indent=2))
+    print(f"Wrote {len(records)} charts to {args.output} ({os.path.getsize(args.output)} bytes)", file=sys.stderr)
+    return 0
+
+
+def command_check(args) -> int:
+    golden_header, golden = read_records(args.golden)
+    if golden_header.get('format') != FORMAT_VERSION:
+        raise SystemExit(f"{args.golden}: unsupported golden format {golden_header.get('format')}")
+    charts, seed = golden_header['corpus']['charts'], golden_header['corpus']['seed']
+
+    with tempfile.TemporaryDirectory(prefix='golden-') as directory:
+        config = write_config(args.config, parse_overrides(args.set), directory, 'alternative')
+        alternative_header, alternative = run_replay(config, charts, seed, args.path, directory, 'alternative')
+        if args.no_reference_run:
+            reference_timing, reference_source = golden_header['timing'], 'build'
+        else:
+            reference_header, _ = run_replay(DEFAULT_CONFIG, charts, seed, 'engine', directory, 'reference')
+            reference_timing, reference_source = reference_header['timing'], 'rerun'
+
+    warnings = []
+    if alternative_header['corpus']['fingerprint'] != golden_header['corpus']['fingerprint']:
+        warnings.append("corpus differs from the golden file's (bench_engine.build_corpus changed)")
+    if not args.no_reference_run and reference_header['config_hash'] != golden_header['config_hash']:
+        warnings.append("horary_constants.yaml changed since the golden file was built")
+    if alternative_header['config_hash'] == golden_header['config_hash'] and args.path == 'engine':
+        warnings.append("alternative configuration is the reference configuration")
+    if reference_source == 'build':
+        for key in ('python', 'machine', 'cpu_count'):
+            if golden_header['environment'].get(key) != alternative_header['environment'].get(key):
+                warnings.append(f"speedup against build timing from a different environment: {key}")
+
+    differences = compare(golden, alternative, args.tolerance, args.speed_tolerance, args.examples)
+    report = {
+        'golden': {'file': args.golden, 'corpus': golden_header['corpus'],
+                   'config_hash': golden_header['config_hash'],
+                   'ephemeris_backend': golden_header['environment']['ephemeris_backend']},
+        'alternative': {'config': args.config, 'overrides': args.set, 'path': args.path,
+                        'config_hash': alternative_header['config_hash'],
+                        'ephemeris_backend': alternative_header['environment']['ephemeris_backend']},
+        'tolerance': {'degrees': args.tolerance, 'speed': args.speed_tolerance},
+        'charts': len(golden),
+        'charts_mismatched': len(differences.charts),
+        'fields': differences.summary(),
+        'examples': differences.examples,
+        'timing': {
+            'reference': dict(reference_timing, source=reference_source),
+            'alternative': alternative_header['timing'],
+            'speedup': round(reference_timing['seconds'] / alternative_header['timing']['seconds'], 3)
+            if alternative_header['timing']['seconds'] else None
+        },
+        'warnings': warnings
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+    return 1 if differences.charts else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Golden chart corpus and differential checker')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    build = commands.add_parser('build', help='Compute the golden corpus with the reference configuration')
+    build.add_argument('--charts', type=int, default=2000, help='Corpus size (default: 2000)')
+    build.add_argument('--seed', type=int, default=0, help='Corpus seed (default: 0)')
+    build.add_argument('--output', type=str, default=DEFAULT_GOLDEN, help='Golden file to write')
+
+    check = commands.add_parser('check', help='Compare an alternative configuration with the golden corpus')
+    check.add_argument('--golden', type=str, default=DEFAULT_GOLDEN, help='Golden file to compare against')
+    check.add_argument('--path', choices=PATHS, default='engine', help='Engine path (default: engine)')
+    check.add_argument('--tolerance', type=float, default=1e-3,
+                       help='Allowed difference in degrees for positions, cusps and orbs (default: 0.001)')
+    check.add_argument('--speed-tolerance', type=float, default=1e-3,
+                       help='Allowed difference in degrees a day for speeds (default: 0.001)')
+    check.add_argument('--examples', type=int, default=20, help='Mismatches listed in the report (default: 20)')
+    check.add_argument('--no-reference-run', action='store_true',
+                       help='Take the reference time from the golden file instead of running it again')
+    check.add_argument('--output', type=str, help='Also write the report JSON here')
+
+    for command in (build, check):
+        command.add_argument('--config', type=str, default=DEFAULT_CONFIG,
+                             help='Configuration YAML (default: horary_constants.yaml)')
+        command.add_argument('--set', action='append', default=[], metavar='KEY.PATH=VALUE',
+                             help='Override one configuration value (repeatable)')
+
+    replay_command = commands.add_parser('replay', help='Compute the corpus in this process (used by build and check)')
+    replay_command.add_argument('--charts', type=int, required=True)
+    replay_command.add_argument('--seed', type=int, required=True)
+    replay_command.add_argument('--path', choices=PATHS, default='engine')
+    replay_command.add_argument('--output', type=str, required=True)
+
+    args = parser.parse_args()
+    handlers = {'build': command_build, 'check': command_check, 'replay': command_replay}
+    return handlers[args.command](args)
+
+
+if __name__ == '__main__':
+    exit(main())
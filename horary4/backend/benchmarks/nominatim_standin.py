@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the Nominatim search API, for offline tests and benchmarks
+
+Usage:
+    python benchmarks/nominatim_standin.py --port 8089 --latency 0.05 --policy-rate 1
+
+Answers GET /search?q=...&format=json like Nominatim with deterministic
+made-up coordinates (queries containing "nowhere" are not found). Like the
+real service it rejects clients that exceed --policy-rate requests per
+second with HTTP 429. Point a geopy Nominatim client at it with
+domain="127.0.0.1:8089", scheme="http".
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StandinState:
+    """Request counters and the rate policy shared by all handler threads"""
+
+    def __init__(self, latency: float = 0.05, policy_rate: float = 1.0):
+        self.latency = latency
+        self.min_interval = 1.0 / policy_rate if policy_rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.last_accepted = 0.0
+        self.counts = {"requests": 0, "found": 0, "not_found": 0, "rate_limited": 0}
+
+    def admit(self) -> bool:
+        """Whether a request arriving now respects the rate policy (small jitter allowed)"""
+        with self.lock:
+            self.counts["requests"] += 1
+            now = time.monotonic()
+            if now - self.last_accepted < self.min_interval * 0.9:
+                self.counts["rate_limited"] += 1
+                return False
+            self.last_accepted = now
+            return True
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+
+def place_for(query: str):
+    """Deterministic fake place for a query, or None"""
+    normalized = " ".join(query.lower().split())
+    if "nowhere" in normalized:
+        return None
+    digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+    lat = int.from_bytes(digest[:4], "big") / 2 ** 32 * 120.0 - 55.0
+    lon = int.from_bytes(digest[4:8], "big") / 2 ** 32 * 360.0 - 180.0
+    return {
+        "place_id": int.from_bytes(digest[8:12], "big"),
+        "lat": f"{lat:.7f}",
+        "lon": f"{lon:.7f}",
+        "display_name": f"{query.title()}, Stand-in Country",
+        "boundingbox": [f"{lat - 0.1:.7f}", f"{lat + 0.1:.7f}", f"{lon - 0.1:.7f}", f"{lon + 0.1:.7f}"],
+        "class": "place",
+        "type": "city",
+        "importance": 0.5
+    }
+
+
+def make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path not in ("/search", "/search.php"):
+                self._send(404, {"error": "not found"})
+                return
+            if not state.admit():
+                self._send(429, {"error": "Too Many Requests"})
+                return
+
+            time.sleep(state.latency)
+            place = place_for(parse_qs(url.query).get("q", [""])[0])
+            state.count("found" if place else "not_found")
+            self._send(200, [place] if place else [])
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_standin(port: int = 0, latency: float = 0.05, policy_rate: float = 1.0):
+    """Serve in a background thread; returns (server, state). port=0 picks a free port."""
+    state = StandinState(latency, policy_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="nominatim-standin", daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Nominatim stand-in')
+    parser.add_argument('--port', type=int, default=8089, help='Port (default: 8089)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per answer (default: 0.05)')
+    parser.add_argument('--policy-rate', type=float, default=1.0,
+                        help='Requests per second before answering 429 (default: 1)')
+    args = parser.parse_args()
+
+    server, state = start_standin(args.port, args.latency, args.policy_rate)
+    print(f"Nominatim stand-in on http://127.0.0.1:{server.server_address[1]}/search")
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps(state.counts))
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized Aspect Engine
+Pairwise aspect detection and applying/separating flags as array operations
+
+The separation and relative-speed matrices of all planet pairs are built
+once and every aspect orb (with luminary bonuses) is applied to them in
+bulk. All functions accept a single chart, shape (planets,), or a batch,
+shape (charts, planets); results carry the same leading axes with two
+trailing planet axes. Only the upper triangle (planet i before planet j)
+is filled, matching the pair order of the scalar loops.
+
+The rules mirror _calculate_enhanced_aspects, _is_applying_enhanced and
+_calculate_enhanced_degrees_to_exact in horary_engine.py.
+
+Created for horary_engine.py performance work
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+NO_ASPECT = -1
+
+# Degrees to exact never reported below this (very close aspects)
+MIN_DEGREES_TO_EXACT = 0.1
+
+
+def orb_limits(aspect_orbs: Sequence[float], planet_bonuses: Sequence[float]) -> np.ndarray:
+    """
+    Maximum orb per aspect and planet pair.
+
+    Args:
+        aspect_orbs: Configured orb of each aspect, in aspect order
+        planet_bonuses: Orb bonus each planet adds to its pairs (luminaries)
+
+    Returns:
+        (aspects, planets, planets) array
+    """
+    bonuses = np.asarray(planet_bonuses, dtype=float)
+    pair_bonus = bonuses[:, None] + bonuses[None, :]
+    return np.asarray(aspect_orbs, dtype=float)[:, None, None] + pair_bonus[None, :, :]
+
+
+_UPPER_TRIANGLES = {}
+
+
+def _upper_triangle(n_planets: int) -> np.ndarray:
+    """Pairs (i, j) with i < j"""
+    if n_planets not in _UPPER_TRIANGLES:
+        _UPPER_TRIANGLES[n_planets] = np.triu(np.ones((n_planets, n_planets), dtype=bool), k=1)
+    return _UPPER_TRIANGLES[n_planets]
+
+
+def find_aspects(longitude: np.ndarray, aspect_degrees: Sequence[float],
+                 limits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First aspect (in aspect order) within orb for every planet pair.
+
+    Args:
+        longitude: (..., planets) ecliptic longitudes
+        aspect_degrees: Exact angle of each aspect, in aspect order
+        limits: (aspects, planets, planets) array from orb_limits()
+
+    Returns:
+        (aspect index or NO_ASPECT, orb from exact), each (..., planets, planets)
+    """
+    longitude = np.asarray(longitude, dtype=float)
+    n_planets = longitude.shape[-1]
+
+    separation = np.abs(longitude[..., :, None] - longitude[..., None, :])
+    separation = np.where(separation > 180.0, 360.0 - separation, separation)
+
+    # All aspects at once along a leading axis; the first hit wins
+    degrees = np.asarray(aspect_degrees, dtype=float).reshape((-1,) + (1,) * separation.ndim)
+    orb_diff = np.abs(separation[None] - degrees)
+    hits = (orb_diff <= limits.reshape((len(limits),) + (1,) * (separation.ndim - 2) + limits.shape[1:]))
+    hits &= _upper_triangle(n_planets)
+
+    first = np.argmax(hits, axis=0)
+    found = hits.any(axis=0)
+    aspect = np.where(found, first, NO_ASPECT)
+    orb = np.where(found, np.abs(separation - degrees.ravel()[first]), 0.0)
+
+    return aspect, orb
+
+
+def degrees_to_exact(orb: np.ndarray) -> np.ndarray:
+    """Orb from exact, floored at MIN_DEGREES_TO_EXACT"""
+    return np.where(orb < MIN_DEGREES_TO_EXACT, MIN_DEGREES_TO_EXACT, orb)
+
+
+def _normalize(separation: np.ndarray) -> np.ndarray:
+    """
+    Into [-180, 180] like the scalar while-loops (180 and -180 kept as they
+    are). Inputs are longitude differences, so one turn is enough.
+    """
+    return np.where(separation > 180.0, separation - 360.0,
+                    np.where(separation < -180.0, separation + 360.0, separation))
+
+
+def applying_flags(longitude: np.ndarray, speed: np.ndarray, aspect: np.ndarray,
+                   aspect_degrees: Sequence[float], days_to_exit: np.ndarray,
+                   time_increment: float) -> np.ndarray:
+    """
+    Applying flag for every aspected pair.
+
+    The faster planet applies when the aspect perfects before either planet
+    leaves its sign and the orb shrinks over time_increment days.
+
+    Args:
+        longitude: (..., planets) ecliptic longitudes
+        speed: (..., planets) speeds in degrees/day
+        aspect: (..., planets, planets) aspect indices from find_aspects()
+        aspect_degrees: Exact angle of each aspect, in aspect order
+        days_to_exit: (..., planets) days until each planet leaves its sign;
+            NaN or 0 when unknown (no sign-exit limit)
+        time_increment: Probe interval in days
+
+    Returns:
+        (..., planets, planets) bool, False where there is no aspect
+    """
+    longitude = np.asarray(longitude, dtype=float)
+    speed = np.asarray(speed, dtype=float)
+    days_to_exit = np.asarray(days_to_exit, dtype=float)
+    applying = np.zeros(aspect.shape, dtype=bool)
+
+    # Work on the aspected pairs only, gathered into flat vectors
+    pairs = np.nonzero(aspect != NO_ASPECT)
+    if len(pairs[0]) == 0:
+        return applying
+    first_index = pairs[:-2] + (pairs[-2],)
+    second_index = pairs[:-2] + (pairs[-1],)
+    lon_first, lon_second = longitude[first_index], longitude[second_index]
+    speed_first, speed_second = speed[first_index], speed[second_index]
+
+    # Faster planet of each pair (the second one on equal speeds)
+    first_faster = np.abs(speed_first) > np.abs(speed_second)
+    sign = np.where(first_faster, 1.0, -1.0)
+    separation = _normalize(sign * (lon_first - lon_second))
+    relative_speed = sign * (speed_first - speed_second)
+
+    # Closest target separation: +angle or -angle by the side the faster
+    # planet is on (the scalar code's +-(360 - angle) targets are never
+    # strictly closer for separations within [-180, 180])
+    target = np.asarray(aspect_degrees, dtype=float)[aspect[pairs]]
+    closest = np.where(separation >= 0, target, -target)
+    current_orb = np.abs(separation - closest)
+
+    # Perfection must come before either planet changes sign
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_to_perfect = current_orb / np.abs(relative_speed)
+    exit_first, exit_second = days_to_exit[first_index], days_to_exit[second_index]
+    exit_limited = ((exit_first > 0) & (days_to_perfect > exit_first)) | \
+                   ((exit_second > 0) & (days_to_perfect > exit_second))
+
+    future_separation = _normalize(separation + relative_speed * time_increment)
+    future_orb = np.abs(future_separation - closest)
+
+    applying[pairs] = ~exit_limited & (future_orb < current_orb)
+    return applying
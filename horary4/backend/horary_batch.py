@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+Batched Horary Chart Calculation
+Evaluates many charts in one vectorized pass with NumPy
+
+calculate_charts() computes planet positions, house cusps, sign and house
+placement, solar conditions, dignities and the aspect matrix as arrays over
+the whole batch. HoraryChart objects are only built when asked for, via
+ChartBatch.chart(i) or ChartBatch.to_charts().
+
+Usage:
+    calculator = EnhancedTraditionalAstrologicalCalculator()
+    batch = calculator.calculate_charts(times, (51.5074, -0.1278, "London"))
+    batch.longitude[:, 1]        # Moon longitude for every chart
+    chart = batch.chart(0)       # full HoraryChart for the first entry
+
+sweep_charts() walks a long time range block by block, so only one block
+of arrays is held at a time:
+    for chart in sweep_charts(calculator, time_range(start, end, step), location):
+        ...
+
+Created for horary_engine.py performance work
+"""
+
+import datetime
+import itertools
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+from horary_config import cfg, config_snapshot
+from _horary_math import sun_altitude_at_civil_twilight, days_to_sign_exit
+from horary_aspects import find_aspects, applying_flags, degrees_to_exact
+from horary_events import get_ingress_index
+from horary_engine import (
+    Planet, Aspect, Sign, SolarCondition, SolarAnalysis, PlanetPosition,
+    AspectInfo, HoraryChart
+)
+
+
+# Fixed axis orders used by every array in a ChartBatch
+PLANETS: List[Planet] = [
+    Planet.SUN, Planet.MOON, Planet.MERCURY, Planet.VENUS,
+    Planet.MARS, Planet.JUPITER, Planet.SATURN
+]
+SIGNS: List[Sign] = list(Sign)
+ASPECTS: List[Aspect] = list(Aspect)
+SOLAR_CONDITIONS: List[SolarCondition] = list(SolarCondition)
+
+SUN_INDEX = PLANETS.index(Planet.SUN)
+MOON_INDEX = PLANETS.index(Planet.MOON)
+MERCURY_INDEX = PLANETS.index(Planet.MERCURY)
+VENUS_INDEX = PLANETS.index(Planet.VENUS)
+
+_CAZIMI = SOLAR_CONDITIONS.index(SolarCondition.CAZIMI)
+_COMBUSTION = SOLAR_CONDITIONS.index(SolarCondition.COMBUSTION)
+_UNDER_BEAMS = SOLAR_CONDITIONS.index(SolarCondition.UNDER_BEAMS)
+_FREE = SOLAR_CONDITIONS.index(SolarCondition.FREE)
+
+UNIX_EPOCH_JD = 2440587.5
+
+DEFAULT_SWEEP_BLOCK_SIZE = 256
+DEFAULT_MAX_SWEEP_CHARTS = 50000
+
+Location = Union[Tuple[float, float], Tuple[float, float, str]]
+
+
+@dataclass
+class ChartBatch:
+    """
+    Array form of many horary charts.
+
+    Planet axes follow PLANETS, sign indices follow SIGNS, aspect indices
+    follow ASPECTS (-1 means no aspect) and solar conditions follow
+    SOLAR_CONDITIONS. Houses are numbered 1-12 as in PlanetPosition.
+    """
+    calculator: Any
+    dates_local: List[datetime.datetime]
+    dates_utc: List[datetime.datetime]
+    timezone_infos: List[str]
+    location_names: List[str]
+    julian_days: np.ndarray          # (n,)
+    latitudes: np.ndarray            # (n,) observer latitude
+    longitudes: np.ndarray           # (n,) observer longitude
+    longitude: np.ndarray            # (n, 7) ecliptic longitude
+    latitude: np.ndarray             # (n, 7) ecliptic latitude
+    speed: np.ndarray                # (n, 7) degrees/day
+    retrograde: np.ndarray           # (n, 7) bool
+    sign: np.ndarray                 # (n, 7) sign index
+    house: np.ndarray                # (n, 7) house number
+    cusps: np.ndarray                # (n, 12) house cusps
+    ascendant: np.ndarray            # (n,)
+    midheaven: np.ndarray            # (n,)
+    distance_from_sun: np.ndarray    # (n, 7)
+    solar_condition: np.ndarray      # (n, 7) solar condition index
+    exact_cazimi: np.ndarray         # (n, 7) bool
+    traditional_exception: np.ndarray  # (n, 7) bool
+    dignity: np.ndarray              # (n, 7) dignity score
+    aspect: np.ndarray               # (n, 7, 7) aspect index, upper triangle only
+    aspect_orb: np.ndarray           # (n, 7, 7) orb of that aspect
+    applying: np.ndarray             # (n, 7, 7) bool, aspect is applying
+    degrees_to_exact: np.ndarray     # (n, 7, 7)
+
+    def __len__(self) -> int:
+        return len(self.julian_days)
+
+    def chart(self, i: int) -> HoraryChart:
+        """Build the full HoraryChart for entry i"""
+        calc = self.calculator
+        jd_ut = float(self.julian_days[i])
+
+        planets: Dict[Planet, PlanetPosition] = {}
+        solar_analyses: Dict[Planet, SolarAnalysis] = {}
+        for p, planet in enumerate(PLANETS):
+            planets[planet] = PlanetPosition(
+                planet=planet,
+                longitude=float(self.longitude[i, p]),
+                latitude=float(self.latitude[i, p]),
+                house=int(self.house[i, p]),
+                sign=SIGNS[self.sign[i, p]],
+                dignity_score=int(self.dignity[i, p]),
+                retrograde=bool(self.retrograde[i, p]),
+                speed=float(self.speed[i, p])
+            )
+            solar_analyses[planet] = SolarAnalysis(
+                planet=planet,
+                distance_from_sun=float(self.distance_from_sun[i, p]),
+                condition=SOLAR_CONDITIONS[self.solar_condition[i, p]],
+                exact_cazimi=bool(self.exact_cazimi[i, p]),
+                traditional_exception=bool(self.traditional_exception[i, p])
+            )
+
+        aspects = []
+        for p1, p2 in zip(*np.nonzero(self.aspect[i] >= 0)):
+            pos1 = planets[PLANETS[p1]]
+            pos2 = planets[PLANETS[p2]]
+            aspect_type = ASPECTS[self.aspect[i, p1, p2]]
+            applying = bool(self.applying[i, p1, p2])
+
+            aspects.append(AspectInfo(
+                planet1=pos1.planet,
+                planet2=pos2.planet,
+                aspect=aspect_type,
+                orb=float(self.aspect_orb[i, p1, p2]),
+                applying=applying,
+                exact_time=calc._exact_perfection_time(pos1, pos2, aspect_type, jd_ut) if applying else None,
+                degrees_to_exact=float(self.degrees_to_exact[i, p1, p2])
+            ))
+
+        houses = self.cusps[i].tolist()
+        house_rulers = {h: calc._get_sign(cusp).ruler for h, cusp in enumerate(houses, 1)}
+
+        return HoraryChart(
+            date_time=self.dates_local[i],
+            date_time_utc=self.dates_utc[i],
+            timezone_info=self.timezone_infos[i],
+            location=(float(self.latitudes[i]), float(self.longitudes[i])),
+            location_name=self.location_names[i],
+            planets=planets,
+            aspects=aspects,
+            houses=houses,
+            house_rulers=house_rulers,
+            ascendant=float(self.ascendant[i]),
+            midheaven=float(self.midheaven[i]),
+            solar_analyses=solar_analyses,
+            julian_day=jd_ut,
+            moon_last_aspect=calc._calculate_moon_last_aspect(planets, jd_ut),
+            moon_next_aspect=calc._calculate_moon_next_aspect(planets, jd_ut)
+        )
+
+    def to_charts(self) -> List[HoraryChart]:
+        """Build HoraryChart objects for the whole batch"""
+        return [self.chart(i) for i in range(len(self))]
+
+
+def calculate_charts(calculator, times: Sequence[datetime.datetime],
+                     locations: Union[Location, Sequence[Location]]) -> ChartBatch:
+    """
+    Calculate many charts in one vectorized pass.
+
+    Args:
+        calculator: EnhancedTraditionalAstrologicalCalculator supplying the
+            ephemeris backend and the scalar dignity rules
+        times: Chart moments; aware datetimes keep their zone as local time,
+            naive datetimes are taken as UTC
+        locations: One (lat, lon[, name]) tuple used for every time, or one
+            tuple per time
+
+    Returns:
+        ChartBatch holding the array results
+    """
+    n = len(times)
+    if n == 0:
+        raise ValueError("calculate_charts needs at least one time")
+
+    locations = _broadcast_locations(locations, n)
+    lats = np.array([loc[0] for loc in locations], dtype=float)
+    lons = np.array([loc[1] for loc in locations], dtype=float)
+    names = [loc[2] if len(loc) > 2 else f"{loc[0]:.4f}, {loc[1]:.4f}" for loc in locations]
+
+    dates_local, dates_utc, timezone_infos = [], [], []
+    for dt in times:
+        if dt.tzinfo is None:
+            dt = pytz.UTC.localize(dt)
+        dates_local.append(dt)
+        dates_utc.append(dt.astimezone(pytz.UTC))
+        timezone_infos.append(str(dt.tzinfo))
+
+    # Whole seconds, matching swe.julday(y, m, d, h + m/60 + s/3600) in calculate_chart
+    timestamps = np.array([dt.replace(microsecond=0).timestamp() for dt in dates_utc])
+    jds = UNIX_EPOCH_JD + timestamps / 86400.0
+
+    # Planet positions: one backend call per planet for the whole batch
+    positions = np.stack([calculator.ephemeris.positions(jds, calculator.planets_swe[planet])
+                          for planet in PLANETS], axis=1)  # (n, 7, 3)
+    longitude = positions[:, :, 0] % 360.0
+    latitude = positions[:, :, 1]
+    speed = positions[:, :, 2]
+    sign = (longitude // 30).astype(np.int64) % 12
+
+    cusps, ascendant, midheaven = _calculate_houses(jds, lats, lons)
+    house = _house_positions(longitude, cusps)
+
+    distance_from_sun, solar_condition, exact_cazimi, traditional_exception = _solar_conditions(
+        longitude, sign, jds, lats, lons)
+
+    dignity = _dignities(calculator, sign, house, solar_condition, exact_cazimi, traditional_exception)
+    aspect, aspect_orb = _aspect_matrix(calculator, longitude)
+    applying = applying_flags(longitude, speed, aspect, [a.degrees for a in ASPECTS],
+                              _days_to_sign_exit(calculator, jds, longitude, speed),
+                              calculator.settings.timing.timing_precision_days)
+
+    return ChartBatch(
+        calculator=calculator,
+        dates_local=dates_local,
+        dates_utc=dates_utc,
+        timezone_infos=timezone_infos,
+        location_names=names,
+        julian_days=jds,
+        latitudes=lats,
+        longitudes=lons,
+        longitude=longitude,
+        latitude=latitude,
+        speed=speed,
+        retrograde=speed < 0,
+        sign=sign,
+        house=house,
+        cusps=cusps,
+        ascendant=ascendant,
+        midheaven=midheaven,
+        distance_from_sun=distance_from_sun,
+        solar_condition=solar_condition,
+        exact_cazimi=exact_cazimi,
+        traditional_exception=traditional_exception,
+        dignity=dignity,
+        aspect=aspect,
+        aspect_orb=aspect_orb,
+        applying=applying,
+        degrees_to_exact=degrees_to_exact(aspect_orb)
+    )
+
+
+def sweep_charts(calculator, times: Iterable[datetime.datetime], location: Location,
+                 block_size: Optional[int] = None) -> Iterator[HoraryChart]:
+    """
+    Yield a HoraryChart per time, calculating block_size of them per vectorized pass.
+
+    Args:
+        calculator: EnhancedTraditionalAstrologicalCalculator
+        times: Chart moments, consumed lazily (see time_range())
+        location: (lat, lon[, name]) used for every time
+        block_size: Charts per pass; defaults to sweep.block_size
+    """
+    block_size = block_size or sweep_block_size()
+    times = iter(times)
+    while True:
+        block = list(itertools.islice(times, block_size))
+        if not block:
+            return
+        batch = calculate_charts(calculator, block, location)
+        for i in range(len(batch)):
+            yield batch.chart(i)
+
+
+def time_range(start: datetime.datetime, end: datetime.datetime,
+               step: datetime.timedelta) -> Iterator[datetime.datetime]:
+    """Aware datetimes from start to end inclusive, in start's zone, step apart in absolute time"""
+    tz = start.tzinfo
+    current = start.astimezone(pytz.UTC)
+    end = end.astimezone(pytz.UTC)
+    while current <= end:
+        local = current.astimezone(tz)
+        # pytz zones need normalizing to pick the right DST offset
+        yield tz.normalize(local) if hasattr(tz, "normalize") else local
+        current += step
+
+
+def sweep_block_size() -> int:
+    try:
+        return cfg().sweep.block_size
+    except AttributeError:
+        return DEFAULT_SWEEP_BLOCK_SIZE
+
+
+def max_sweep_charts() -> int:
+    try:
+        return cfg().sweep.max_charts
+    except AttributeError:
+        return DEFAULT_MAX_SWEEP_CHARTS
+
+
+def _broadcast_locations(locations, n: int) -> List[Location]:
+    """Accept a single location or one per time"""
+    if len(locations) in (2, 3) and isinstance(locations[0], (int, float)):
+        return [tuple(locations)] * n
+    locations = list(locations)
+    if len(locations) != n:
+        raise ValueError(f"Expected 1 or {n} locations, got {len(locations)}")
+    return locations
+
+
+def _calculate_houses(jds: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Regiomontanus cusps per chart (swe.houses has no vector form)"""
+    n = len(jds)
+    cusps = np.empty((n, 12))
+    ascendant = np.empty(n)
+    midheaven = np.empty(n)
+
+    for i in range(n):
+        try:
+            houses_data, ascmc = swe.houses(float(jds[i]), float(lats[i]), float(lons[i]), b'R')
+            cusps[i] = houses_data[:12]
+            ascendant[i] = ascmc[0]
+            midheaven[i] = ascmc[1]
+        except Exception:
+            # Same fallback as calculate_chart
+            cusps[i] = np.arange(12) * 30.0
+            ascendant[i] = 0.0
+            midheaven[i] = 90.0
+
+    return cusps, ascendant, midheaven
+
+
+def _house_positions(longitude: np.ndarray, cusps: np.ndarray) -> np.ndarray:
+    """Vectorized _calculate_house_position: first matching house wins, default 1"""
+    start = cusps % 360.0
+    end = np.roll(cusps, -1, axis=1) % 360.0
+
+    house = np.zeros(longitude.shape, dtype=np.int64)
+    for i in range(12):
+        current_cusp = start[:, i:i + 1]
+        next_cusp = end[:, i:i + 1]
+        inside = np.where(current_cusp > next_cusp,
+                          (longitude >= current_cusp) | (longitude < next_cusp),
+                          (current_cusp <= longitude) & (longitude < next_cusp))
+        house = np.where((house == 0) & inside, i + 1, house)
+
+    return np.where(house == 0, 1, house)
+
+
+def _solar_conditions(longitude: np.ndarray, sign: np.ndarray, jds: np.ndarray,
+                      lats: np.ndarray, lons: np.ndarray):
+    """Vectorized _analyze_enhanced_solar_condition"""
+    orbs = config_snapshot().orbs
+    cazimi_orb = orbs.cazimi_orb
+    combustion_orb = orbs.combustion_orb
+    under_beams_orb = orbs.under_beams_orb
+
+    diff = np.abs(longitude - longitude[:, SUN_INDEX:SUN_INDEX + 1])
+    elongation = np.minimum(diff, 360.0 - diff)
+    elongation[:, SUN_INDEX] = 0.0
+
+    # Traditional exceptions for Mercury and Venus
+    exception = np.zeros(longitude.shape, dtype=bool)
+    mercury_elong = elongation[:, MERCURY_INDEX]
+    mercury_in_own_sign = np.isin(sign[:, MERCURY_INDEX], [SIGNS.index(Sign.GEMINI), SIGNS.index(Sign.VIRGO)])
+    exception[:, MERCURY_INDEX] = (mercury_elong >= 10.0) & (mercury_in_own_sign | (mercury_elong >= 18.0))
+
+    venus_elong = elongation[:, VENUS_INDEX]
+    venus_exception = venus_elong >= 40.0
+    # Twilight visibility only matters for 10-40 degrees of elongation
+    for i in np.nonzero((venus_elong >= 10.0) & (venus_elong < 40.0))[0]:
+        sun_altitude = sun_altitude_at_civil_twilight(float(lats[i]), float(lons[i]), float(jds[i]))
+        venus_exception[i] = sun_altitude <= -8.0
+    exception[:, VENUS_INDEX] = venus_exception
+
+    cazimi = elongation <= cazimi_orb
+    combust = ~cazimi & (elongation <= combustion_orb)
+    beams = ~cazimi & ~combust & (elongation <= under_beams_orb)
+
+    condition = np.full(longitude.shape, _FREE, dtype=np.int64)
+    condition[combust & ~exception] = _COMBUSTION
+    condition[beams & ~exception] = _UNDER_BEAMS
+    condition[cazimi] = _CAZIMI
+    condition[:, SUN_INDEX] = _FREE
+
+    exact_cazimi = cazimi & (elongation <= 3 / 60)
+    exact_cazimi[:, SUN_INDEX] = False
+    traditional_exception = (combust | beams) & exception
+
+    return elongation, condition, exact_cazimi, traditional_exception
+
+
+def _dignities(calculator, sign: np.ndarray, house: np.ndarray, condition: np.ndarray,
+               exact_cazimi: np.ndarray, traditional_exception: np.ndarray) -> np.ndarray:
+    """Dignity scores: the calculator's essential and solar dignity tables, indexed in bulk"""
+    planet_axis = np.arange(len(PLANETS))[None, :]
+    return (calculator.dignity_table[planet_axis, sign, house] +
+            calculator.solar_dignity_table[condition, exact_cazimi.astype(np.int64),
+                                           traditional_exception.astype(np.int64)])
+
+
+def _aspect_matrix(calculator, longitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First matching aspect per planet pair (in Aspect order), with luminary
+    orb bonuses, as in _calculate_enhanced_aspects.
+    """
+    limits = calculator._aspect_orb_limits(PLANETS)
+    return find_aspects(longitude, [aspect_type.degrees for aspect_type in ASPECTS], limits)
+
+
+def _days_to_sign_exit(calculator, jds: np.ndarray, longitude: np.ndarray,
+                       speed: np.ndarray) -> np.ndarray:
+    """
+    (n, 7) days until each planet leaves its sign, NaN where unknown.
+
+    One vectorized lookup per planet when the ingress index covers the
+    batch, otherwise the same per-position rule as the calculator.
+    """
+    days = np.full(longitude.shape, np.nan)
+    index = get_ingress_index()
+
+    for p, planet in enumerate(PLANETS):
+        planet_id = calculator.planets_swe[planet]
+        if index is not None and all(index.covers(planet_id, jd) for jd in (jds.min(), jds.max())):
+            times = index.times[planet_id]
+            days[:, p] = times[np.searchsorted(times, jds, side="right")] - jds
+            continue
+
+        for i, jd in enumerate(jds):
+            exit_days = days_to_sign_exit(float(longitude[i, p]), float(speed[i, p]), planet_id, float(jd))
+            if exit_days:
+                days[i, p] = exit_days
+
+    return days
@@ -7,10 +7,16 @@ Created for horary_engine.py refactor
 
 import os
 import yaml
+import bisect
+import hashlib
+import json
 import logging
+from dataclasses import dataclass
 from pathlib import Path
 from types import SimpleNamespace
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +26,181 @@ class HoraryError(Exception):
     pass
 
 
+# Axis orders used by the snapshot tables
+ASPECT_KEYS = ("conjunction", "sextile", "square", "trine", "opposition")
+PLANET_KEYS = ("sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn")
+
+ANGULAR_HOUSES = (1, 4, 7, 10)
+SUCCEDENT_HOUSES = (2, 5, 8, 11)
+
+# Moon phase boundaries (elongation from the Sun) and speed boundaries
+MOON_PHASE_BOUNDS = (30.0, 60.0, 120.0, 150.0, 210.0, 240.0, 300.0)
+MOON_PHASE_KEYS = ("new_moon", "waxing_crescent", "first_quarter", "waxing_gibbous",
+                   "full_moon", "waning_gibbous", "last_quarter", "waning_crescent")
+MOON_SPEED_BOUNDS = (11.0, 12.0, 14.0, 15.0)
+MOON_SPEED_KEYS = ("very_slow", "slow", "average", "fast", "very_fast")
+
+DEFAULT_ORB = 8.0
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _house_table(angular: Any, succedent: Any, cadent: Any) -> Tuple[Any, ...]:
+    """Value per house number 1-12 (index 0 unused)"""
+    return (0,) + tuple(
+        angular if house in ANGULAR_HOUSES else succedent if house in SUCCEDENT_HOUSES else cadent
+        for house in range(1, 13)
+    )
+
+
+@dataclass(frozen=True)
+class TimingSettings:
+    """Timing parameters used inside per-aspect and per-planet loops"""
+    __slots__ = ("timing_precision_days", "max_future_days", "default_moon_speed_fallback",
+                 "stationary_speed_threshold")
+    timing_precision_days: float
+    max_future_days: float
+    default_moon_speed_fallback: float
+    stationary_speed_threshold: float
+
+
+@dataclass(frozen=True)
+class OrbSettings:
+    """Aspect orbs by ASPECT_KEYS and per-pair limits by PLANET_KEYS"""
+    __slots__ = ("by_aspect", "aspect_orbs", "sun_orb_bonus", "moon_orb_bonus", "limits",
+                 "cazimi_orb", "combustion_orb", "under_beams_orb", "void_orb")
+    by_aspect: Dict[str, float]
+    aspect_orbs: Tuple[float, ...]
+    sun_orb_bonus: float
+    moon_orb_bonus: float
+    limits: np.ndarray           # (aspects, planets, planets) with luminary bonuses
+    cazimi_orb: float            # degrees
+    combustion_orb: float
+    under_beams_orb: float
+    void_orb: float
+
+
+@dataclass(frozen=True)
+class DignityWeights:
+    """Essential and accidental dignity weights plus solar modifiers"""
+    __slots__ = ("rulership", "exaltation", "detriment", "fall", "joy", "house",
+                 "cazimi_bonus", "exact_cazimi_bonus", "combustion_penalty", "under_beams_penalty")
+    rulership: int
+    exaltation: int
+    detriment: int
+    fall: int
+    joy: int
+    house: Tuple[int, ...]       # by house number, index 0 unused
+    cazimi_bonus: int
+    exact_cazimi_bonus: int
+    combustion_penalty: int
+    under_beams_penalty: int
+
+
+@dataclass(frozen=True)
+class MoonBonuses:
+    """Moon testimony bonus lookup tables"""
+    __slots__ = ("phase", "speed", "angularity")
+    phase: Tuple[int, ...]       # by MOON_PHASE_KEYS
+    speed: Tuple[int, ...]       # by MOON_SPEED_KEYS
+    angularity: Tuple[int, ...]  # by house number, index 0 unused
+
+    def phase_bonus(self, elongation: float) -> int:
+        return self.phase[bisect.bisect_right(MOON_PHASE_BOUNDS, elongation)]
+
+    def speed_bonus(self, speed: float) -> int:
+        return self.speed[bisect.bisect_right(MOON_SPEED_BOUNDS, speed)]
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Immutable, precompiled view of the configuration for hot loops.
+
+    Built once per load; engines keep a reference instead of walking the
+    SimpleNamespace through cfg() on every evaluation. The full namespace
+    stays available as .config for everything else, and .content_hash
+    identifies the configuration it was compiled from.
+    """
+    __slots__ = ("config", "content_hash", "timing", "orbs", "dignity", "moon")
+    config: SimpleNamespace
+    content_hash: str
+    timing: TimingSettings
+    orbs: OrbSettings
+    dignity: DignityWeights
+    moon: MoonBonuses
+
+    @classmethod
+    def from_config(cls, config: SimpleNamespace, content_hash: str) -> 'ConfigSnapshot':
+        timing = config.timing
+        orbs = config.orbs
+        dignity = config.dignity
+        solar = config.confidence.solar
+        moon = config.moon
+
+        by_aspect = {}
+        for key in ASPECT_KEYS:
+            if not hasattr(orbs, key):
+                logger.warning(f"Orb not found for {key}, using default {DEFAULT_ORB}")
+            by_aspect[key] = float(getattr(orbs, key, DEFAULT_ORB))
+        aspect_orbs = tuple(by_aspect[key] for key in ASPECT_KEYS)
+
+        bonuses = np.zeros(len(PLANET_KEYS))
+        bonuses[PLANET_KEYS.index("sun")] = orbs.sun_orb_bonus
+        bonuses[PLANET_KEYS.index("moon")] = orbs.moon_orb_bonus
+        limits = np.asarray(aspect_orbs)[:, None, None] + (bonuses[:, None] + bonuses[None, :])[None]
+
+        return cls(
+            config=config,
+            content_hash=content_hash,
+            timing=TimingSettings(
+                timing_precision_days=timing.timing_precision_days,
+                max_future_days=timing.max_future_days,
+                default_moon_speed_fallback=timing.default_moon_speed_fallback,
+                stationary_speed_threshold=timing.stationary_speed_threshold
+            ),
+            orbs=OrbSettings(
+                by_aspect=by_aspect,
+                aspect_orbs=aspect_orbs,
+                sun_orb_bonus=orbs.sun_orb_bonus,
+                moon_orb_bonus=orbs.moon_orb_bonus,
+                limits=_read_only(limits),
+                cazimi_orb=orbs.cazimi_orb_arcmin / 60.0,
+                combustion_orb=orbs.combustion_orb,
+                under_beams_orb=orbs.under_beams_orb,
+                void_orb=orbs.void_orb_deg
+            ),
+            dignity=DignityWeights(
+                rulership=dignity.rulership,
+                exaltation=dignity.exaltation,
+                detriment=dignity.detriment,
+                fall=dignity.fall,
+                joy=dignity.joy,
+                house=_house_table(dignity.angular, dignity.succedent, dignity.cadent),
+                cazimi_bonus=solar.cazimi_bonus,
+                exact_cazimi_bonus=solar.exact_cazimi_bonus,
+                combustion_penalty=solar.combustion_penalty,
+                under_beams_penalty=solar.under_beams_penalty
+            ),
+            moon=MoonBonuses(
+                phase=tuple(getattr(moon.phase_bonus, key) for key in MOON_PHASE_KEYS),
+                speed=tuple(getattr(moon.speed_bonus, key) for key in MOON_SPEED_KEYS),
+                angularity=_house_table(moon.angularity_bonus.angular, moon.angularity_bonus.succedent,
+                                        moon.angularity_bonus.cadent)
+            )
+        )
+
+
 class HoraryConfig:
     """Lazy singleton configuration loader for horary constants"""
     
     _instance: Optional['HoraryConfig'] = None
     _config: Optional[SimpleNamespace] = None
+    _snapshot: Optional[ConfigSnapshot] = None
+    _content_hash: Optional[str] = None
     
     def __new__(cls) -> 'HoraryConfig':
         if cls._instance is None:
@@ -60,6 +236,10 @@ class HoraryConfig:
             # Convert nested dict to nested SimpleNamespace for dot notation access
             self._config = self._dict_to_namespace(config_dict)
             
+            # Hash of the parsed content (comments and formatting do not count)
+            self._content_hash = hashlib.sha256(
+                json.dumps(config_dict, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+            
             logger.info(f"Loaded horary configuration from {config_file}")
             
         except yaml.YAMLError as e:
@@ -83,6 +263,23 @@ class HoraryConfig:
             self._load_config()
         return self._config
     
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the loaded configuration, for keying cached results"""
+        if self._content_hash is None:
+            self._load_config()
+        return self._content_hash
+    
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """Get the compiled snapshot of the loaded configuration"""
+        if HoraryConfig._snapshot is None:
+            try:
+                HoraryConfig._snapshot = ConfigSnapshot.from_config(self.config, self.content_hash)
+            except AttributeError as e:
+                raise HoraryError(f"Configuration incomplete for snapshot: {e}")
+        return HoraryConfig._snapshot
+    
     def get(self, key_path: str, default: Any = None) -> Any:
         """
         Get configuration value using dot notation path
@@ -151,9 +348,26 @@ class HoraryConfig:
     
     @classmethod
     def reset(cls) -> None:
-        """Reset singleton for testing"""
+        """Reset singleton (configuration reload or testing); notifies on_config_reset() listeners"""
         cls._instance = None
         cls._config = None
+        cls._snapshot = None
+        cls._content_hash = None
+        for listener in list(_reset_listeners):
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Configuration reset listener failed: {e}")
+
+
+# Called after HoraryConfig.reset(), e.g. to drop results computed under the old configuration
+_reset_listeners: List[Callable[[], None]] = []
+
+
+def on_config_reset(listener: Callable[[], None]) -> None:
+    """Register a callback run whenever the configuration is reset"""
+    if listener not in _reset_listeners:
+        _reset_listeners.append(listener)
 
 
 # Global configuration instance
@@ -168,6 +382,19 @@ def cfg() -> SimpleNamespace:
     return get_config().config
 
 
+def config_hash() -> str:
+    """Content hash of the loaded configuration"""
+    return get_config().content_hash
+
+
+def config_snapshot() -> ConfigSnapshot:
+    """Get the compiled configuration snapshot (rebuilt after reset())"""
+    snapshot = HoraryConfig._snapshot
+    if snapshot is None:
+        snapshot = get_config().snapshot
+    return snapshot
+
+
 # Validate configuration on import (unless in test environment)
 if os.environ.get('HORARY_CONFIG_SKIP_VALIDATION') != 'true':
     try:
@@ -20,9 +20,10 @@ from typing import Dict, List, Tuple, Optional, Any, Union
 from enum import Enum
 import requests
 import subprocess
+import weakref
 
 # Configuration system
-from horary_config import get_config, cfg, HoraryError
+from horary_config import get_config, cfg, config_snapshot, on_config_reset, HoraryError
 
 # Timezone handling
 import pytz
@@ -32,9 +33,8 @@ except ImportError:
     # Fallback for Python < 3.9
     ZoneInfo = None
 
-from timezonefinder import TimezoneFinder
+import numpy as np
 import swisseph as swe
-from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 
 # Import our computational helpers
@@ -43,8 +43,17 @@ from _horary_math import (
     calculate_sign_boundary_longitude, days_to_sign_exit,
     calculate_elongation, is_planet_oriental, sun_altitude_at_civil_twilight,
     calculate_moon_variable_speed, check_aspect_separation_order,
-    LocationError, safe_geocode, normalize_longitude, degrees_to_dms
+    LocationError, safe_geocode_async, wait_for_geocode,
+    normalize_longitude, degrees_to_dms
 )
+from horary_events import get_lunar_aspect_index, MIN_LUNAR_ELONGATION_SPEED
+from horary_perfection import jd_to_datetime
+from horary_services import ServiceRegistry, get_services
+from horary_singleflight import get_singleflight, request_key
+from horary_geocache import normalize_location_key
+from horary_response_cache import get_response_cache, response_key
+from horary_tracing import span
+from horary_aspects import orb_limits, find_aspects, applying_flags, degrees_to_exact
 
 # Setup module logger
 logger = logging.getLogger(__name__)
@@ -80,12 +89,8 @@ class Aspect(Enum):
     
     @property
     def orb(self) -> float:
-        """Get orb from configuration"""
-        try:
-            return cfg().orbs.__dict__[self.config_key]
-        except (AttributeError, KeyError):
-            logger.warning(f"Orb not found for {self.config_key}, using default 8.0")
-            return 8.0
+        """Get orb from the configuration snapshot"""
+        return config_snapshot().orbs.by_aspect[self.config_key]
 
 
 class Sign(Enum):
@@ -198,17 +203,27 @@ class HoraryChart:
 class TimezoneManager:
     """Handles timezone operations for horary calculations"""
     
-    def __init__(self):
-        self.tf = TimezoneFinder()
-        self.geolocator = Nominatim(user_agent="horary_astrology_tz")
+    def __init__(self, services: Optional[ServiceRegistry] = None):
+        # Process-wide finder and grid cache, shared by every manager
+        self.services = services or get_services()
+        self.tf = self.services.timezone_finder
+        self.timezone_grid = self.services.timezone_grid
+    
+    @property
+    def geolocator(self):
+        """Shared Nominatim client (created on first use)"""
+        return self.services.geocoder
     
     def get_timezone_for_location(self, lat: float, lon: float) -> Optional[str]:
         """Get timezone string for given coordinates"""
-        try:
-            return self.tf.timezone_at(lat=lat, lng=lon)
-        except Exception as e:
-            logger.error(f"Error getting timezone for {lat}, {lon}: {e}")
-            return None
+        return self.timezone_grid.timezone_at(lat, lon)
+    
+    def get_timezones_for_locations(self, coordinates: List[Tuple[float, float]]) -> List[Optional[str]]:
+        """Get timezone strings for many (lat, lon) pairs at once"""
+        if not coordinates:
+            return []
+        lats, lons = zip(*coordinates)
+        return self.timezone_grid.timezones_at(lats, lons)
     
     def parse_datetime_with_timezone(self, date_str: str, time_str: str, 
                                    timezone_str: Optional[str] = None, 
@@ -603,12 +618,18 @@ class TraditionalHoraryQuestionAnalyzer:
 class EnhancedTraditionalAstrologicalCalculator:
     """Enhanced Traditional astrological calculations with configuration system"""
     
-    def __init__(self):
-        # Set Swiss Ephemeris path
-        swe.set_ephe_path('')
+    def __init__(self, services: Optional[ServiceRegistry] = None):
+        self.services = services or get_services()
+        
+        # Shared timezone manager
+        self.timezone_manager = self.services.timezone_manager
+        
+        # Planetary positions come from the configured ephemeris backend
+        # (the registry also sets the Swiss Ephemeris path)
+        self.ephemeris = self.services.ephemeris
         
-        # Initialize timezone manager
-        self.timezone_manager = TimezoneManager()
+        # Exact aspect perfection times, cached across charts and engines
+        self.perfection_solver = self.services.perfection_solver
         
         # Traditional planets only
         self.planets_swe = {
@@ -621,6 +642,9 @@ class EnhancedTraditionalAstrologicalCalculator:
             Planet.SATURN: swe.SATURN
         }
         
+        # Planet order of the snapshot's precomputed orb limits
+        self.traditional_planets = list(self.planets_swe)
+        
         # Traditional exaltations
         self.exaltations = {
             Planet.SUN: Sign.ARIES,
@@ -643,21 +667,63 @@ class EnhancedTraditionalAstrologicalCalculator:
             Planet.SATURN: Sign.ARIES
         }
         
+        # Traditional detriments (opposite to rulership)
+        self.detriments = {
+            Planet.SUN: [Sign.AQUARIUS],
+            Planet.MOON: [Sign.CAPRICORN],
+            Planet.MERCURY: [Sign.PISCES, Sign.SAGITTARIUS],
+            Planet.VENUS: [Sign.ARIES, Sign.SCORPIO],
+            Planet.MARS: [Sign.LIBRA, Sign.TAURUS],
+            Planet.JUPITER: [Sign.GEMINI, Sign.VIRGO],
+            Planet.SATURN: [Sign.CANCER, Sign.LEO]
+        }
+        
+        # Traditional house joys
+        self.house_joys = {
+            Planet.MERCURY: 1,  # 1st house
+            Planet.MOON: 3,     # 3rd house
+            Planet.VENUS: 5,    # 5th house
+            Planet.MARS: 6,     # 6th house
+            Planet.SUN: 9,      # 9th house
+            Planet.JUPITER: 11, # 11th house
+            Planet.SATURN: 12   # 12th house
+        }
+        
         # Planets that have traditional exceptions to combustion
         self.combustion_resistant = {
             Planet.MERCURY: "Mercury rejoices near Sun",
             Planet.VENUS: "Venus as morning/evening star"
         }
+        
+        self._planet_index = {planet: i for i, planet in enumerate(self.traditional_planets)}
+        self._sign_index = {sign: i for i, sign in enumerate(Sign)}
+        self._solar_index = {condition: i for i, condition in enumerate(SolarCondition)}
+        
+        # Compiled configuration and the dignity tables built from it; both
+        # are rebuilt whenever the configuration is reset
+        self.reload_settings()
+        _calculators.add(self)
+    
+    def reload_settings(self) -> None:
+        """Take the current configuration snapshot and rebuild the dignity tables from it"""
+        self.settings = config_snapshot()
+        
+        # Dignity scores precomputed from the configuration: (planet, sign,
+        # house) and (solar condition, exact cazimi, traditional exception)
+        self.dignity_table = self._build_dignity_table()
+        self.solar_dignity_table = self._build_solar_dignity_table()
+        self._dignity_rows = self.dignity_table.tolist()
+        self._solar_dignity_rows = self.solar_dignity_table.tolist()
     
     def get_real_moon_speed(self, jd_ut: float) -> float:
         """Get actual Moon speed from ephemeris in degrees per day"""
         try:
-            moon_data, ret_flag = swe.calc_ut(jd_ut, swe.MOON, swe.FLG_SWIEPH | swe.FLG_SPEED)
-            return abs(moon_data[3])  # degrees per day
+            _, _, moon_speed = self.ephemeris.position(jd_ut, swe.MOON)
+            return abs(moon_speed)  # degrees per day
         except Exception as e:
             logger.warning(f"Failed to get Moon speed from ephemeris: {e}")
             # Fall back to configured default
-            return cfg().timing.default_moon_speed_fallback
+            return self.settings.timing.default_moon_speed_fallback
     
     def calculate_chart(self, dt_local: datetime.datetime, dt_utc: datetime.datetime, 
                        timezone_info: str, lat: float, lon: float, location_name: str) -> HoraryChart:
@@ -674,84 +740,85 @@ class EnhancedTraditionalAstrologicalCalculator:
         logger.info(f"  Location: {location_name} ({lat:.4f}, {lon:.4f})")
         
         # Calculate traditional planets only
-        planets = {}
-        for planet_enum, planet_id in self.planets_swe.items():
-            try:
-                planet_data, ret_flag = swe.calc_ut(jd_ut, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
-                
-                longitude = planet_data[0]
-                latitude = planet_data[1]
-                speed = planet_data[3]  # degrees/day
-                retrograde = speed < 0
+        with span("chart.planets"):
+            planets = {}
+            for planet_enum, planet_id in self.planets_swe.items():
+                try:
+                    longitude, latitude, speed = self.ephemeris.position(jd_ut, planet_id)  # speed in degrees/day
+                    retrograde = speed < 0
                 
-                sign = self._get_sign(longitude)
+                    sign = self._get_sign(longitude)
                 
-                planets[planet_enum] = PlanetPosition(
-                    planet=planet_enum,
-                    longitude=longitude,
-                    latitude=latitude,
-                    house=0,  # Will be calculated after houses
-                    sign=sign,
-                    dignity_score=0,  # Will be calculated after solar analysis
-                    retrograde=retrograde,
-                    speed=speed
-                )
+                    planets[planet_enum] = PlanetPosition(
+                        planet=planet_enum,
+                        longitude=longitude,
+                        latitude=latitude,
+                        house=0,  # Will be calculated after houses
+                        sign=sign,
+                        dignity_score=0,  # Will be calculated after solar analysis
+                        retrograde=retrograde,
+                        speed=speed
+                    )
                 
-            except Exception as e:
-                logger.error(f"Error calculating {planet_enum.value}: {e}")
-                # Create fallback
-                planets[planet_enum] = PlanetPosition(
-                    planet=planet_enum,
-                    longitude=0.0,
-                    latitude=0.0,
-                    house=1,
-                    sign=Sign.ARIES,
-                    dignity_score=0,
-                    speed=0.0
-                )
+                except Exception as e:
+                    logger.error(f"Error calculating {planet_enum.value}: {e}")
+                    # Create fallback
+                    planets[planet_enum] = PlanetPosition(
+                        planet=planet_enum,
+                        longitude=0.0,
+                        latitude=0.0,
+                        house=1,
+                        sign=Sign.ARIES,
+                        dignity_score=0,
+                        speed=0.0
+                    )
         
         # Calculate houses (Regiomontanus - traditional for horary)
-        try:
-            houses_data, ascmc = swe.houses(jd_ut, lat, lon, b'R')  # Regiomontanus
-            houses = list(houses_data)
-            ascendant = ascmc[0]
-            midheaven = ascmc[1]
-        except Exception as e:
-            logger.error(f"Error calculating houses: {e}")
-            ascendant = 0.0
-            midheaven = 90.0
-            houses = [i * 30.0 for i in range(12)]
-        
-        # Calculate house positions and house rulers
-        house_rulers = {}
-        for i, cusp in enumerate(houses, 1):
-            sign = self._get_sign(cusp)
-            house_rulers[i] = sign.ruler
-        
-        # Update planet house positions
-        for planet_pos in planets.values():
-            house = self._calculate_house_position(planet_pos.longitude, houses)
-            planet_pos.house = house
+        with span("chart.houses"):
+            try:
+                houses_data, ascmc = swe.houses(jd_ut, lat, lon, b'R')  # Regiomontanus
+                houses = list(houses_data)
+                ascendant = ascmc[0]
+                midheaven = ascmc[1]
+            except Exception as e:
+                logger.error(f"Error calculating houses: {e}")
+                ascendant = 0.0
+                midheaven = 90.0
+                houses = [i * 30.0 for i in range(12)]
+        
+            # Calculate house positions and house rulers
+            house_rulers = {}
+            for i, cusp in enumerate(houses, 1):
+                sign = self._get_sign(cusp)
+                house_rulers[i] = sign.ruler
+        
+            # Update planet house positions
+            for planet_pos in planets.values():
+                house = self._calculate_house_position(planet_pos.longitude, houses)
+                planet_pos.house = house
         
         # Enhanced solar condition analysis
-        sun_pos = planets[Planet.SUN]
-        solar_analyses = {}
-        
-        for planet_enum, planet_pos in planets.items():
-            solar_analysis = self._analyze_enhanced_solar_condition(
-                planet_enum, planet_pos, sun_pos, lat, lon, jd_ut)
-            solar_analyses[planet_enum] = solar_analysis
+        with span("chart.solar"):
+            sun_pos = planets[Planet.SUN]
+            solar_analyses = {}
+        
+            for planet_enum, planet_pos in planets.items():
+                solar_analysis = self._analyze_enhanced_solar_condition(
+                    planet_enum, planet_pos, sun_pos, lat, lon, jd_ut)
+                solar_analyses[planet_enum] = solar_analysis
             
-            # Calculate dignity with enhanced solar conditions
-            planet_pos.dignity_score = self._calculate_enhanced_dignity(
-                planet_pos.planet, planet_pos.sign, planet_pos.house, solar_analysis)
+                # Calculate dignity with enhanced solar conditions
+                planet_pos.dignity_score = self._calculate_enhanced_dignity(
+                    planet_pos.planet, planet_pos.sign, planet_pos.house, solar_analysis)
         
         # Calculate enhanced traditional aspects
-        aspects = self._calculate_enhanced_aspects(planets, jd_ut)
+        with span("chart.aspects"):
+            aspects = self._calculate_enhanced_aspects(planets, jd_ut)
         
         # NEW: Calculate last and next lunar aspects
-        moon_last_aspect = self._calculate_moon_last_aspect(planets, jd_ut)
-        moon_next_aspect = self._calculate_moon_next_aspect(planets, jd_ut)
+        with span("chart.lunar_aspects"):
+            moon_last_aspect = self._calculate_moon_last_aspect(planets, jd_ut)
+            moon_next_aspect = self._calculate_moon_next_aspect(planets, jd_ut)
         
         chart = HoraryChart(
             date_time=dt_local,
@@ -773,10 +840,31 @@ class EnhancedTraditionalAstrologicalCalculator:
         
         return chart
     
+    def calculate_charts(self, times: List[datetime.datetime], locations, build_charts: bool = False):
+        """
+        Calculate many charts in one vectorized pass (see horary_batch)
+        
+        Args:
+            times: Chart moments; naive datetimes are taken as UTC
+            locations: One (lat, lon[, name]) tuple for all times, or one per time
+            build_charts: Return HoraryChart objects instead of the array batch
+        
+        Returns:
+            ChartBatch with NumPy arrays, or a list of HoraryChart
+        """
+        from horary_batch import calculate_charts
+        
+        batch = calculate_charts(self, times, locations)
+        return batch.to_charts() if build_charts else batch
+    
     def _calculate_moon_last_aspect(self, planets: Dict[Planet, PlanetPosition], 
                                    jd_ut: float) -> Optional[LunarAspect]:
         """Calculate Moon's last separating aspect"""
         
+        index = self._lunar_aspect_index(jd_ut)
+        if index is not None:
+            return self._moon_aspect_from_index(planets, jd_ut, index, applying=False)
+        
         moon_pos = planets[Planet.MOON]
         moon_speed = self.get_real_moon_speed(jd_ut)
         
@@ -824,6 +912,10 @@ class EnhancedTraditionalAstrologicalCalculator:
                                    jd_ut: float) -> Optional[LunarAspect]:
         """Calculate Moon's next applying aspect"""
         
+        index = self._lunar_aspect_index(jd_ut)
+        if index is not None:
+            return self._moon_aspect_from_index(planets, jd_ut, index, applying=True)
+        
         moon_pos = planets[Planet.MOON]
         moon_speed = self.get_real_moon_speed(jd_ut)
         
@@ -867,6 +959,58 @@ class EnhancedTraditionalAstrologicalCalculator:
         
         return None
     
+    def _lunar_aspect_window_days(self) -> float:
+        """Longest time the Moon can stay within (1.5x) orb of an exact aspect"""
+        return 1.5 * max(aspect.orb for aspect in Aspect) / MIN_LUNAR_ELONGATION_SPEED
+    
+    def _lunar_aspect_index(self, jd_ut: float):
+        """Lunar aspect index covering the orb window around jd_ut, or None if not built or not covering it"""
+        window = self._lunar_aspect_window_days()
+        return get_lunar_aspect_index(jd_ut - window, jd_ut + window)
+    
+    def _moon_aspect_from_index(self, planets: Dict[Planet, PlanetPosition], jd_ut: float,
+                                index, applying: bool) -> Optional[LunarAspect]:
+        """Nearest indexed Moon perfection (before or after jd_ut) still within orb"""
+        
+        moon_pos = planets[Planet.MOON]
+        planets_by_id = {planet_id: planet for planet, planet_id in self.planets_swe.items()}
+        aspects_by_degrees = {aspect.degrees: aspect for aspect in Aspect}
+        
+        window = self._lunar_aspect_window_days()
+        if applying:
+            perfections = index.next_perfections(jd_ut, window)
+        else:
+            perfections = index.last_perfections(jd_ut, window)
+        
+        for perfection_jd, planet_id, aspect_degrees in perfections:
+            planet = planets_by_id.get(planet_id)
+            if planet not in planets:
+                continue
+            aspect_type = aspects_by_degrees[aspect_degrees]
+            
+            separation = abs(moon_pos.longitude - planets[planet].longitude)
+            if separation > 180:
+                separation = 360 - separation
+            orb_diff = abs(separation - aspect_type.degrees)
+            
+            # Same orb limits as the direct calculation (wider for separating)
+            if orb_diff > aspect_type.orb * (1.0 if applying else 1.5):
+                continue
+            
+            days = abs(perfection_jd - jd_ut)
+            return LunarAspect(
+                planet=planet,
+                aspect=aspect_type,
+                orb=orb_diff,
+                degrees_difference=orb_diff,
+                perfection_eta_days=days,
+                perfection_eta_description=(self._format_timing_description(days) if applying
+                                            else f"{days:.1f} days ago"),
+                applying=applying
+            )
+        
+        return None
+    
     def _is_moon_separating_from_aspect(self, moon_pos: PlanetPosition, 
                                        planet_pos: PlanetPosition, aspect: Aspect, 
                                        moon_speed: float) -> bool:
@@ -948,10 +1092,11 @@ class EnhancedTraditionalAstrologicalCalculator:
         # Calculate elongation
         elongation = calculate_elongation(planet_pos.longitude, sun_pos.longitude)
         
-        # Get configured orbs
-        cazimi_orb = cfg().orbs.cazimi_orb_arcmin / 60.0  # Convert arcminutes to degrees
-        combustion_orb = cfg().orbs.combustion_orb
-        under_beams_orb = cfg().orbs.under_beams_orb
+        # Get configured orbs (cazimi already converted to degrees)
+        orbs = self.settings.orbs
+        cazimi_orb = orbs.cazimi_orb
+        combustion_orb = orbs.combustion_orb
+        under_beams_orb = orbs.under_beams_orb
         
         # Enhanced visibility check for Venus and Mercury
         traditional_exception = False
@@ -1053,130 +1198,155 @@ class EnhancedTraditionalAstrologicalCalculator:
     
     def _calculate_enhanced_dignity(self, planet: Planet, sign: Sign, house: int, 
                                   solar_analysis: Optional[SolarAnalysis] = None) -> int:
-        """Enhanced dignity calculation with configuration"""
+        """Enhanced dignity calculation with configuration (precomputed table lookup)"""
+        planet_index = self._planet_index.get(planet)
+        if planet_index is None or not 0 <= house <= 12:
+            return self._essential_dignity(planet, sign, house) + self._solar_dignity(solar_analysis)
+        
+        score = self._dignity_rows[planet_index][self._sign_index[sign]][house]
+        if solar_analysis:
+            score += self._solar_dignity_rows[self._solar_index[solar_analysis.condition]][
+                solar_analysis.exact_cazimi][solar_analysis.traditional_exception]
+        return score
+    
+    def _essential_dignity(self, planet: Planet, sign: Sign, house: int) -> int:
+        """Essential and house dignity from the traditional rules"""
         score = 0
-        config = cfg()
+        weights = self.settings.dignity
         
         # Rulership
         if sign.ruler == planet:
-            score += config.dignity.rulership
+            score += weights.rulership
         
         # Exaltation
         if planet in self.exaltations and self.exaltations[planet] == sign:
-            score += config.dignity.exaltation
+            score += weights.exaltation
         
         # Detriment - opposite to rulership
-        detriment_signs = {
-            Planet.SUN: [Sign.AQUARIUS],
-            Planet.MOON: [Sign.CAPRICORN],
-            Planet.MERCURY: [Sign.PISCES, Sign.SAGITTARIUS],
-            Planet.VENUS: [Sign.ARIES, Sign.SCORPIO],
-            Planet.MARS: [Sign.LIBRA, Sign.TAURUS],
-            Planet.JUPITER: [Sign.GEMINI, Sign.VIRGO],
-            Planet.SATURN: [Sign.CANCER, Sign.LEO]
-        }
-        
-        if planet in detriment_signs and sign in detriment_signs[planet]:
-            score += config.dignity.detriment
+        if planet in self.detriments and sign in self.detriments[planet]:
+            score += weights.detriment
         
         # Fall
         if planet in self.falls and self.falls[planet] == sign:
-            score += config.dignity.fall
+            score += weights.fall
         
         # House considerations - traditional joys
-        house_joys = {
-            Planet.MERCURY: 1,  # 1st house
-            Planet.MOON: 3,     # 3rd house
-            Planet.VENUS: 5,    # 5th house
-            Planet.MARS: 6,     # 6th house
-            Planet.SUN: 9,      # 9th house
-            Planet.JUPITER: 11, # 11th house
-            Planet.SATURN: 12   # 12th house
-        }
-        
-        if planet in house_joys and house_joys[planet] == house:
-            score += config.dignity.joy
-        
-        # Angular houses
-        if house in [1, 4, 7, 10]:
-            score += config.dignity.angular
-        elif house in [2, 5, 8, 11]:  # Succedent houses
-            score += config.dignity.succedent
-        elif house in [3, 6, 9, 12]:  # Cadent houses
-            score += config.dignity.cadent
+        if planet in self.house_joys and self.house_joys[planet] == house:
+            score += weights.joy
         
-        # Enhanced solar conditions
-        if solar_analysis:
-            condition = solar_analysis.condition
-            
-            if condition == SolarCondition.CAZIMI:
-                # Cazimi overrides ALL negative conditions
-                if solar_analysis.exact_cazimi:
-                    score += config.confidence.solar.exact_cazimi_bonus
-                else:
-                    score += config.confidence.solar.cazimi_bonus
-                    
-            elif condition == SolarCondition.COMBUSTION:
-                if not solar_analysis.traditional_exception:
-                    score -= config.confidence.solar.combustion_penalty
-                
-            elif condition == SolarCondition.UNDER_BEAMS:
-                if not solar_analysis.traditional_exception:
-                    score -= config.confidence.solar.under_beams_penalty
+        # Angular, succedent and cadent houses
+        if 1 <= house <= 12:
+            score += weights.house[house]
         
         return score
     
+    def _solar_dignity(self, solar_analysis: Optional[SolarAnalysis]) -> int:
+        """Dignity modifier for the planet's solar condition"""
+        if not solar_analysis:
+            return 0
+        
+        weights = self.settings.dignity
+        condition = solar_analysis.condition
+        
+        if condition == SolarCondition.CAZIMI:
+            # Cazimi overrides ALL negative conditions
+            if solar_analysis.exact_cazimi:
+                return weights.exact_cazimi_bonus
+            return weights.cazimi_bonus
+        
+        if condition == SolarCondition.COMBUSTION:
+            if not solar_analysis.traditional_exception:
+                return -weights.combustion_penalty
+        
+        elif condition == SolarCondition.UNDER_BEAMS:
+            if not solar_analysis.traditional_exception:
+                return -weights.under_beams_penalty
+        
+        return 0
+    
+    def _build_dignity_table(self) -> np.ndarray:
+        """(planet, sign, house) essential dignity scores; house 0 means no house"""
+        table = np.empty((len(self.traditional_planets), len(Sign), 13), dtype=np.int64)
+        for p, planet in enumerate(self.traditional_planets):
+            for s, sign in enumerate(Sign):
+                for house in range(13):
+                    table[p, s, house] = self._essential_dignity(planet, sign, house)
+        table.flags.writeable = False
+        return table
+    
+    def _build_solar_dignity_table(self) -> np.ndarray:
+        """(solar condition, exact cazimi, traditional exception) dignity modifiers"""
+        table = np.empty((len(SolarCondition), 2, 2), dtype=np.int64)
+        for c, condition in enumerate(SolarCondition):
+            for exact in (False, True):
+                for exception in (False, True):
+                    table[c, int(exact), int(exception)] = self._solar_dignity(SolarAnalysis(
+                        planet=Planet.SUN, distance_from_sun=0.0, condition=condition,
+                        exact_cazimi=exact, traditional_exception=exception))
+        table.flags.writeable = False
+        return table
+    
     def _calculate_enhanced_aspects(self, planets: Dict[Planet, PlanetPosition], 
                                   jd_ut: float) -> List[AspectInfo]:
-        """Enhanced aspect calculation with configuration"""
-        aspects = []
+        """Enhanced aspect calculation with configuration (vectorized over planet pairs)"""
         planet_list = list(planets.keys())
-        config = cfg()
+        aspect_list = list(Aspect)
         
-        for i, planet1 in enumerate(planet_list):
-            for planet2 in planet_list[i+1:]:
-                pos1 = planets[planet1]
-                pos2 = planets[planet2]
-                
-                # Calculate angular separation
-                angle_diff = abs(pos1.longitude - pos2.longitude)
-                if angle_diff > 180:
-                    angle_diff = 360 - angle_diff
-                
-                # Check each traditional aspect
-                for aspect_type in Aspect:
-                    orb_diff = abs(angle_diff - aspect_type.degrees)
-                    
-                    # Configured orbs
-                    max_orb = aspect_type.orb
-                    
-                    # Luminary bonuses
-                    if Planet.SUN in [planet1, planet2]:
-                        max_orb += config.orbs.sun_orb_bonus
-                    if Planet.MOON in [planet1, planet2]:
-                        max_orb += config.orbs.moon_orb_bonus
-                    
-                    if orb_diff <= max_orb:
-                        # Determine if applying
-                        applying = self._is_applying_enhanced(pos1, pos2, aspect_type, jd_ut)
-                        
-                        # Calculate degrees to exact and timing
-                        degrees_to_exact, exact_time = self._calculate_enhanced_degrees_to_exact(
-                            pos1, pos2, aspect_type, jd_ut)
-                        
-                        aspects.append(AspectInfo(
-                            planet1=planet1,
-                            planet2=planet2,
-                            aspect=aspect_type,
-                            orb=orb_diff,
-                            applying=applying,
-                            exact_time=exact_time,
-                            degrees_to_exact=degrees_to_exact
-                        ))
-                        break
+        longitude = np.array([planets[p].longitude for p in planet_list])
+        speed = np.array([planets[p].speed for p in planet_list])
+        
+        aspect, orb = find_aspects(longitude, [a.degrees for a in aspect_list],
+                                   self._aspect_orb_limits(planet_list))
+        if not (aspect >= 0).any():
+            return []
+        
+        # Sign exits once per planet rather than once per aspected pair
+        days_to_exit = np.array([self._days_to_sign_exit(planets[p], jd_ut) or np.nan for p in planet_list])
+        applying = applying_flags(longitude, speed, aspect, [a.degrees for a in aspect_list],
+                                  days_to_exit, self.settings.timing.timing_precision_days)
+        to_exact = degrees_to_exact(orb)
+        
+        pairs = np.nonzero(aspect >= 0)
+        aspects = []
+        for i, j, a, pair_orb, pair_applying, pair_to_exact in zip(
+                pairs[0].tolist(), pairs[1].tolist(), aspect[pairs].tolist(), orb[pairs].tolist(),
+                applying[pairs].tolist(), to_exact[pairs].tolist()):
+            aspect_type = aspect_list[a]
+            pos1 = planets[planet_list[i]]
+            pos2 = planets[planet_list[j]]
+            
+            exact_time = None
+            if pair_applying:
+                exact_time = self._exact_perfection_time(pos1, pos2, aspect_type, jd_ut)
+            
+            aspects.append(AspectInfo(
+                planet1=pos1.planet,
+                planet2=pos2.planet,
+                aspect=aspect_type,
+                orb=pair_orb,
+                applying=pair_applying,
+                exact_time=exact_time,
+                degrees_to_exact=pair_to_exact
+            ))
         
         return aspects
     
+    def _aspect_orb_limits(self, planet_list: List[Planet]) -> np.ndarray:
+        """(aspects, planets, planets) maximum orbs including luminary bonuses"""
+        orbs = self.settings.orbs
+        if planet_list == self.traditional_planets:
+            return orbs.limits
+        bonuses = [
+            orbs.sun_orb_bonus if planet == Planet.SUN else
+            orbs.moon_orb_bonus if planet == Planet.MOON else 0.0
+            for planet in planet_list
+        ]
+        return orb_limits(orbs.aspect_orbs, bonuses)
+    
+    def _days_to_sign_exit(self, pos: PlanetPosition, jd_ut: float) -> Optional[float]:
+        """Days until a planet leaves its sign, from the ingress index when available"""
+        return days_to_sign_exit(pos.longitude, pos.speed, self.planets_swe.get(pos.planet), jd_ut)
+    
     def _is_applying_enhanced(self, pos1: PlanetPosition, pos2: PlanetPosition, 
                             aspect: Aspect, jd_ut: float) -> bool:
         """Enhanced applying check with directional sign-exit check"""
@@ -1212,8 +1382,8 @@ class EnhancedTraditionalAstrologicalCalculator:
         days_to_perfect = current_orb / abs(faster.speed - slower.speed) if abs(faster.speed - slower.speed) > 0 else float('inf')
         
         # Check days until each planet exits its current sign (directional)
-        faster_days_to_exit = days_to_sign_exit(faster.longitude, faster.speed)
-        slower_days_to_exit = days_to_sign_exit(slower.longitude, slower.speed)
+        faster_days_to_exit = self._days_to_sign_exit(faster, jd_ut)
+        slower_days_to_exit = self._days_to_sign_exit(slower, jd_ut)
         
         # If either planet exits sign before perfection, aspect does not apply
         if faster_days_to_exit and days_to_perfect > faster_days_to_exit:
@@ -1222,7 +1392,7 @@ class EnhancedTraditionalAstrologicalCalculator:
             return False
         
         # Calculate future position to confirm applying
-        time_increment = cfg().timing.timing_precision_days
+        time_increment = self.settings.timing.timing_precision_days
         future_separation = separation + (faster.speed - slower.speed) * time_increment
         
         # Normalize future separation
@@ -1236,7 +1406,8 @@ class EnhancedTraditionalAstrologicalCalculator:
         return future_orb < current_orb
     
     def _calculate_enhanced_degrees_to_exact(self, pos1: PlanetPosition, pos2: PlanetPosition, 
-                                           aspect: Aspect, jd_ut: float) -> Tuple[float, Optional[datetime.datetime]]:
+                                           aspect: Aspect, jd_ut: float,
+                                           applying: bool = True) -> Tuple[float, Optional[datetime.datetime]]:
         """Enhanced degrees and time calculation"""
         
         # Current separation
@@ -1247,21 +1418,9 @@ class EnhancedTraditionalAstrologicalCalculator:
         # Orb from exact
         orb_from_exact = abs(separation - aspect.degrees)
         
-        # Calculate exact time if planets are applying
-        exact_time = None
-        if abs(pos1.speed - pos2.speed) > 0:
-            days_to_exact = orb_from_exact / abs(pos1.speed - pos2.speed)
-            
-            max_future_days = cfg().timing.max_future_days
-            if days_to_exact < max_future_days:
-                try:
-                    exact_jd = jd_ut + days_to_exact
-                    # Convert back to datetime
-                    year, month, day, hour = swe.jdut1_to_utc(exact_jd, 1)  # Flag 1 for Gregorian
-                    exact_time = datetime.datetime(int(year), int(month), int(day), 
-                                                 int(hour), int((hour % 1) * 60))
-                except:
-                    exact_time = None
+        # Exact time of perfection for applying aspects, solved on the real
+        # motion so stations before perfection are respected
+        exact_time = self._exact_perfection_time(pos1, pos2, aspect, jd_ut) if applying else None
         
         # If already very close, return small value
         if orb_from_exact < 0.1:
@@ -1269,6 +1428,14 @@ class EnhancedTraditionalAstrologicalCalculator:
         
         return orb_from_exact, exact_time
     
+    def _exact_perfection_time(self, pos1: PlanetPosition, pos2: PlanetPosition,
+                               aspect: Aspect, jd_ut: float) -> Optional[datetime.datetime]:
+        """UTC time the aspect perfects on the real motion, or None beyond max_future_days"""
+        exact_jd = self.perfection_solver.next_perfection(
+            self.planets_swe[pos1.planet], self.planets_swe[pos2.planet], aspect.degrees,
+            jd_ut, self.settings.timing.max_future_days)
+        return jd_to_datetime(exact_jd) if exact_jd is not None else None
+    
     def _get_sign(self, longitude: float) -> Sign:
         """Get zodiac sign from longitude"""
         longitude = longitude % 360
@@ -1295,20 +1462,37 @@ class EnhancedTraditionalAstrologicalCalculator:
         return 1
 
 
+# Live calculators, refreshed on every configuration reset so that no
+# engine keeps judging with the settings of a configuration since replaced
+_calculators: "weakref.WeakSet[EnhancedTraditionalAstrologicalCalculator]" = weakref.WeakSet()
+
+
+def _reload_calculators() -> None:
+    for calculator in list(_calculators):
+        calculator.reload_settings()
+
+
+on_config_reset(_reload_calculators)
+
+
 class EnhancedTraditionalHoraryJudgmentEngine:
     """Enhanced Traditional horary judgment engine with configuration system"""
     
-    def __init__(self):
+    def __init__(self, services: Optional[ServiceRegistry] = None):
+        self.services = services or get_services()
         self.question_analyzer = TraditionalHoraryQuestionAnalyzer()
-        self.calculator = EnhancedTraditionalAstrologicalCalculator()
-        self.timezone_manager = TimezoneManager()
-        
-        # Enhanced location service
-        try:
-            from geopy.geocoders import Nominatim
-            self.geolocator = Nominatim(user_agent="enhanced_horary_astrology")
-        except:
-            self.geolocator = None
+        self.calculator = EnhancedTraditionalAstrologicalCalculator(self.services)
+        self.timezone_manager = self.services.timezone_manager
+    
+    @property
+    def settings(self):
+        """The calculator's configuration snapshot (follows configuration resets)"""
+        return self.calculator.settings
+    
+    @property
+    def geolocator(self):
+        """Shared Nominatim client (created on first use)"""
+        return self.services.geocoder
     
     def judge_question(self, question: str, location: str, 
                       date_str: Optional[str] = None, time_str: Optional[str] = None,
@@ -1329,28 +1513,26 @@ class EnhancedTraditionalHoraryJudgmentEngine:
             if exaltation_confidence_boost is None:
                 exaltation_confidence_boost = config.confidence.reception.mutual_exaltation_bonus
             
-            # Fail-fast geocoding
-            if self.geolocator:
-                try:
-                    lat, lon, full_location = safe_geocode(location)
-                except LocationError as e:
-                    raise e
-            else:
-                raise LocationError("Geocoding service not available")
+            # Fail-fast geocoding (offline gazetteer, then queued Nominatim);
+            # the question is analyzed while a web lookup is pending
+            geocode_future = safe_geocode_async(location)
+            with span("question_analysis"):
+                question_analysis = self.question_analyzer.analyze_question(question)
+            with span("geocode"):
+                lat, lon, full_location = wait_for_geocode(geocode_future, location)
             
             # Handle datetime with proper timezone support
-            if use_current_time:
-                dt_local, dt_utc, timezone_used = self.timezone_manager.get_current_time_for_location(lat, lon)
-            else:
-                if not date_str or not time_str:
-                    raise ValueError("Date and time must be provided when not using current time")
-                dt_local, dt_utc, timezone_used = self.timezone_manager.parse_datetime_with_timezone(
-                    date_str, time_str, timezone_str, lat, lon)
-            
-            chart = self.calculator.calculate_chart(dt_local, dt_utc, timezone_used, lat, lon, full_location)
+            with span("timezone"):
+                if use_current_time:
+                    dt_local, dt_utc, timezone_used = self.timezone_manager.get_current_time_for_location(lat, lon)
+                else:
+                    if not date_str or not time_str:
+                        raise ValueError("Date and time must be provided when not using current time")
+                    dt_local, dt_utc, timezone_used = self.timezone_manager.parse_datetime_with_timezone(
+                        date_str, time_str, timezone_str, lat, lon)
             
-            # Analyze question traditionally
-            question_analysis = self.question_analyzer.analyze_question(question)
+            with span("chart"):
+                chart = self.calculator.calculate_chart(dt_local, dt_utc, timezone_used, lat, lon, full_location)
             
             # Override with manual houses if provided
             if manual_houses:
@@ -1358,16 +1540,22 @@ class EnhancedTraditionalHoraryJudgmentEngine:
                 question_analysis["significators"]["quesited_house"] = manual_houses[1] if len(manual_houses) > 1 else 7
             
             # Apply enhanced judgment with configuration
-            judgment = self._apply_enhanced_judgment(
-                chart, question_analysis, 
-                ignore_radicality, ignore_void_moon, ignore_combustion, ignore_saturn_7th,
-                exaltation_confidence_boost)
+            with span("judgment"):
+                judgment = self._apply_enhanced_judgment(
+                    chart, question_analysis, 
+                    ignore_radicality, ignore_void_moon, ignore_combustion, ignore_saturn_7th,
+                    exaltation_confidence_boost)
             
             # Serialize chart data for frontend
-            chart_data_serialized = serialize_chart_for_frontend(chart, chart.solar_analyses)
+            with span("serialize"):
+                chart_data_serialized = serialize_chart_for_frontend(chart, chart.solar_analyses)
 
-            general_info = self._calculate_general_info(chart)
-            considerations = self._calculate_considerations(chart, question_analysis)
+            with span("general_info"):
+                general_info = self._calculate_general_info(chart)
+            with span("considerations"):
+                considerations = self._calculate_considerations(chart, question_analysis)
+            with span("moon_story"):
+                moon_story = self._build_moon_story(chart)
 
             return {
                 "question": question,
@@ -1379,7 +1567,7 @@ class EnhancedTraditionalHoraryJudgmentEngine:
                 
                 "question_analysis": question_analysis,
                 "timing": judgment.get("timing"),
-                "moon_aspects": self._build_moon_story(chart),  # Enhanced Moon story
+                "moon_aspects": moon_story,  # Enhanced Moon story
                 "traditional_factors": judgment.get("traditional_factors", {}),
                 "solar_factors": judgment.get("solar_factors", {}),
                 "general_info": general_info,
@@ -1447,55 +1635,19 @@ class EnhancedTraditionalHoraryJudgmentEngine:
         if elongation > 180:
             elongation = 360 - elongation
         
-        config = cfg()
-        
-        # Determine phase and return bonus
-        if 0 <= elongation < 30:
-            return config.moon.phase_bonus.new_moon
-        elif 30 <= elongation < 60:
-            return config.moon.phase_bonus.waxing_crescent
-        elif 60 <= elongation < 120:
-            return config.moon.phase_bonus.first_quarter
-        elif 120 <= elongation < 150:
-            return config.moon.phase_bonus.waxing_gibbous
-        elif 150 <= elongation < 210:
-            return config.moon.phase_bonus.full_moon
-        elif 210 <= elongation < 240:
-            return config.moon.phase_bonus.waning_gibbous
-        elif 240 <= elongation < 300:
-            return config.moon.phase_bonus.last_quarter
-        else:  # 300 <= elongation < 360
-            return config.moon.phase_bonus.waning_crescent
+        return self.settings.moon.phase_bonus(elongation)
     
     def _moon_speed_bonus(self, chart: HoraryChart) -> int:
         """Calculate Moon speed bonus from configuration"""
         
         moon_speed = abs(chart.planets[Planet.MOON].speed)
-        config = cfg()
-        
-        if moon_speed < 11.0:
-            return config.moon.speed_bonus.very_slow
-        elif moon_speed < 12.0:
-            return config.moon.speed_bonus.slow
-        elif moon_speed < 14.0:
-            return config.moon.speed_bonus.average
-        elif moon_speed < 15.0:
-            return config.moon.speed_bonus.fast
-        else:
-            return config.moon.speed_bonus.very_fast
+        return self.settings.moon.speed_bonus(moon_speed)
     
     def _moon_angularity_bonus(self, chart: HoraryChart) -> int:
         """Calculate Moon angularity bonus from configuration"""
         
         moon_house = chart.planets[Planet.MOON].house
-        config = cfg()
-        
-        if moon_house in [1, 4, 7, 10]:
-            return config.moon.angularity_bonus.angular
-        elif moon_house in [2, 5, 8, 11]:
-            return config.moon.angularity_bonus.succedent
-        else:  # cadent houses 3, 6, 9, 12
-            return config.moon.angularity_bonus.cadent
+        return self.settings.moon.angularity[moon_house]
 
     # ---------------- General Info Helpers -----------------
 
@@ -1829,8 +1981,47 @@ class EnhancedTraditionalHoraryJudgmentEngine:
                     "reason": f"Frustration - {'querent' if querent_pos.retrograde else 'quesited'} significator retrograde"
                 }
         
+        # Future retrograde frustration - a significator turns retrograde before perfection
+        if getattr(config.retrograde, "future_frustration", False):
+            frustration = self._check_future_retrograde_frustration(chart, querent, quesited)
+            if frustration:
+                return {
+                    "denied": True,
+                    "confidence": config.confidence.denial.frustration_retrograde,
+                    "reason": frustration
+                }
+        
         return {"denied": False}
     
+    def _check_future_retrograde_frustration(self, chart: HoraryChart, querent: Planet,
+                                             quesited: Planet) -> Optional[str]:
+        """Reason string if a direct significator stations before the applying aspect perfects"""
+        
+        sig_aspect = self._find_applying_aspect(chart, querent, quesited)
+        if not sig_aspect:
+            return None
+        
+        querent_pos = chart.planets[querent]
+        quesited_pos = chart.planets[quesited]
+        relative_speed = abs(querent_pos.speed - quesited_pos.speed)
+        if relative_speed == 0:
+            return None
+        
+        days_to_perfection = sig_aspect["degrees_to_exact"] / relative_speed
+        
+        for planet, planet_pos in ((querent, querent_pos), (quesited, quesited_pos)):
+            # Only a direct planet can turn retrograde at its next station
+            if planet_pos.retrograde or planet not in self.calculator.planets_swe:
+                continue
+            
+            station_jd = calculate_next_station_time(self.calculator.planets_swe[planet],
+                                                     chart.julian_day, max_days=days_to_perfection)
+            if station_jd is not None:
+                return (f"Frustration - {planet.value} turns retrograde in "
+                        f"{station_jd - chart.julian_day:.1f} days, before perfection")
+        
+        return None
+    
     def _check_enhanced_translation_of_light(self, chart: HoraryChart, querent: Planet, quesited: Planet) -> Dict[str, Any]:
         """Enhanced translation with configurable speed requirement removal"""
         
@@ -2366,8 +2557,8 @@ class EnhancedTraditionalHoraryJudgmentEngine:
                 querent_pos = chart.planets[querent]
                 quesited_pos = chart.planets[quesited]
                 
-                querent_days_to_sign = days_to_sign_exit(querent_pos.longitude, querent_pos.speed)
-                quesited_days_to_sign = days_to_sign_exit(quesited_pos.longitude, quesited_pos.speed)
+                querent_days_to_sign = self.calculator._days_to_sign_exit(querent_pos, chart.julian_day)
+                quesited_days_to_sign = self.calculator._days_to_sign_exit(quesited_pos, chart.julian_day)
                 
                 # Calculate days to perfect both collection aspects
                 max_collection_days = max(
@@ -2398,8 +2589,8 @@ class EnhancedTraditionalHoraryJudgmentEngine:
         """Enhanced perfection check with directional awareness"""
         
         # Use enhanced sign exit calculations
-        days_to_exit_1 = days_to_sign_exit(pos1.longitude, pos1.speed)
-        days_to_exit_2 = days_to_sign_exit(pos2.longitude, pos2.speed)
+        days_to_exit_1 = self.calculator._days_to_sign_exit(pos1, chart.julian_day)
+        days_to_exit_2 = self.calculator._days_to_sign_exit(pos2, chart.julian_day)
         
         # Estimate days until aspect perfects
         relative_speed = abs(pos1.speed - pos2.speed)
@@ -2516,21 +2707,52 @@ class HoraryEngine:
     This is the main entry point as specified in the requirements
     """
     
-    def __init__(self):
-        self.engine = EnhancedTraditionalHoraryJudgmentEngine()
+    def __init__(self, services: Optional[ServiceRegistry] = None):
+        self.services = services or get_services()
+        self.engine = EnhancedTraditionalHoraryJudgmentEngine(self.services)
     
-    def judge(self, question: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    def judge(self, question: str, settings: Dict[str, Any], shared: bool = True) -> Dict[str, Any]:
         """
         Main entry point for horary judgment as specified in requirements
         
         Args:
             question: The horary question to judge
             settings: Dictionary containing all judgment settings
+            shared: False computes afresh, bypassing the response cache and
+                request coalescing (e.g. to profile the computation)
         
         Returns:
             Dictionary with judgment result and analysis
         """
         
+        if not shared:
+            return self._judge(question, settings)
+        
+        # Repeated requests are answered from the response cache; "current
+        # time" entries only live until the end of their minute
+        cache = get_response_cache()
+        with span("response_cache"):
+            cache_key, expires = response_key(question, settings, config=self.engine.settings)
+            cached = cache.get(cache_key)
+        if cached is not None:
+            cached["question"] = question
+            return cached
+
+        # Identical concurrent requests share one computation; "current time"
+        # charts are only shared while in flight, never replayed afterwards
+        key_settings = dict(settings)
+        key_settings["location"] = normalize_location_key(settings.get("location", "London, England"))
+        result = get_singleflight("judge").do(
+            request_key(question.strip(), key_settings),
+            lambda: self._judge(question, settings),
+            result_ttl=0 if settings.get("use_current_time", True) else None)
+        if not result.get("error"):
+            cache.put(cache_key, result, expires)
+        return result
+    
+    def _judge(self, question: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Uncoalesced judge()"""
+        
         # Extract settings with defaults
         location = settings.get("location", "London, England")
         date_str = settings.get("date")
@@ -2815,7 +3037,7 @@ def setup_horary_logging(level: str = "INFO", log_file: Optional[str] = None) ->
 
 # Performance monitoring helpers
 def profile_calculation(func):
-    """Decorator to profile calculation performance"""
+    """Decorator to profile calculation performance (also traced as a span, see horary_tracing)"""
     import time
     import functools
     
@@ -2823,7 +3045,8 @@ def profile_calculation(func):
     def wrapper(*args, **kwargs):
         start_time = time.time()
         try:
-            result = func(*args, **kwargs)
+            with span(func.__name__):
+                result = func(*args, **kwargs)
             end_time = time.time()
             execution_time = end_time - start_time
             
@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Ephemeris Backends
+Pluggable sources of planetary longitude, latitude and speed for the calculator
+
+Swiss Ephemeris is the reference backend. The table backend evaluates
+precomputed per-planet Chebyshev coefficient tables that are memory-mapped
+from disk, so every worker process shares the same pages and a position
+costs one small polynomial evaluation instead of a swe.calc_ut call.
+
+Build the tables once (default span 1800-2200):
+    python horary_ephemeris.py build --out ephemeris_tables
+    python horary_ephemeris.py verify --tables ephemeris_tables --samples 20000
+
+Select them in horary_constants.yaml:
+    ephemeris:
+      backend: "tables"
+      tables_path: "ephemeris_tables"
+
+Created for horary_engine.py performance work
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from horary_config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+SWE_FLAGS = swe.FLG_SWIEPH | swe.FLG_SPEED
+
+TABLE_FORMAT_VERSION = 1
+
+# Segment length in days and Chebyshev coefficient count per planet.
+# Chosen so every planet stays well inside TABLE_TOLERANCE over 1800-2200.
+TABLE_LAYOUT = {
+    swe.SUN: (16.0, 13),
+    swe.MOON: (4.0, 15),
+    swe.MERCURY: (8.0, 15),
+    swe.VENUS: (16.0, 13),
+    swe.MARS: (16.0, 13),
+    swe.JUPITER: (32.0, 13),
+    swe.SATURN: (32.0, 13),
+}
+
+PLANET_FILE_NAMES = {
+    swe.SUN: "sun",
+    swe.MOON: "moon",
+    swe.MERCURY: "mercury",
+    swe.VENUS: "venus",
+    swe.MARS: "mars",
+    swe.JUPITER: "jupiter",
+    swe.SATURN: "saturn",
+}
+
+# Maximum allowed deviation from Swiss Ephemeris. Without .se1 files Swiss
+# Ephemeris falls back to the Moshier theory, whose planetary positions have
+# sub-arcsecond steps that no smooth fit follows exactly; Sun and Moon stay
+# below 0.001" and the planets below about 1.5".
+TABLE_TOLERANCE = {
+    "longitude_arcsec": 3.0,
+    "latitude_arcsec": 3.0,
+    "speed_deg_per_day": 0.01,
+}
+
+MANIFEST_NAME = "manifest.json"
+
+
+class EphemerisError(Exception):
+    """Custom exception for ephemeris table errors"""
+    pass
+
+
+class SwissEphemerisBackend:
+    """Reference backend calling Swiss Ephemeris directly"""
+
+    name = "swisseph"
+
+    def position(self, jd_ut: float, planet_id: int) -> Tuple[float, float, float]:
+        """Return (longitude, latitude, speed) in degrees and degrees/day"""
+        planet_data, _ = swe.calc_ut(jd_ut, planet_id, SWE_FLAGS)
+        return planet_data[0], planet_data[1], planet_data[3]
+
+    def positions(self, jds: np.ndarray, planet_id: int) -> np.ndarray:
+        """Return an (n, 3) array of (longitude, latitude, speed) for many Julian days"""
+        jds = np.asarray(jds, dtype=float)
+        result = np.empty((jds.size, 3))
+        for i, jd in enumerate(jds.ravel()):
+            planet_data, _ = swe.calc_ut(float(jd), planet_id, SWE_FLAGS)
+            result[i] = (planet_data[0], planet_data[1], planet_data[3])
+        return result
+
+    def describe(self) -> Dict[str, object]:
+        return {"backend": self.name}
+
+
+class _PlanetTable:
+    """Memory-mapped Chebyshev coefficients for one planet"""
+
+    __slots__ = ("coeffs", "degrees", "jd_start", "jd_end", "segment_days", "n_segments")
+
+    def __init__(self, coeffs: np.ndarray, jd_start: float, segment_days: float):
+        # Plain ndarray view over the mapping: indexing a np.memmap is several
+        # times slower and the hot path indexes one segment per call
+        self.coeffs = np.asarray(coeffs)  # (n_segments, 3, n_coeffs): longitude, latitude, speed
+        self.degrees = np.arange(coeffs.shape[2], dtype=float)
+        self.jd_start = jd_start
+        self.segment_days = segment_days
+        self.n_segments = coeffs.shape[0]
+        self.jd_end = jd_start + self.n_segments * segment_days
+
+
+class ChebyshevTableBackend:
+    """
+    Backend evaluating precomputed Chebyshev tables.
+
+    Julian days outside the table span (or planets without a table) are
+    delegated to the fallback backend, so charts never fail because of it.
+    """
+
+    name = "tables"
+
+    def __init__(self, tables_path: str, fallback: Optional[SwissEphemerisBackend] = None):
+        self.tables_path = Path(tables_path)
+        self.fallback = fallback or SwissEphemerisBackend()
+
+        manifest_file = self.tables_path / MANIFEST_NAME
+        if not manifest_file.exists():
+            raise EphemerisError(f"Ephemeris table manifest not found: {manifest_file}")
+
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format_version") != TABLE_FORMAT_VERSION:
+            raise EphemerisError(
+                f"Unsupported ephemeris table format {self.manifest.get('format_version')} "
+                f"(expected {TABLE_FORMAT_VERSION})")
+
+        self._tables: Dict[int, _PlanetTable] = {}
+        for entry in self.manifest["planets"]:
+            coeffs = np.load(self.tables_path / entry["file"], mmap_mode='r')
+            self._tables[entry["planet_id"]] = _PlanetTable(
+                coeffs, self.manifest["jd_start"], entry["segment_days"])
+
+        logger.info(f"Loaded Chebyshev ephemeris tables from {self.tables_path} "
+                    f"(JD {self.manifest['jd_start']:.1f} - {self.manifest['jd_end']:.1f})")
+
+    def covers(self, jd_ut: float, planet_id: int) -> bool:
+        table = self._tables.get(planet_id)
+        return table is not None and table.jd_start <= jd_ut < table.jd_end
+
+    def position(self, jd_ut: float, planet_id: int) -> Tuple[float, float, float]:
+        """Return (longitude, latitude, speed) in degrees and degrees/day"""
+        table = self._tables.get(planet_id)
+        if table is None or not (table.jd_start <= jd_ut < table.jd_end):
+            return self.fallback.position(jd_ut, planet_id)
+
+        index = int((jd_ut - table.jd_start) // table.segment_days)
+        segment_start = table.jd_start + index * table.segment_days
+        x = min(1.0, max(-1.0, 2.0 * (jd_ut - segment_start) / table.segment_days - 1.0))
+
+        # T_k(x) = cos(k * acos(x)) gives all basis values in one array operation
+        longitude, latitude, speed = table.coeffs[index].dot(np.cos(table.degrees * math.acos(x))).tolist()
+        return longitude % 360.0, latitude, speed
+
+    def positions(self, jds: np.ndarray, planet_id: int) -> np.ndarray:
+        """Return an (n, 3) array of (longitude, latitude, speed) for many Julian days"""
+        jds = np.asarray(jds, dtype=float).ravel()
+        table = self._tables.get(planet_id)
+        if table is None:
+            return self.fallback.positions(jds, planet_id)
+
+        result = np.empty((jds.size, 3))
+        inside = (jds >= table.jd_start) & (jds < table.jd_end)
+
+        if inside.any():
+            jd_in = jds[inside]
+            index = ((jd_in - table.jd_start) // table.segment_days).astype(np.int64)
+            segment_start = table.jd_start + index * table.segment_days
+            x = 2.0 * (jd_in - segment_start) / table.segment_days - 1.0
+
+            # Same basis evaluation as position(), batched: (m, 3, n) @ (m, n, 1)
+            basis = np.cos(np.arccos(np.clip(x, -1.0, 1.0))[:, None] * table.degrees[None, :])
+            values = np.matmul(table.coeffs[index], basis[:, :, None])[:, :, 0]
+            values[:, 0] %= 360.0
+            result[inside] = values
+
+        if not inside.all():
+            result[~inside] = self.fallback.positions(jds[~inside], planet_id)
+
+        return result
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "backend": self.name,
+            "tables_path": str(self.tables_path),
+            "jd_start": self.manifest["jd_start"],
+            "jd_end": self.manifest["jd_end"],
+            "tolerance": self.manifest.get("tolerance"),
+            "verified_max_error": self.manifest.get("verified_max_error"),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+# ---------------------------------------------------------------------------
+
+_backend = None
+
+
+def get_ephemeris_backend():
+    """
+    Get the process-wide ephemeris backend selected by configuration.
+
+    The table backend is loaded once per process; because the coefficient
+    files are memory-mapped, forked workers share the same physical pages.
+    Missing or invalid tables fall back to Swiss Ephemeris with a warning.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    try:
+        backend_name = cfg().ephemeris.backend
+    except AttributeError:
+        backend_name = "swisseph"
+
+    if backend_name == "tables":
+        try:
+            _backend = ChebyshevTableBackend(resolve_tables_path())
+        except (EphemerisError, OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ephemeris tables unavailable, using Swiss Ephemeris: {e}")
+            _backend = SwissEphemerisBackend()
+    else:
+        if backend_name != "swisseph":
+            logger.warning(f"Unknown ephemeris backend: {backend_name}, defaulting to swisseph")
+        _backend = SwissEphemerisBackend()
+
+    return _backend
+
+
+def reset_ephemeris_backend() -> None:
+    """Drop the cached backend (after a configuration reload or in tests)"""
+    global _backend
+    _backend = None
+
+
+def resolve_tables_path() -> Path:
+    """Resolve the configured tables directory relative to this file"""
+    try:
+        tables_path = cfg().ephemeris.tables_path
+    except AttributeError:
+        tables_path = "ephemeris_tables"
+
+    tables_path = Path(os.environ.get('HORARY_EPHEMERIS_TABLES', tables_path))
+    if not tables_path.is_absolute():
+        tables_path = Path(__file__).parent / tables_path
+    return tables_path
+
+
+# ---------------------------------------------------------------------------
+# Table generation and verification
+# ---------------------------------------------------------------------------
+
+def build_tables(output_dir: str, start_year: int = 1800, end_year: int = 2200,
+                 verify_samples: int = 5000) -> Dict[str, object]:
+    """
+    Fit Chebyshev tables against Swiss Ephemeris and write them to output_dir.
+
+    Each segment is sampled at Chebyshev nodes and fitted by least squares;
+    longitude is unwrapped inside the segment before fitting. The tables are
+    then checked against Swiss Ephemeris at random epochs and the build fails
+    if any error exceeds TABLE_TOLERANCE.
+
+    Returns:
+        The written manifest
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    jd_start = swe.julday(start_year, 1, 1, 0.0)
+    jd_end = swe.julday(end_year, 1, 1, 0.0)
+    reference = SwissEphemerisBackend()
+
+    planets_manifest = []
+    for planet_id, (segment_days, n_coeffs) in TABLE_LAYOUT.items():
+        started = time.time()
+        n_segments = int(np.ceil((jd_end - jd_start) / segment_days))
+        n_samples = 2 * n_coeffs
+
+        # Chebyshev nodes on [-1, 1] and their least-squares fitting matrix
+        nodes = np.cos(np.pi * (np.arange(n_samples) + 0.5) / n_samples)
+        vandermonde = np.polynomial.chebyshev.chebvander(nodes, n_coeffs - 1)
+        fit_matrix = np.linalg.pinv(vandermonde)  # (n_coeffs, n_samples)
+
+        segment_starts = jd_start + np.arange(n_segments) * segment_days
+        sample_jds = segment_starts[:, None] + (nodes[None, :] + 1.0) * segment_days / 2.0
+        samples = reference.positions(sample_jds.ravel(), planet_id).reshape(n_segments, n_samples, 3)
+
+        samples[:, :, 0] = np.unwrap(samples[:, :, 0], period=360.0, axis=1)
+        coeffs = np.einsum('cs,nsk->nkc', fit_matrix, samples)  # (n_segments, 3, n_coeffs)
+
+        file_name = f"{PLANET_FILE_NAMES[planet_id]}.npy"
+        np.save(output_path / file_name, coeffs.astype(np.float64))
+
+        planets_manifest.append({
+            "planet_id": planet_id,
+            "name": PLANET_FILE_NAMES[planet_id],
+            "file": file_name,
+            "segment_days": segment_days,
+            "n_coeffs": n_coeffs,
+            "n_segments": n_segments,
+        })
+        logger.info(f"Built {PLANET_FILE_NAMES[planet_id]} table: {n_segments} segments "
+                    f"in {time.time() - started:.1f}s")
+
+    manifest = {
+        "format_version": TABLE_FORMAT_VERSION,
+        "jd_start": jd_start,
+        "jd_end": jd_end,
+        "start_year": start_year,
+        "end_year": end_year,
+        "swisseph_version": swe.version,
+        "tolerance": TABLE_TOLERANCE,
+        "planets": planets_manifest,
+    }
+    with open(output_path / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    if verify_samples:
+        errors = verify_tables(str(output_path), samples=verify_samples)
+        manifest["verified_max_error"] = errors
+        with open(output_path / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def verify_tables(tables_path: str, samples: int = 5000, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the tables with Swiss Ephemeris at random epochs.
+
+    Returns:
+        Maximum longitude/latitude error (arcseconds) and speed error
+        (degrees/day) per planet
+
+    Raises:
+        EphemerisError: If any planet exceeds TABLE_TOLERANCE
+    """
+    tables = ChebyshevTableBackend(tables_path)
+    reference = SwissEphemerisBackend()
+    rng = np.random.default_rng(seed)
+
+    report = {}
+    failures = []
+    for planet_id, name in PLANET_FILE_NAMES.items():
+        if planet_id not in tables._tables:
+            continue
+        table = tables._tables[planet_id]
+        jds = rng.uniform(table.jd_start, table.jd_end, samples)
+
+        fast = tables.positions(jds, planet_id)
+        exact = reference.positions(jds, planet_id)
+
+        lon_error = np.abs((fast[:, 0] - exact[:, 0] + 180.0) % 360.0 - 180.0) * 3600.0
+        lat_error = np.abs(fast[:, 1] - exact[:, 1]) * 3600.0
+        speed_error = np.abs(fast[:, 2] - exact[:, 2])
+
+        report[name] = {
+            "longitude_arcsec": float(lon_error.max()),
+            "latitude_arcsec": float(lat_error.max()),
+            "speed_deg_per_day": float(speed_error.max()),
+        }
+        for key, limit in TABLE_TOLERANCE.items():
+            if report[name][key] > limit:
+                failures.append(f"{name} {key} {report[name][key]:.3g} > {limit}")
+
+    if failures:
+        raise EphemerisError(f"Ephemeris tables exceed tolerance: {'; '.join(failures)}")
+
+    return report
+
+
+def main():
+    """Command line interface for building and checking ephemeris tables"""
+    parser = argparse.ArgumentParser(description='Horary Chebyshev ephemeris tables')
+    subparsers = parser.add_subparsers(dest='command')
+
+    build_parser = subparsers.add_parser('build', help='Fit tables against Swiss Ephemeris')
+    build_parser.add_argument('--out', type=str, default=str(resolve_tables_path()),
+                              help='Output directory')
+    build_parser.add_argument('--start-year', type=int, default=1800,
+                              help='First year covered (default: 1800)')
+    build_parser.add_argument('--end-year', type=int, default=2200,
+                              help='Year the tables end at (default: 2200)')
+    build_parser.add_argument('--verify-samples', type=int, default=5000,
+                              help='Random epochs checked per planet after building')
+
+    verify_parser = subparsers.add_parser('verify', help='Check tables against Swiss Ephemeris')
+    verify_parser.add_argument('--tables', type=str, default=str(resolve_tables_path()),
+                               help='Tables directory')
+    verify_parser.add_argument('--samples', type=int, default=20000,
+                               help='Random epochs checked per planet')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.command == 'build':
+            manifest = build_tables(args.out, args.start_year, args.end_year, args.verify_samples)
+            print(json.dumps(manifest.get("verified_max_error", {}), indent=2))
+            return 0
+        elif args.command == 'verify':
+            print(json.dumps(verify_tables(args.tables, samples=args.samples), indent=2))
+            return 0
+        else:
+            parser.print_help()
+            return 1
+    except EphemerisError as e:
+        logger.error(str(e))
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,777 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Event Indexes
+Precomputed astronomical event calendars used by horary judgment
+
+Events such as planetary stations, sign ingresses and the Moon's aspect
+perfections are pure functions of time, so they are found once over a long span, stored as sorted Julian Day
+arrays and answered afterwards by binary search instead of stepping through
+(or linearly extrapolating) the ephemeris.
+
+Build the indexes once (default span from horary_constants.yaml):
+    python horary_events.py build --out event_indexes
+    python horary_events.py verify --index event_indexes --samples 200
+    python horary_events.py extend --index event_indexes --end-year 2300
+
+Configure them in horary_constants.yaml:
+    events:
+      index_path: "event_indexes"
+      start_year: 1800
+      end_year: 2200
+
+Created for horary_engine.py performance work
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from horary_config import cfg
+from horary_ephemeris import get_ephemeris_backend
+from _horary_math import find_root_brent, find_station_times, NON_STATIONING_PLANETS
+
+logger = logging.getLogger(__name__)
+
+
+EVENT_INDEX_VERSION = 1
+
+# Planets covered by the station calendar
+STATION_PLANETS = {
+    swe.MERCURY: "mercury",
+    swe.VENUS: "venus",
+    swe.MARS: "mars",
+    swe.JUPITER: "jupiter",
+    swe.SATURN: "saturn"
+}
+
+# Planets covered by the ingress index
+INGRESS_PLANETS = {
+    swe.SUN: "sun",
+    swe.MOON: "moon",
+    **STATION_PLANETS
+}
+
+# Planets the Moon's aspects are indexed to
+LUNAR_ASPECT_PLANETS = {
+    swe.SUN: "sun",
+    **STATION_PLANETS
+}
+
+# Ptolemaic aspects by the Moon's elongation from the planet at perfection
+ASPECT_ELONGATIONS = {
+    0: 0, 60: 60, 90: 90, 120: 120, 180: 180, 240: 120, 270: 90, 300: 60
+}
+
+# Slowest rate (degrees/day) at which the Moon's elongation from any planet
+# grows: Moon at apogee against Mercury at its fastest
+MIN_LUNAR_ELONGATION_SPEED = 9.5
+
+STATIONS_FILE = "stations.npz"
+INGRESSES_FILE = "ingresses.npz"
+LUNAR_ASPECTS_FILE = "lunar_aspects.npz"
+
+# Sampling step (days) inside each direct or retrograde run when finding
+# ingresses; any step works as long as the planet moves less than 180 degrees
+INGRESS_SEARCH_STEPS = {
+    swe.MOON: 1.0
+}
+DEFAULT_INGRESS_STEP = 5.0
+
+# Ingresses are refined to about 1 second
+INGRESS_TIME_TOLERANCE = 1e-5
+
+# Station directions: the planet turns retrograde (-1) or direct (+1)
+STATION_RETROGRADE = -1
+STATION_DIRECT = 1
+
+
+class EventIndexError(Exception):
+    """Event index missing, corrupt or built for another format"""
+    pass
+
+
+def _year_to_jd(year: int) -> float:
+    return swe.julday(year, 1, 1, 0.0)
+
+
+def _speed(planet_id: int, jd: float) -> float:
+    planet_data, _ = swe.calc_ut(jd, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    return planet_data[3]
+
+
+def _longitude(planet_id: int, jd: float) -> float:
+    planet_data, _ = swe.calc_ut(jd, planet_id, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    return planet_data[0]
+
+
+def _load_npz(path: Path):
+    if not path.exists():
+        raise EventIndexError(f"Event index not found: {path}")
+    data = np.load(path)
+    if int(data["version"]) != EVENT_INDEX_VERSION:
+        data.close()
+        raise EventIndexError(f"Unsupported event index version in {path}")
+    return data
+
+
+class StationCalendar:
+    """Sorted station times per planet, answered by binary search"""
+
+    def __init__(self, start_jd: float, end_jd: float,
+                 times: Dict[int, np.ndarray], directions: Dict[int, np.ndarray]):
+        self.start_jd = float(start_jd)
+        self.end_jd = float(end_jd)
+        self.times = times
+        self.directions = directions
+        # Scalar lookups bisect plain lists; np.searchsorted costs more per call
+        self._time_lists = {planet_id: jds.tolist() for planet_id, jds in times.items()}
+
+    @classmethod
+    def load(cls, path: Path) -> "StationCalendar":
+        """Load a calendar written by save()"""
+        path = Path(path)
+        if path.is_dir():
+            path = path / STATIONS_FILE
+
+        with _load_npz(path) as data:
+            times = {}
+            directions = {}
+            for planet_id, name in STATION_PLANETS.items():
+                times[planet_id] = np.ascontiguousarray(data[f"{name}_jd"], dtype=np.float64)
+                directions[planet_id] = np.ascontiguousarray(data[f"{name}_direction"], dtype=np.int8)
+            return cls(float(data["start_jd"]), float(data["end_jd"]), times, directions)
+
+    def save(self, path: Path) -> Path:
+        """Write the calendar as a single compressed .npz file"""
+        path = Path(path)
+        if path.suffix != ".npz":
+            path.mkdir(parents=True, exist_ok=True)
+            path = path / STATIONS_FILE
+
+        arrays = {
+            "version": np.array(EVENT_INDEX_VERSION),
+            "start_jd": np.array(self.start_jd),
+            "end_jd": np.array(self.end_jd)
+        }
+        for planet_id, name in STATION_PLANETS.items():
+            arrays[f"{name}_jd"] = self.times[planet_id]
+            arrays[f"{name}_direction"] = self.directions[planet_id]
+
+        np.savez_compressed(path, **arrays)
+        return path
+
+    def covers(self, planet_id: int, jd_start: float, jd_end: float) -> bool:
+        """Whether the calendar can answer queries for this planet and window"""
+        if planet_id in NON_STATIONING_PLANETS:
+            return True
+        return planet_id in self.times and self.start_jd <= jd_start and jd_end <= self.end_jd
+
+    def next_station(self, planet_id: int, jd_start: float, max_days: float = 365) -> Optional[float]:
+        """First station strictly after jd_start and within max_days, or None"""
+        if planet_id in NON_STATIONING_PLANETS:
+            return None
+
+        times = self._time_lists[planet_id]
+        index = bisect.bisect_right(times, jd_start)
+        if index < len(times) and times[index] <= jd_start + max_days:
+            return times[index]
+        return None
+
+    def stations_between(self, planet_id: int, jd_start: float, jd_end: float) -> List[Dict[str, float]]:
+        """All stations in (jd_start, jd_end] with their direction"""
+        if planet_id in NON_STATIONING_PLANETS:
+            return []
+
+        times = self.times[planet_id]
+        lo = int(np.searchsorted(times, jd_start, side="right"))
+        hi = int(np.searchsorted(times, jd_end, side="right"))
+        return [
+            {"julian_day": float(times[i]), "direction": int(self.directions[planet_id][i])}
+            for i in range(lo, hi)
+        ]
+
+
+class IngressIndex:
+    """Sorted sign ingress times per planet, answered by binary search"""
+
+    def __init__(self, start_jd: float, end_jd: float,
+                 times: Dict[int, np.ndarray], signs: Dict[int, np.ndarray]):
+        self.start_jd = float(start_jd)
+        self.end_jd = float(end_jd)
+        self.times = times
+        self.signs = signs
+        self._time_lists = {planet_id: jds.tolist() for planet_id, jds in times.items()}
+
+    @classmethod
+    def load(cls, path: Path) -> "IngressIndex":
+        """Load an index written by save()"""
+        path = Path(path)
+        if path.is_dir():
+            path = path / INGRESSES_FILE
+
+        with _load_npz(path) as data:
+            times = {}
+            signs = {}
+            for planet_id, name in INGRESS_PLANETS.items():
+                times[planet_id] = np.ascontiguousarray(data[f"{name}_jd"], dtype=np.float64)
+                signs[planet_id] = np.ascontiguousarray(data[f"{name}_sign"], dtype=np.int8)
+            return cls(float(data["start_jd"]), float(data["end_jd"]), times, signs)
+
+    def save(self, path: Path) -> Path:
+        """Write the index as a single compressed .npz file"""
+        path = Path(path)
+        if path.suffix != ".npz":
+            path.mkdir(parents=True, exist_ok=True)
+            path = path / INGRESSES_FILE
+
+        arrays = {
+            "version": np.array(EVENT_INDEX_VERSION),
+            "start_jd": np.array(self.start_jd),
+            "end_jd": np.array(self.end_jd)
+        }
+        for planet_id, name in INGRESS_PLANETS.items():
+            arrays[f"{name}_jd"] = self.times[planet_id]
+            arrays[f"{name}_sign"] = self.signs[planet_id]
+
+        np.savez_compressed(path, **arrays)
+        return path
+
+    def covers(self, planet_id: int, jd: float) -> bool:
+        """Whether the next ingress after jd is known for this planet"""
+        if planet_id not in self.times or not self.start_jd <= jd < self.end_jd:
+            return False
+        times = self.times[planet_id]
+        return len(times) > 0 and jd < times[-1]
+
+    def next_ingress(self, planet_id: int, jd: float) -> Optional[Tuple[float, int]]:
+        """
+        Time of the next sign change after jd and the sign entered (0 = Aries),
+        or None past the last indexed ingress.
+
+        A retrograde planet enters the previous sign; a planet that turns
+        direct again before leaving re-enters the sign it stationed in.
+        """
+        times = self._time_lists[planet_id]
+        index = bisect.bisect_right(times, jd)
+        if index >= len(times):
+            return None
+        return times[index], int(self.signs[planet_id][index])
+
+    def days_to_sign_exit(self, planet_id: int, jd: float) -> Optional[float]:
+        """Days until the planet really leaves its current sign, or None past the last indexed ingress"""
+        times = self._time_lists[planet_id]
+        index = bisect.bisect_right(times, jd)
+        if index >= len(times):
+            return None
+        return times[index] - jd
+
+
+class LunarAspectIndex:
+    """
+    Exact times of the Moon's Ptolemaic aspects to the other six planets.
+
+    Events from all planets are merged into one time-sorted array, so the
+    last and next perfection around any moment are two binary searches.
+    An index is not modified once built (request threads share one);
+    extended() returns a new index covering a longer span.
+    """
+
+    def __init__(self, start_jd: float, end_jd: float, times: np.ndarray,
+                 planets: np.ndarray, aspects: np.ndarray):
+        self.start_jd = float(start_jd)
+        self.end_jd = float(end_jd)
+        self.times = times
+        self.planets = planets
+        self.aspects = aspects
+        self._time_list = times.tolist()
+
+    @classmethod
+    def build(cls, start_jd: float, end_jd: float) -> "LunarAspectIndex":
+        """Compute the index for a span"""
+        return cls(start_jd, end_jd, *_find_lunar_aspects(start_jd, end_jd))
+
+    @classmethod
+    def load(cls, path: Path) -> "LunarAspectIndex":
+        """Load an index written by save()"""
+        path = Path(path)
+        if path.is_dir():
+            path = path / LUNAR_ASPECTS_FILE
+
+        with _load_npz(path) as data:
+            return cls(float(data["start_jd"]), float(data["end_jd"]),
+                       np.ascontiguousarray(data["jd"], dtype=np.float64),
+                       np.ascontiguousarray(data["planet"], dtype=np.int8),
+                       np.ascontiguousarray(data["aspect"], dtype=np.int16))
+
+    def save(self, path: Path) -> Path:
+        """Write the index as a single compressed .npz file"""
+        path = Path(path)
+        if path.suffix != ".npz":
+            path.mkdir(parents=True, exist_ok=True)
+            path = path / LUNAR_ASPECTS_FILE
+
+        np.savez_compressed(
+            path,
+            version=np.array(EVENT_INDEX_VERSION),
+            start_jd=np.array(self.start_jd),
+            end_jd=np.array(self.end_jd),
+            jd=self.times,
+            planet=self.planets,
+            aspect=self.aspects
+        )
+        return path
+
+    def covers(self, jd_start: float, jd_end: float) -> bool:
+        return self.start_jd <= jd_start and jd_end <= self.end_jd
+
+    def extended(self, jd_start: float, jd_end: float, chunk_days: float = 365.25) -> "LunarAspectIndex":
+        """A new index whose span is grown, in whole chunks, to include [jd_start, jd_end]"""
+        start_jd, end_jd = self.start_jd, self.end_jd
+        parts = []
+        if jd_start < start_jd:
+            start_jd -= chunk_days * math.ceil((self.start_jd - jd_start) / chunk_days)
+            parts.append(_find_lunar_aspects(start_jd, self.start_jd))
+        parts.append((self.times, self.planets, self.aspects))
+        if jd_end > end_jd:
+            end_jd += chunk_days * math.ceil((jd_end - self.end_jd) / chunk_days)
+            parts.append(_find_lunar_aspects(self.end_jd, end_jd))
+
+        if len(parts) == 1:
+            return self
+        return LunarAspectIndex(start_jd, end_jd, *(np.concatenate(arrays) for arrays in zip(*parts)))
+
+    def _event(self, index: int) -> Tuple[float, int, int]:
+        return self._time_list[index], int(self.planets[index]), int(self.aspects[index])
+
+    def last_perfections(self, jd: float, max_days: float) -> Iterator[Tuple[float, int, int]]:
+        """(julian_day, planet_id, aspect_degrees) at or before jd, most recent first"""
+        index = bisect.bisect_right(self._time_list, jd) - 1
+        while index >= 0 and self._time_list[index] >= jd - max_days:
+            yield self._event(index)
+            index -= 1
+
+    def next_perfections(self, jd: float, max_days: float) -> Iterator[Tuple[float, int, int]]:
+        """(julian_day, planet_id, aspect_degrees) after jd, soonest first"""
+        index = bisect.bisect_right(self._time_list, jd)
+        while index < len(self._time_list) and self._time_list[index] <= jd + max_days:
+            yield self._event(index)
+            index += 1
+
+
+# ---------------------------------------------------------------------------
+# Process-wide access
+# ---------------------------------------------------------------------------
+
+_indexes = {}
+
+
+def resolve_index_path() -> Path:
+    """Resolve the configured index directory relative to this file"""
+    try:
+        index_path = cfg().events.index_path
+    except AttributeError:
+        index_path = "event_indexes"
+
+    index_path = Path(os.environ.get('HORARY_EVENT_INDEXES', index_path))
+    if not index_path.is_absolute():
+        index_path = Path(__file__).parent / index_path
+    return index_path
+
+
+def _get_index(file_name: str, index_class):
+    """Load an index once per process; None (cached too) when it has not been built"""
+    if file_name in _indexes:
+        return _indexes[file_name]
+
+    index = None
+    path = resolve_index_path() / file_name
+    if path.exists():
+        try:
+            index = index_class.load(path)
+        except (EventIndexError, OSError, ValueError, KeyError) as e:
+            logger.warning(f"Event index {file_name} unavailable, using direct calculation: {e}")
+
+    _indexes[file_name] = index
+    return index
+
+
+def get_station_calendar() -> Optional[StationCalendar]:
+    """
+    Get the process-wide station calendar, or None when it has not been built.
+
+    Callers fall back to searching the ephemeris.
+    """
+    return _get_index(STATIONS_FILE, StationCalendar)
+
+
+def get_ingress_index() -> Optional[IngressIndex]:
+    """
+    Get the process-wide ingress index, or None when it has not been built.
+
+    Callers fall back to linear extrapolation from the current speed.
+    """
+    return _get_index(INGRESSES_FILE, IngressIndex)
+
+
+def get_lunar_aspect_index(jd_start: Optional[float] = None,
+                           jd_end: Optional[float] = None) -> Optional[LunarAspectIndex]:
+    """
+    Get the process-wide lunar aspect index, or None when it has not been built.
+
+    When a window is given, None is also returned unless the index covers
+    it: finding years of lunar events is left to the extend command rather
+    than done inside a request. Callers fall back to extrapolating from the
+    current positions.
+    """
+    index = _get_index(LUNAR_ASPECTS_FILE, LunarAspectIndex)
+    if index is not None and jd_start is not None and not index.covers(jd_start, jd_end):
+        return None
+    return index
+
+
+def reset_event_indexes() -> None:
+    """Drop cached indexes (after rebuilding or a configuration reload)"""
+    _indexes.clear()
+
+
+# ---------------------------------------------------------------------------
+# Index generation and verification
+# ---------------------------------------------------------------------------
+
+def build_station_calendar(start_year: int = 1800, end_year: int = 2200) -> StationCalendar:
+    """Find every station of the stationing planets between two years"""
+    if end_year <= start_year:
+        raise EventIndexError("end_year must be after start_year")
+
+    start_jd = _year_to_jd(start_year)
+    end_jd = _year_to_jd(end_year)
+    times = {}
+    directions = {}
+
+    for planet_id, name in STATION_PLANETS.items():
+        started = time.time()
+        stations = np.array(find_station_times(planet_id, start_jd, end_jd), dtype=np.float64)
+        # A station is retrograde when the planet is slowing towards it from direct motion
+        direction = np.array(
+            [STATION_RETROGRADE if _speed(planet_id, jd - 0.5) > 0 else STATION_DIRECT for jd in stations],
+            dtype=np.int8
+        )
+        times[planet_id] = stations
+        directions[planet_id] = direction
+        logger.info(f"{name}: {len(stations)} stations in {time.time() - started:.1f}s")
+
+    return StationCalendar(start_jd, end_jd, times, directions)
+
+
+def _find_ingresses(planet_id: int, jd_start: float, jd_end: float,
+                     stations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find every sign change of a planet between two dates.
+
+    Stations split the span into runs of monotonic motion, so each sign
+    boundary between two samples of a run is crossed exactly once and can
+    be refined with Brent's method.
+    """
+    step = INGRESS_SEARCH_STEPS.get(planet_id, DEFAULT_INGRESS_STEP)
+    edges = [jd_start] + [jd for jd in stations if jd_start < jd < jd_end] + [jd_end]
+    times = []
+    signs = []
+
+    for run_start, run_end in zip(edges[:-1], edges[1:]):
+        samples = np.append(np.arange(run_start, run_end, step), run_end)
+        previous_jd = samples[0]
+        previous_lon = _longitude(planet_id, previous_jd)
+
+        for jd in samples[1:]:
+            lon = _longitude(planet_id, jd)
+            # Signed motion over the step, taking the short way round
+            motion = (lon - previous_lon + 180.0) % 360.0 - 180.0
+            unwrapped = previous_lon + motion
+
+            first, last = sorted((previous_lon / 30.0, unwrapped / 30.0))
+            for boundary_index in range(int(np.floor(first)) + 1, int(np.floor(last)) + 1):
+                boundary = boundary_index * 30.0
+                offset = lambda t, b=boundary: (_longitude(planet_id, t) - b + 180.0) % 360.0 - 180.0
+                times.append(find_root_brent(offset, previous_jd, jd, tolerance=INGRESS_TIME_TOLERANCE))
+                signs.append((boundary_index if motion > 0 else boundary_index - 1) % 12)
+
+            previous_jd, previous_lon = jd, lon
+
+    order = np.argsort(times, kind="stable")
+    return np.array(times, dtype=np.float64)[order], np.array(signs, dtype=np.int8)[order]
+
+
+def build_ingress_index(start_year: int = 1800, end_year: int = 2200,
+                        stations: Optional[StationCalendar] = None) -> IngressIndex:
+    """Find every sign ingress of the seven planets between two years"""
+    if end_year <= start_year:
+        raise EventIndexError("end_year must be after start_year")
+
+    start_jd = _year_to_jd(start_year)
+    end_jd = _year_to_jd(end_year)
+    times = {}
+    signs = {}
+
+    for planet_id, name in INGRESS_PLANETS.items():
+        started = time.time()
+        if planet_id in NON_STATIONING_PLANETS:
+            planet_stations = np.empty(0)
+        elif stations is not None and stations.covers(planet_id, start_jd, end_jd):
+            planet_stations = stations.times[planet_id]
+        else:
+            planet_stations = np.array(find_station_times(planet_id, start_jd, end_jd))
+
+        times[planet_id], signs[planet_id] = _find_ingresses(planet_id, start_jd, end_jd, planet_stations)
+        logger.info(f"{name}: {len(times[planet_id])} ingresses in {time.time() - started:.1f}s")
+
+    return IngressIndex(start_jd, end_jd, times, signs)
+
+
+def _find_lunar_aspects(jd_start: float, jd_end: float,
+                        step: float = 0.5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find every Moon aspect perfection in [jd_start, jd_end).
+
+    The Moon's elongation from each planet always increases, so the target
+    elongations crossed between samples are solved together with a few
+    vectorized Newton steps using the elongation speed.
+    """
+    backend = get_ephemeris_backend()
+    samples = np.arange(jd_start, jd_end + step, step)
+    moon = backend.positions(samples, swe.MOON)
+    targets = np.array(sorted(ASPECT_ELONGATIONS), dtype=float)
+
+    times = []
+    planets = []
+    aspects = []
+
+    for planet_id in LUNAR_ASPECT_PLANETS:
+        planet = backend.positions(samples, planet_id)
+        elongation = np.unwrap(np.radians(moon[:, 0] - planet[:, 0])) * (180.0 / np.pi)
+
+        # Number the target elongations consecutively along the unwrapped
+        # elongation; the targets numbered [count[i], count[i + 1]) are crossed
+        # between samples i and i + 1
+        turns = np.floor(elongation / 360.0)
+        count = len(targets) * turns + np.searchsorted(targets, elongation - 360.0 * turns, side="right")
+        for offset in range(int((count[1:] - count[:-1]).max(initial=0))):
+            segment = np.nonzero(count[1:] - count[:-1] > offset)[0]
+            number = (count[segment] + offset).astype(np.int64)
+            target_index = number % len(targets)
+            target = 360.0 * (number // len(targets)) + targets[target_index]
+
+            # Linear first guess between the samples, then Newton on the real motion
+            fraction = (target - elongation[segment]) / (elongation[segment + 1] - elongation[segment])
+            guess = samples[segment] + fraction * step
+            for _ in range(2):
+                moon_now = backend.positions(guess, swe.MOON)
+                planet_now = backend.positions(guess, planet_id)
+                miss = (moon_now[:, 0] - planet_now[:, 0] - target + 180.0) % 360.0 - 180.0
+                guess = guess - miss / (moon_now[:, 2] - planet_now[:, 2])
+
+            keep = (guess >= jd_start) & (guess < jd_end)
+            times.append(guess[keep])
+            planets.append(np.full(int(keep.sum()), planet_id, dtype=np.int8))
+            aspects.append(np.array([ASPECT_ELONGATIONS[int(t)] for t in targets[target_index][keep]],
+                                    dtype=np.int16))
+
+    times = np.concatenate(times) if times else np.empty(0)
+    order = np.argsort(times, kind="stable")
+    return (times[order],
+            np.concatenate(planets)[order] if planets else np.empty(0, dtype=np.int8),
+            np.concatenate(aspects)[order] if aspects else np.empty(0, dtype=np.int16))
+
+
+def verify_lunar_aspect_index(index: LunarAspectIndex, samples: int = 200,
+                              seed: int = 0) -> Dict[str, float]:
+    """
+    Check indexed perfections at random epochs against the ephemeris.
+
+    Returns the largest elongation miss in degrees at an indexed perfection
+    and the largest gap between consecutive events in days.
+
+    Raises:
+        EventIndexError: If an indexed event is not a perfection
+    """
+    rng = random.Random(seed)
+    worst_miss = 0.0
+    for _ in range(samples):
+        jd = rng.uniform(index.start_jd, index.end_jd - 2)
+        for event_jd, planet_id, aspect_degrees in index.next_perfections(jd, 2.0):
+            elongation = (_longitude(swe.MOON, event_jd) - _longitude(planet_id, event_jd)) % 360.0
+            miss = min(abs(elongation - target) for target, degrees in ASPECT_ELONGATIONS.items()
+                       if degrees == aspect_degrees)
+            miss = min(miss, 360.0 - miss)
+            if miss > 1e-3:
+                raise EventIndexError(f"Moon-{planet_id} {aspect_degrees} at JD {event_jd:.5f} is off by {miss:.5f} degrees")
+            worst_miss = max(worst_miss, miss)
+
+    gaps = np.diff(index.times)
+    return {
+        "max_miss_degrees": worst_miss,
+        "max_gap_days": float(gaps.max()) if len(gaps) else 0.0,
+        "events": int(len(index.times))
+    }
+
+
+def verify_ingress_index(index: IngressIndex, samples: int = 200,
+                         seed: int = 0) -> Dict[str, float]:
+    """
+    Check indexed ingresses at random epochs: the planet must be in the
+    indexed sign just after the ingress and in its current sign until then.
+
+    Returns the largest boundary miss in degrees per planet.
+
+    Raises:
+        EventIndexError: If a sign change is missing from the index
+    """
+    rng = random.Random(seed)
+    worst = {}
+
+    for planet_id, name in INGRESS_PLANETS.items():
+        worst[name] = 0.0
+        times = index.times[planet_id]
+        if len(times) == 0:
+            continue
+        # Only epochs whose next ingress is indexed (slow planets' last one can be years before end_jd)
+        last_covered = min(index.end_jd, float(times[-1]))
+        for _ in range(samples):
+            jd = rng.uniform(index.start_jd, last_covered)
+            if not index.covers(planet_id, jd):
+                continue
+            ingress_jd, sign = index.next_ingress(planet_id, jd)
+
+            current_sign = int(_longitude(planet_id, jd) // 30)
+            before_sign = int(_longitude(planet_id, ingress_jd - 2 * INGRESS_TIME_TOLERANCE) // 30)
+            after_sign = int(_longitude(planet_id, ingress_jd + 2 * INGRESS_TIME_TOLERANCE) // 30)
+            if before_sign != current_sign or after_sign != sign:
+                raise EventIndexError(f"{name}: ingress at JD {ingress_jd:.5f} does not match the ephemeris")
+
+            boundary_miss = abs((_longitude(planet_id, ingress_jd) + 15.0) % 30.0 - 15.0)
+            worst[name] = max(worst[name], boundary_miss)
+
+    return worst
+
+
+def verify_station_calendar(calendar: StationCalendar, samples: int = 200,
+                            seed: int = 0) -> Dict[str, float]:
+    """
+    Compare calendar lookups against a direct search at random epochs.
+
+    Returns the largest disagreement in days per planet.
+
+    Raises:
+        EventIndexError: If a lookup misses a station or disagrees by more than an hour
+    """
+    rng = random.Random(seed)
+    worst = {}
+
+    for planet_id, name in STATION_PLANETS.items():
+        worst[name] = 0.0
+        for _ in range(samples):
+            jd = rng.uniform(calendar.start_jd, calendar.end_jd - 400)
+            expected = find_station_times(planet_id, jd, jd + 365, first_only=True)
+            found = calendar.next_station(planet_id, jd, 365)
+
+            if bool(expected) != (found is not None):
+                raise EventIndexError(f"{name}: station lookup at JD {jd:.4f} disagrees with search")
+            if expected:
+                error = abs(expected[0] - found)
+                worst[name] = max(worst[name], error)
+                if error > 1 / 24:
+                    raise EventIndexError(f"{name}: station at JD {expected[0]:.4f} indexed as {found:.4f}")
+
+    return worst
+
+
+def main():
+    """Command line interface for building and checking event indexes"""
+    try:
+        default_start = cfg().events.start_year
+        default_end = cfg().events.end_year
+    except AttributeError:
+        default_start, default_end = 1800, 2200
+
+    parser = argparse.ArgumentParser(description='Horary event indexes')
+    subparsers = parser.add_subparsers(dest='command')
+
+    build_parser = subparsers.add_parser('build', help='Precompute event indexes')
+    build_parser.add_argument('--out', type=str, default=str(resolve_index_path()),
+                              help='Output directory')
+    build_parser.add_argument('--start-year', type=int, default=default_start,
+                              help=f'First year covered (default: {default_start})')
+    build_parser.add_argument('--end-year', type=int, default=default_end,
+                              help=f'Year the indexes end at (default: {default_end})')
+
+    extend_parser = subparsers.add_parser('extend', help='Extend the lunar aspect index to more years')
+    extend_parser.add_argument('--index', type=str, default=str(resolve_index_path()),
+                               help='Index directory')
+    extend_parser.add_argument('--start-year', type=int, default=None, help='New first year')
+    extend_parser.add_argument('--end-year', type=int, default=None, help='New end year')
+
+    verify_parser = subparsers.add_parser('verify', help='Check indexes against direct search')
+    verify_parser.add_argument('--index', type=str, default=str(resolve_index_path()),
+                               help='Index directory')
+    verify_parser.add_argument('--samples', type=int, default=200,
+                               help='Random epochs checked per planet')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.command == 'build':
+            calendar = build_station_calendar(args.start_year, args.end_year)
+            ingresses = build_ingress_index(args.start_year, args.end_year, stations=calendar)
+            started = time.time()
+            lunar_aspects = LunarAspectIndex.build(_year_to_jd(args.start_year), _year_to_jd(args.end_year))
+            logger.info(f"lunar aspects: {len(lunar_aspects.times)} perfections in {time.time() - started:.1f}s")
+            print(json.dumps({
+                "stations": str(calendar.save(Path(args.out))),
+                "ingresses": str(ingresses.save(Path(args.out))),
+                "lunar_aspects": str(lunar_aspects.save(Path(args.out))),
+                "station_counts": {name: len(calendar.times[pid]) for pid, name in STATION_PLANETS.items()},
+                "ingress_counts": {name: len(ingresses.times[pid]) for pid, name in INGRESS_PLANETS.items()}
+            }, indent=2))
+            return 0
+        elif args.command == 'extend':
+            lunar_aspects = LunarAspectIndex.load(Path(args.index))
+            jd_start = _year_to_jd(args.start_year) if args.start_year else lunar_aspects.start_jd
+            jd_end = _year_to_jd(args.end_year) if args.end_year else lunar_aspects.end_jd
+            lunar_aspects = lunar_aspects.extended(jd_start, jd_end)
+            print(json.dumps({
+                "lunar_aspects": str(lunar_aspects.save(Path(args.index))),
+                "start_jd": lunar_aspects.start_jd,
+                "end_jd": lunar_aspects.end_jd,
+                "perfections": len(lunar_aspects.times)
+            }, indent=2))
+            return 0
+        elif args.command == 'verify':
+            calendar = StationCalendar.load(Path(args.index))
+            ingresses = IngressIndex.load(Path(args.index))
+            lunar_aspects = LunarAspectIndex.load(Path(args.index))
+            print(json.dumps({
+                "station_max_error_days": verify_station_calendar(calendar, samples=args.samples),
+                "ingress_max_error_degrees": verify_ingress_index(ingresses, samples=args.samples),
+                "lunar_aspects": verify_lunar_aspect_index(lunar_aspects, samples=args.samples)
+            }, indent=2))
+            return 0
+        else:
+            parser.print_help()
+            return 1
+    except EventIndexError as e:
+        logger.error(str(e))
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
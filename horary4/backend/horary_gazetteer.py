@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+"""
+Offline Gazetteer Geocoder
+Place name resolution from a local GeoNames-style cities dump
+
+The gazetteer is compiled once from the GeoNames tab-separated exports
+(citiesNNNN.txt, optionally countryInfo.txt and admin1CodesASCII.txt) into
+a single .npz file: a sorted list of normalized names (primary, ASCII and
+alternate names), each pointing at the places that carry it. A query is
+normalized the same way, split into a place name and qualifiers
+("London, UK", "Paris TX", "Springfield, IL, USA"), looked up by binary
+search and disambiguated by qualifiers and population. A qualifier the
+gazetteer does not know (a county, district or postcode) leaves the query
+unanswered, so the caller falls back to the geocode cache and Nominatim
+rather than guessing the most populous namesake.
+
+Build the gazetteer once:
+    python horary_gazetteer.py build cities15000.txt --countries countryInfo.txt \\
+        --admin1 admin1CodesASCII.txt --out gazetteer
+    python horary_gazetteer.py lookup "London, UK" "Paris" "Springfield, IL"
+
+Configure it in horary_constants.yaml:
+    geocoding:
+      gazetteer_path: "gazetteer"
+      nominatim_fallback: true
+
+Created for horary_engine.py performance work
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import logging
+import os
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from horary_config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+GAZETTEER_VERSION = 1
+GAZETTEER_FILE = "gazetteer.npz"
+
+# Alternate names longer than this are descriptions rather than names
+MAX_NAME_LENGTH = 64
+
+# A match on a place's own name counts this much more than an alternate name
+PRIMARY_NAME_WEIGHT = 10
+
+# Country spellings not carried by countryInfo.txt
+COUNTRY_ALIASES = {
+    "uk": "GB",
+    "britain": "GB",
+    "great britain": "GB",
+    "england": "GB",
+    "scotland": "GB",
+    "wales": "GB",
+    "northern ireland": "GB",
+    "usa": "US",
+    "us": "US",
+    "u s a": "US",
+    "america": "US",
+    "united states of america": "US",
+    "uae": "AE",
+    "holland": "NL",
+    "russia": "RU",
+    "south korea": "KR",
+    "korea": "KR",
+    "czech republic": "CZ",
+    "vietnam": "VN",
+}
+
+# GeoNames cities export columns
+_NAME, _ASCII_NAME, _ALTERNATE_NAMES = 1, 2, 3
+_LATITUDE, _LONGITUDE = 4, 5
+_COUNTRY, _ADMIN1, _POPULATION = 8, 10, 14
+
+
+class GazetteerError(Exception):
+    """Gazetteer missing, corrupt or built for another format"""
+    pass
+
+
+def normalize_place(text: str) -> str:
+    """Lowercase, accent-free, punctuation-free and single-spaced"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in stripped).split())
+
+
+@dataclass(frozen=True)
+class GazetteerMatch:
+    """A resolved place"""
+    latitude: float
+    longitude: float
+    name: str                 # display name: "London, England, United Kingdom"
+    country_code: str
+    population: int
+
+
+class Gazetteer:
+    """Normalized-name index over a cities dump, answered by binary search"""
+
+    def __init__(self, names: List[str], offsets: np.ndarray, places: np.ndarray, primary: np.ndarray,
+                 latitude: np.ndarray, longitude: np.ndarray, population: np.ndarray,
+                 country: List[str], admin1: List[str], place_names: List[str],
+                 country_names: Dict[str, str], admin1_names: Dict[str, str]):
+        self.names = names                  # sorted normalized names
+        self.offsets = offsets              # names[i] -> places[offsets[i]:offsets[i + 1]]
+        self.places = places
+        self.primary = primary              # per places entry: the place's own name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.population = population
+        self.country = country              # ISO 3166 alpha-2 per place
+        self.admin1 = admin1                # "GB.ENG" per place
+        self.place_names = place_names
+        self.country_names = country_names  # "GB" -> "United Kingdom"
+        self.admin1_names = admin1_names    # "GB.ENG" -> "England"
+
+        # Qualifier spellings: normalized text -> country code or admin1 key
+        self._country_qualifiers = {code.lower(): code for code in set(country)}
+        self._country_qualifiers.update(
+            (normalize_place(name), code) for code, name in country_names.items())
+        self._country_qualifiers.update(COUNTRY_ALIASES)
+        self._admin1_qualifiers: Dict[str, set] = {}
+        for key in set(admin1):
+            code, _, admin_code = key.partition(".")
+            spellings = {admin_code.lower()}
+            if key in admin1_names:
+                spellings.add(normalize_place(admin1_names[key]))
+            for spelling in spellings:
+                if spelling:
+                    self._admin1_qualifiers.setdefault(spelling, set()).add(key)
+
+    def __len__(self) -> int:
+        return len(self.place_names)
+
+    @classmethod
+    def load(cls, path: Path) -> "Gazetteer":
+        """Load a gazetteer written by save()"""
+        path = Path(path)
+        if path.is_dir():
+            path = path / GAZETTEER_FILE
+        if not path.exists():
+            raise GazetteerError(f"Gazetteer not found: {path}")
+
+        with np.load(path) as data:
+            if int(data["version"]) != GAZETTEER_VERSION:
+                raise GazetteerError(f"Unsupported gazetteer version in {path}")
+            text = {key: bytes(data[key]).decode("utf-8").split("\n")
+                    for key in ("names", "country", "admin1", "place_names",
+                                "country_names", "admin1_names")}
+            return cls(
+                names=text["names"],
+                offsets=data["offsets"],
+                places=data["places"],
+                primary=data["primary"],
+                latitude=data["latitude"],
+                longitude=data["longitude"],
+                population=data["population"],
+                country=text["country"],
+                admin1=text["admin1"],
+                place_names=text["place_names"],
+                country_names=dict(entry.split("\t", 1) for entry in text["country_names"] if entry),
+                admin1_names=dict(entry.split("\t", 1) for entry in text["admin1_names"] if entry)
+            )
+
+    def save(self, path: Path) -> Path:
+        """Write the gazetteer as a single compressed .npz file"""
+        path = Path(path)
+        if path.suffix != ".npz":
+            path.mkdir(parents=True, exist_ok=True)
+            path = path / GAZETTEER_FILE
+
+        def blob(lines: Iterable[str]) -> np.ndarray:
+            return np.frombuffer("\n".join(lines).encode("utf-8"), dtype=np.uint8)
+
+        np.savez_compressed(
+            path,
+            version=np.array(GAZETTEER_VERSION),
+            names=blob(self.names),
+            offsets=self.offsets,
+            places=self.places,
+            primary=self.primary,
+            latitude=self.latitude,
+            longitude=self.longitude,
+            population=self.population,
+            country=blob(self.country),
+            admin1=blob(self.admin1),
+            place_names=blob(self.place_names),
+            country_names=blob(f"{code}\t{name}" for code, name in sorted(self.country_names.items())),
+            admin1_names=blob(f"{key}\t{name}" for key, name in sorted(self.admin1_names.items()))
+        )
+        return path
+
+    def _candidates(self, name: str) -> List[Tuple[int, bool]]:
+        """(place, primary) pairs carrying a normalized name"""
+        index = bisect.bisect_left(self.names, name)
+        if index == len(self.names) or self.names[index] != name:
+            return []
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return list(zip(self.places[start:end].tolist(), self.primary[start:end].tolist()))
+
+    def _knows_qualifier(self, qualifier: str) -> bool:
+        """Whether a qualifier names a country or first-level region"""
+        return qualifier in self._country_qualifiers or qualifier in self._admin1_qualifiers
+
+    def _matches_qualifier(self, place: int, qualifier: str) -> bool:
+        """Whether a place lies in the named country or region"""
+        country = self._country_qualifiers.get(qualifier)
+        regions = self._admin1_qualifiers.get(qualifier)
+        return self.country[place] == country or (regions is not None and self.admin1[place] in regions)
+
+    def _best(self, candidates: List[Tuple[int, bool]], qualifiers: List[str]) -> Optional[int]:
+        """Most populous candidate matching every qualifier (all of them known)"""
+        best, best_score = None, -1
+        for place, primary in candidates:
+            if not all(self._matches_qualifier(place, q) for q in qualifiers):
+                continue
+            score = (int(self.population[place]) + 1) * (PRIMARY_NAME_WEIGHT if primary else 1)
+            if score > best_score:
+                best, best_score = place, score
+        return best
+
+    def lookup(self, query: str) -> Optional[GazetteerMatch]:
+        """
+        Resolve a free-text place name.
+
+        Comma-separated parts after the first are qualifiers (country or
+        first-level region, by name or code). Without commas, trailing words
+        are tried as qualifiers when the whole text is not a known name.
+        Every qualifier must be known and match; among the remaining
+        candidates the most populous wins, counting a match on the place's
+        own name ahead of an alternate name.
+
+        Returns:
+            GazetteerMatch, or None when the gazetteer has no answer (also
+            for qualifiers it does not know, such as "Richmond, Surrey")
+        """
+        parts = [normalize_place(part) for part in query.split(",")]
+        parts = [part for part in parts if part]
+        if not parts:
+            return None
+
+        splits = [(parts[0], parts[1:])]
+        if len(parts) == 1:
+            words = parts[0].split()
+            splits.extend((" ".join(words[:i]), [" ".join(words[i:])]) for i in range(len(words) - 1, 0, -1))
+
+        for name, qualifiers in splits:
+            # A wrong namesake means a wrong chart: leave unknown qualifiers to the web geocoder
+            if not all(self._knows_qualifier(q) for q in qualifiers):
+                continue
+            candidates = self._candidates(name)
+            if not candidates:
+                continue
+            place = self._best(candidates, qualifiers)
+            if place is not None:
+                return self._match(place)
+        return None
+
+    def _match(self, place: int) -> GazetteerMatch:
+        country = self.country[place]
+        display = [self.place_names[place]]
+        region = self.admin1_names.get(self.admin1[place])
+        if region and region != display[0]:
+            display.append(region)
+        display.append(self.country_names.get(country, country))
+        return GazetteerMatch(
+            latitude=float(self.latitude[place]),
+            longitude=float(self.longitude[place]),
+            name=", ".join(display),
+            country_code=country,
+            population=int(self.population[place])
+        )
+
+
+def resolve_gazetteer_path() -> Path:
+    """Resolve the configured gazetteer location relative to this file"""
+    try:
+        gazetteer_path = cfg().geocoding.gazetteer_path
+    except AttributeError:
+        gazetteer_path = "gazetteer"
+
+    gazetteer_path = Path(os.environ.get('HORARY_GAZETTEER', gazetteer_path))
+    if not gazetteer_path.is_absolute():
+        gazetteer_path = Path(__file__).parent / gazetteer_path
+    return gazetteer_path
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_loaded = False
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    Get the process-wide gazetteer, or None when it has not been built.
+
+    Callers fall back to the Nominatim web service.
+    """
+    global _gazetteer, _gazetteer_loaded
+    if not _gazetteer_loaded:
+        path = resolve_gazetteer_path()
+        if path.exists():
+            try:
+                _gazetteer = Gazetteer.load(path)
+            except (GazetteerError, OSError, ValueError, KeyError) as e:
+                logger.warning(f"Gazetteer unavailable, using online geocoding: {e}")
+        _gazetteer_loaded = True
+    return _gazetteer
+
+
+def reset_gazetteer() -> None:
+    """Drop the cached gazetteer (after rebuilding or a configuration reload)"""
+    global _gazetteer, _gazetteer_loaded
+    _gazetteer = None
+    _gazetteer_loaded = False
+
+
+# ---------------------------------------------------------------------------
+# Gazetteer generation
+# ---------------------------------------------------------------------------
+
+def _read_rows(path: Path) -> Iterable[List[str]]:
+    csv.field_size_limit(sys.maxsize)
+    with open(path, encoding="utf-8", newline="") as handle:
+        for row in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row and not row[0].startswith("#"):
+                yield row
+
+
+def build_gazetteer(cities_path: Path, countries_path: Optional[Path] = None,
+                    admin1_path: Optional[Path] = None, min_population: int = 0,
+                    alternate_names: bool = True) -> Gazetteer:
+    """
+    Compile a gazetteer from GeoNames exports.
+
+    Args:
+        cities_path: citiesNNNN.txt or allCountries.txt-style place rows
+        countries_path: Optional countryInfo.txt for country names
+        admin1_path: Optional admin1CodesASCII.txt for region names
+        min_population: Skip smaller places
+        alternate_names: Index the alternate names column as well
+    """
+    country_names = {}
+    if countries_path:
+        country_names = {row[0]: row[4] for row in _read_rows(Path(countries_path)) if len(row) > 4}
+    admin1_names = {}
+    if admin1_path:
+        admin1_names = {row[0]: row[1] for row in _read_rows(Path(admin1_path)) if len(row) > 1}
+
+    latitude, longitude, population = [], [], []
+    country, admin1, place_names = [], [], []
+    index: Dict[str, Dict[int, bool]] = {}
+
+    for row in _read_rows(Path(cities_path)):
+        if len(row) <= _POPULATION:
+            continue
+        place_population = int(row[_POPULATION] or 0)
+        if place_population < min_population:
+            continue
+
+        place = len(place_names)
+        latitude.append(float(row[_LATITUDE]))
+        longitude.append(float(row[_LONGITUDE]))
+        population.append(place_population)
+        country.append(row[_COUNTRY])
+        admin1.append(f"{row[_COUNTRY]}.{row[_ADMIN1]}")
+        place_names.append(row[_NAME])
+
+        own_names = {normalize_place(row[_NAME]), normalize_place(row[_ASCII_NAME])}
+        for name in own_names:
+            if name:
+                index.setdefault(name, {})[place] = True
+        if alternate_names and row[_ALTERNATE_NAMES]:
+            for alternate in row[_ALTERNATE_NAMES].split(","):
+                name = normalize_place(alternate)
+                if name and len(name) <= MAX_NAME_LENGTH and name not in own_names:
+                    index.setdefault(name, {}).setdefault(place, False)
+
+    names = sorted(index)
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    places, primary = [], []
+    for i, name in enumerate(names):
+        entries = index[name]
+        places.extend(entries)
+        primary.extend(entries.values())
+        offsets[i + 1] = len(places)
+
+    return Gazetteer(
+        names=names,
+        offsets=offsets,
+        places=np.array(places, dtype=np.int32),
+        primary=np.array(primary, dtype=bool),
+        latitude=np.array(latitude, dtype=np.float64),
+        longitude=np.array(longitude, dtype=np.float64),
+        population=np.array(population, dtype=np.int64),
+        country=country,
+        admin1=admin1,
+        place_names=place_names,
+        country_names=country_names,
+        admin1_names=admin1_names
+    )
+
+
+def main():
+    """Command line interface for building and querying the gazetteer"""
+    parser = argparse.ArgumentParser(description='Offline gazetteer geocoder')
+    subparsers = parser.add_subparsers(dest='command')
+
+    build_parser = subparsers.add_parser('build', help='Compile a gazetteer from GeoNames exports')
+    build_parser.add_argument('cities', type=str, help='GeoNames cities file (e.g. cities15000.txt)')
+    build_parser.add_argument('--countries', type=str, default=None, help='countryInfo.txt')
+    build_parser.add_argument('--admin1', type=str, default=None, help='admin1CodesASCII.txt')
+    build_parser.add_argument('--min-population', type=int, default=0, help='Skip smaller places')
+    build_parser.add_argument('--no-alternate-names', action='store_true',
+                              help='Index primary and ASCII names only')
+    build_parser.add_argument('--out', type=str, default=str(resolve_gazetteer_path()),
+                              help='Output directory')
+
+    lookup_parser = subparsers.add_parser('lookup', help='Resolve place names')
+    lookup_parser.add_argument('queries', nargs='+', help='Place names')
+    lookup_parser.add_argument('--gazetteer', type=str, default=str(resolve_gazetteer_path()),
+                               help='Gazetteer directory')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.command == 'build':
+            started = time.time()
+            gazetteer = build_gazetteer(Path(args.cities), args.countries, args.admin1,
+                                        min_population=args.min_population,
+                                        alternate_names=not args.no_alternate_names)
+            print(json.dumps({
+                "gazetteer": str(gazetteer.save(Path(args.out))),
+                "places": len(gazetteer),
+                "names": len(gazetteer.names),
+                "seconds": round(time.time() - started, 1)
+            }, indent=2))
+            return 0
+        elif args.command == 'lookup':
+            gazetteer = Gazetteer.load(Path(args.gazetteer))
+            results = []
+            for query in args.queries:
+                started = time.perf_counter()
+                match = gazetteer.lookup(query)
+                elapsed = time.perf_counter() - started
+                results.append({
+                    "query": query,
+                    "match": match.__dict__ if match else None,
+                    "microseconds": round(elapsed * 1e6, 1)
+                })
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+            return 0 if all(result["match"] for result in results) else 1
+        else:
+            parser.print_help()
+            return 1
+    except GazetteerError as e:
+        logger.error(str(e))
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent Geocode Cache
+SQLite-backed cache of geocoding results shared by all worker processes
+
+Location strings are normalized before lookup ("London, UK", "london uk"
+and "LONDON  UK" share one entry). Resolved places are kept for
+cache_ttl_hours; "location not found" answers are kept briefly
+(negative_ttl_minutes) so a retrying client does not hammer the web
+service with the same bad input. Service failures are never cached.
+
+The database runs in WAL mode so concurrent workers can read while one
+writes. Each thread of each process opens its own connection.
+
+Usage:
+    python horary_geocache.py stats
+    python horary_geocache.py purge      # drop expired entries
+    python horary_geocache.py clear
+
+Configure it in horary_constants.yaml:
+    geocoding:
+      cache_path: "geocode_cache.sqlite3"
+      cache_ttl_hours: 720
+      negative_ttl_minutes: 10
+
+Created for horary_engine.py performance work
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from horary_config import cfg
+from horary_gazetteer import normalize_place
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TTL_HOURS = 720.0
+DEFAULT_NEGATIVE_TTL_MINUTES = 10.0
+
+# Expired rows are purged once every this many stores
+PURGE_INTERVAL = 256
+
+NOT_FOUND = "not_found"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    latitude REAL,
+    longitude REAL,
+    name TEXT,
+    found INTEGER NOT NULL,
+    expires REAL NOT NULL
+)
+"""
+
+
+def normalize_location_key(location_string: str) -> str:
+    """Cache key for a location string: case, accents, punctuation and spacing removed"""
+    return normalize_place(location_string)
+
+
+class GeocodeCache:
+    """Geocoding results by normalized location string, with TTLs"""
+
+    def __init__(self, path: Union[str, Path], ttl_seconds: float = DEFAULT_TTL_HOURS * 3600,
+                 negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_MINUTES * 60):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._counters = {"hits": 0, "negative_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, reopened after a fork"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, counter: str) -> None:
+        with self._counter_lock:
+            self._counters[counter] += 1
+
+    def get(self, location_string: str) -> Optional[Union[Tuple[float, float, str], str]]:
+        """
+        Cached result for a location string.
+
+        Returns:
+            (latitude, longitude, full_address), NOT_FOUND for a cached
+            negative answer, or None on a miss
+        """
+        key = normalize_location_key(location_string)
+        try:
+            row = self._connection().execute(
+                "SELECT latitude, longitude, name, found FROM geocodes WHERE key = ? AND expires > ?",
+                (key, time.time())).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Geocode cache read failed: {e}")
+            self._count("errors")
+            return None
+
+        if row is None:
+            self._count("misses")
+            return None
+        if not row[3]:
+            self._count("negative_hits")
+            return NOT_FOUND
+        self._count("hits")
+        return (row[0], row[1], row[2])
+
+    def put(self, location_string: str, result: Tuple[float, float, str]) -> None:
+        """Store a resolved location"""
+        latitude, longitude, name = result
+        self._store(location_string, latitude, longitude, name, True, self.ttl_seconds)
+
+    def put_not_found(self, location_string: str) -> None:
+        """Store a "location not found" answer for the negative TTL"""
+        self._store(location_string, None, None, None, False, self.negative_ttl_seconds)
+
+    def _store(self, location_string: str, latitude: Optional[float], longitude: Optional[float],
+               name: Optional[str], found: bool, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        key = normalize_location_key(location_string)
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO geocodes (key, latitude, longitude, name, found, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, latitude, longitude, name, int(found), now + ttl_seconds))
+            self._count("stores")
+            if self._counters["stores"] % PURGE_INTERVAL == 0:
+                connection.execute("DELETE FROM geocodes WHERE expires <= ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning(f"Geocode cache write failed: {e}")
+            self._count("errors")
+
+    def purge(self) -> int:
+        """Delete expired entries; returns how many were removed"""
+        return self._connection().execute("DELETE FROM geocodes WHERE expires <= ?", (time.time(),)).rowcount
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM geocodes")
+
+    def stats(self) -> Dict[str, Union[int, float, str]]:
+        """Hit/miss counters of this process plus the shared entry counts"""
+        with self._counter_lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+        try:
+            entries, negative = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(found = 0), 0) FROM geocodes WHERE expires > ?",
+                (time.time(),)).fetchone()
+            stats["entries"] = entries
+            stats["negative_entries"] = negative
+        except sqlite3.Error as e:
+            stats["entries_error"] = str(e)
+        stats["path"] = str(self.path)
+        return stats
+
+
+def resolve_cache_path() -> Path:
+    """Resolve the configured cache database relative to this file"""
+    try:
+        cache_path = cfg().geocoding.cache_path
+    except AttributeError:
+        cache_path = "geocode_cache.sqlite3"
+
+    cache_path = Path(os.environ.get('HORARY_GEOCODE_CACHE', cache_path))
+    if not cache_path.is_absolute():
+        cache_path = Path(__file__).parent / cache_path
+    return cache_path
+
+
+_cache: Optional[GeocodeCache] = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> Optional[GeocodeCache]:
+    """
+    Get the process-wide geocode cache, or None when it is disabled
+    (geocoding.cache_path set to "") or cannot be opened.
+    """
+    global _cache, _cache_loaded
+    if _cache_loaded:
+        return _cache
+
+    with _cache_lock:
+        if not _cache_loaded:
+            try:
+                geocoding = cfg().geocoding
+                ttl_hours = getattr(geocoding, "cache_ttl_hours", DEFAULT_TTL_HOURS)
+                negative_minutes = getattr(geocoding, "negative_ttl_minutes", DEFAULT_NEGATIVE_TTL_MINUTES)
+                enabled = bool(getattr(geocoding, "cache_path", "geocode_cache.sqlite3"))
+            except AttributeError:
+                ttl_hours, negative_minutes, enabled = DEFAULT_TTL_HOURS, DEFAULT_NEGATIVE_TTL_MINUTES, True
+
+            if enabled or os.environ.get('HORARY_GEOCODE_CACHE'):
+                try:
+                    _cache = GeocodeCache(resolve_cache_path(), ttl_hours * 3600, negative_minutes * 60)
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"Geocode cache unavailable: {e}")
+            _cache_loaded = True
+    return _cache
+
+
+def reset_geocode_cache() -> None:
+    """Drop the process-wide cache object (the database is kept)"""
+    global _cache, _cache_loaded
+    with _cache_lock:
+        _cache = None
+        _cache_loaded = False
+
+
+def main():
+    """Command line interface for inspecting and maintaining the cache"""
+    parser = argparse.ArgumentParser(description='Persistent geocode cache')
+    parser.add_argument('command', choices=['stats', 'purge', 'clear'])
+    parser.add_argument('--cache', type=str, default=str(resolve_cache_path()), help='Cache database')
+    args = parser.parse_args()
+
+    cache = GeocodeCache(args.cache)
+    if args.command == 'purge':
+        print(json.dumps({"purged": cache.purge()}))
+    elif args.command == 'clear':
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
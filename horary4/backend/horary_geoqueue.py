@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Rate-Limited Geocoding Queue
+Schedules web geocoder lookups at a configured rate and returns futures
+
+Nominatim's usage policy allows about one request per second. Instead of
+letting every request thread call it directly (and time out under bursts),
+lookups are queued and worker threads issue them no faster than
+rate_per_second. A location already waiting in the queue is not queued
+twice: later callers get the same future. Callers wait on the future with
+their own time bound, and a lookup that outlives its caller still fills
+the geocode cache for the retry.
+
+The rate applies per process; with several workers, divide the policy
+rate between them.
+
+Usage:
+    future = get_geocode_scheduler().submit("Reykjavik", lambda: lookup("Reykjavik"))
+    lat, lon, name = future.result(timeout=30)
+
+Configure it in horary_constants.yaml:
+    geocoding:
+      rate_per_second: 1.0
+      queue_workers: 1
+      max_pending: 1000
+      queue_timeout_seconds: 30
+
+Benchmark it offline against the stand-in server:
+    python benchmarks/bench_geocode_queue.py --requests 200 --rate 20
+
+Created for horary_engine.py performance work
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from horary_config import cfg
+from horary_geocache import normalize_location_key
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RATE_PER_SECOND = 1.0
+DEFAULT_QUEUE_WORKERS = 1
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_QUEUE_TIMEOUT = 30.0
+
+
+class GeocodeQueueFull(Exception):
+    """Too many lookups already waiting for the web geocoder"""
+    pass
+
+
+class RateLimiter:
+    """Hands out evenly spaced time slots, rate_per_second of them per second"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        """Block until the next free slot; returns seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class GeocodeScheduler:
+    """Queue of pending geocoder lookups, deduplicated by normalized location"""
+
+    def __init__(self, rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+                 workers: int = DEFAULT_QUEUE_WORKERS, max_pending: int = DEFAULT_MAX_PENDING):
+        self.rate_per_second = rate_per_second
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self._limiter = RateLimiter(rate_per_second)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._counters = {"submitted": 0, "deduplicated": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_workers(self) -> None:
+        """Start worker threads (again after a fork; threads do not survive it). Lock held."""
+        if self._pid == os.getpid():
+            return
+        if self._pid is not None:
+            # Forked child: the parent's queue entries belong to the parent
+            self._queue = queue.Queue()
+            self._pending.clear()
+        self._pid = os.getpid()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"geocode-queue-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, location_string: str, lookup: Callable[[], Any]) -> Future:
+        """
+        Queue a lookup unless the same location is already pending.
+
+        Args:
+            location_string: Location being resolved (deduplication key after normalization)
+            lookup: Performs the web request; its return value or exception
+                becomes the future's outcome
+
+        Returns:
+            Future of the lookup result
+        """
+        key = normalize_location_key(location_string)
+        with self._lock:
+            self._ensure_workers()
+            future = self._pending.get(key)
+            if future is not None:
+                self._counters["deduplicated"] += 1
+                return future
+
+            future = Future()
+            if len(self._pending) >= self.max_pending:
+                self._counters["rejected"] += 1
+                future.set_exception(GeocodeQueueFull(
+                    f"{len(self._pending)} geocoding lookups already waiting"))
+                return future
+
+            self._counters["submitted"] += 1
+            self._pending[key] = future
+            self._queue.put((key, lookup, future, time.monotonic()))
+        return future
+
+    def _work(self) -> None:
+        while True:
+            key, lookup, future, queued_at = self._queue.get()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._limiter.wait()
+                waited = time.monotonic() - queued_at
+                try:
+                    result = lookup()
+                except BaseException as e:
+                    future.set_exception(e)
+                    outcome = "failed"
+                else:
+                    future.set_result(result)
+                    outcome = "completed"
+                with self._lock:
+                    self._counters[outcome] += 1
+                    self._wait_total += waited
+                    self._wait_max = max(self._wait_max, waited)
+            finally:
+                with self._lock:
+                    if self._pending.get(key) is future:
+                        del self._pending[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            finished = stats["completed"] + stats["failed"]
+            stats["pending"] = len(self._pending)
+            stats["rate_per_second"] = self.rate_per_second
+            stats["avg_queue_wait_seconds"] = round(self._wait_total / finished, 4) if finished else 0.0
+            stats["max_queue_wait_seconds"] = round(self._wait_max, 4)
+            return stats
+
+
+def queue_timeout() -> float:
+    """Seconds a caller waits for a queued lookup"""
+    try:
+        return cfg().geocoding.queue_timeout_seconds
+    except AttributeError:
+        return DEFAULT_QUEUE_TIMEOUT
+
+
+_scheduler: Optional[GeocodeScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_geocode_scheduler() -> GeocodeScheduler:
+    """Get the process-wide scheduler for web geocoder lookups"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                try:
+                    geocoding = cfg().geocoding
+                    _scheduler = GeocodeScheduler(geocoding.rate_per_second, geocoding.queue_workers,
+                                                  geocoding.max_pending)
+                except AttributeError:
+                    _scheduler = GeocodeScheduler()
+    return _scheduler
+
+
+def reset_geocode_scheduler() -> None:
+    """Drop the process-wide scheduler (after a configuration reload or in tests)"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
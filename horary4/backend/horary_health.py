@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Health Prober
+Runs the service health checks on a background schedule and caches the results
+
+/api/health used to construct a timezone lookup, run an ephemeris
+calculation and geocode "London, UK" against Nominatim on every call, so a
+load balancer polling it every few seconds spent geocoder quota and
+request latency on it. The prober runs each check on its own interval in a
+daemon thread (the web geocoding check rarely, and through the
+rate-limited geocoding queue) and the endpoints only read the latest
+results:
+- /api/health reports every check with its age; a check older than
+  STALE_AFTER_INTERVALS intervals is reported as stale (degraded);
+- /api/health/ready answers 503 until the readiness checks have passed;
+- /api/health/live does no checking at all.
+
+The prober restarts itself in a forked worker process on first use.
+
+Usage:
+    prober = get_health_prober()
+    services = prober.snapshot()      # {name: {'status': ..., 'age_seconds': ...}}
+    ready, services = prober.readiness()
+
+Configure it in horary_constants.yaml:
+    health:
+      interval_seconds: 30
+      geocoding_interval_seconds: 600
+      readiness_checks: ["timezone_finder", "swiss_ephemeris", "computational_helpers"]
+
+Created for horary_engine.py performance work
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from horary_config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 30.0
+DEFAULT_GEOCODING_INTERVAL = 600.0
+DEFAULT_READINESS_CHECKS = ["timezone_finder", "swiss_ephemeris", "computational_helpers"]
+
+# Results older than this many intervals are reported as stale
+STALE_AFTER_INTERVALS = 3
+
+
+def check_timezone_finder() -> Dict[str, Any]:
+    try:
+        from horary_timezones import get_timezone_finder
+        test_tz = get_timezone_finder().timezone_at(lat=51.5074, lng=-0.1278)  # London
+        return {'status': 'healthy' if test_tz else 'degraded', 'test_result': test_tz}
+    except Exception as e:
+        return {'status': 'unhealthy', 'error': str(e)}
+
+
+def check_swiss_ephemeris() -> Dict[str, Any]:
+    try:
+        import swisseph as swe
+        sun_pos = swe.calc_ut(swe.julday(2025, 5, 29, 12.0), swe.SUN)
+        return {'status': 'healthy', 'test_calculation': f"Sun at {sun_pos[0][0]:.2f}°"}
+    except Exception as e:
+        return {'status': 'unhealthy', 'error': str(e)}
+
+
+def check_geocoding() -> Dict[str, Any]:
+    """Web geocoder round trip, queued behind user lookups at the policy rate"""
+    try:
+        from horary_geoqueue import get_geocode_scheduler, queue_timeout
+        from horary_services import get_services
+        future = get_geocode_scheduler().submit(
+            "health check: London, UK", lambda: get_services().geocoder.geocode("London, UK", timeout=5))
+        location = future.result(timeout=queue_timeout())
+        return {'status': 'healthy' if location else 'degraded',
+                'test_result': location.address if location else None}
+    except Exception as e:
+        return {'status': 'unhealthy', 'error': str(e) or type(e).__name__}
+
+
+def check_computational_helpers() -> Dict[str, Any]:
+    try:
+        from _horary_math import calculate_elongation, normalize_longitude
+        return {
+            'status': 'healthy',
+            'test_calculations': {
+                'elongation_120_90': f"{calculate_elongation(120.0, 90.0):.2f}°",
+                'normalize_380': f"{normalize_longitude(380.0):.2f}°"
+            }
+        }
+    except Exception as e:
+        return {'status': 'unhealthy', 'error': str(e)}
+
+
+CHECKS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    'timezone_finder': check_timezone_finder,
+    'swiss_ephemeris': check_swiss_ephemeris,
+    'geocoding': check_geocoding,
+    'computational_helpers': check_computational_helpers
+}
+
+
+def overall_status(services: Dict[str, Dict[str, Any]]) -> str:
+    """'unhealthy' if any service is, else 'degraded' if any is not healthy, else 'healthy'"""
+    statuses = [s['status'] for s in services.values()]
+    if 'unhealthy' in statuses:
+        return 'unhealthy'
+    if any(status != 'healthy' for status in statuses):
+        return 'degraded'
+    return 'healthy'
+
+
+class HealthProber:
+    """Background thread running each check on its interval; readers get cached results"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL,
+                 geocoding_interval: float = DEFAULT_GEOCODING_INTERVAL,
+                 readiness_checks: Optional[List[str]] = None,
+                 checks: Optional[Dict[str, Callable[[], Dict[str, Any]]]] = None):
+        self.checks = dict(checks or CHECKS)
+        self.intervals = {name: geocoding_interval if name == 'geocoding' else interval
+                          for name in self.checks}
+        self.readiness_checks = [name for name in (readiness_checks or DEFAULT_READINESS_CHECKS)
+                                 if name in self.checks]
+        self._results: Dict[str, Tuple[Dict[str, Any], float, str, float]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._stopped = False
+        self._runs = 0
+
+    def start(self) -> None:
+        """Start the prober thread unless it is already running in this process"""
+        with self._lock:
+            if self._stopped:
+                return
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        due = {name: 0.0 for name in self.checks}
+        while not self._stopped:
+            for name, check in self.checks.items():
+                if not self._stopped and time.monotonic() >= due[name]:
+                    self.run_check(name, check)
+                    due[name] = time.monotonic() + self.intervals[name]
+            self._wake.wait(max(0.0, min(due.values()) - time.monotonic()))
+            self._wake.clear()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
+
+    def run_check(self, name: str, check: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = check()
+        except Exception as e:
+            result = {'status': 'unhealthy', 'error': str(e)}
+        finished = time.monotonic()
+        if result.get('status') != 'healthy':
+            logger.warning(f"Health check {name}: {result.get('status')} {result.get('error', '')}".rstrip())
+        with self._lock:
+            self._results[name] = (result, finished, datetime.now(timezone.utc).isoformat(), finished - started)
+            self._runs += 1
+        return result
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Latest result of every check, with its age"""
+        self.start()
+        now = time.monotonic()
+        services = {}
+        with self._lock:
+            for name in self.checks:
+                entry = self._results.get(name)
+                if entry is None:
+                    services[name] = {'status': 'pending', 'age_seconds': None, 'checked_at': None}
+                    continue
+                result, finished, checked_at, seconds = entry
+                service = dict(result)
+                service['age_seconds'] = round(now - finished, 3)
+                service['checked_at'] = checked_at
+                service['check_duration_ms'] = round(seconds * 1000, 2)
+                if now - finished > self.intervals[name] * STALE_AFTER_INTERVALS:
+                    service['stale'] = True
+                    if service['status'] == 'healthy':
+                        service['status'] = 'degraded'
+                services[name] = service
+        return services
+
+    def readiness(self) -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+        """Whether every readiness check has a fresh healthy result"""
+        services = self.snapshot()
+        checked = {name: services[name] for name in self.readiness_checks}
+        return all(service['status'] == 'healthy' for service in checked.values()), checked
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'check_runs': self._runs,
+                'intervals_seconds': dict(self.intervals),
+                'readiness_checks': list(self.readiness_checks)
+            }
+
+
+_prober: Optional[HealthProber] = None
+_prober_lock = threading.Lock()
+
+
+def get_health_prober() -> HealthProber:
+    """Get the process-wide health prober (started on first use)"""
+    global _prober
+    if _prober is None:
+        with _prober_lock:
+            if _prober is None:
+                try:
+                    health = cfg().health
+                    _prober = HealthProber(health.interval_seconds, health.geocoding_interval_seconds,
+                                           list(health.readiness_checks))
+                except AttributeError:
+                    _prober = HealthProber()
+    _prober.start()
+    return _prober
+
+
+def reset_health_prober() -> None:
+    """Drop the process-wide prober (after a configuration reload or in tests)"""
+    global _prober
+    with _prober_lock:
+        prober, _prober = _prober, None
+    if prober is not None:
+        prober.stop()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Horary API Metrics
+Request counts, error counts and latency histograms per endpoint and engine stage
+
+Latencies go into fixed-memory log-bucketed histograms (four buckets per
+doubling from 0.1 ms to about 105 s, so any percentile is within ~19% of
+the true value) instead of lists of recent samples. Recording costs a
+binary search and a few increments under a short per-histogram lock.
+
+Engine stages (geocoding, chart calculation, judgment, ...) are timed by
+the spans in horary_tracing.py into one process-wide set of histograms;
+stages judged in chart_pool worker processes are counted in those
+processes.
+
+Shared by the Flask apps (app.py, app_with_license.py) and the ASGI app
+(asgi_app.py); each process keeps its own numbers.
+
+Usage:
+    metrics = SimpleMetrics()
+    metrics.record_request('calculate_chart')
+    metrics.record_response_time('calculate_chart', 0.42)
+    metrics.get_stats()            # JSON for /api/metrics
+    metrics.prometheus_text()      # text exposition for /api/metrics/prometheus
+    component_prometheus_lines('horary', 'response_cache', get_response_cache().stats())
+    record_stage('chart', 0.003)
+
+Created for horary_engine.py performance work
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Tuple
+
+
+# Histogram bucket upper bounds in seconds: 0.1 ms * 2**(i/4)
+MIN_BOUND = 0.0001
+BUCKETS_PER_DOUBLING = 4
+DOUBLINGS = 20
+BOUNDS: List[float] = [MIN_BOUND * 2 ** (i / BUCKETS_PER_DOUBLING)
+                       for i in range(BUCKETS_PER_DOUBLING * DOUBLINGS + 1)]
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with a fixed number of buckets"""
+
+    __slots__ = ("_counts", "_count", "_sum", "_max", "_lock")
+
+    def __init__(self):
+        self._counts = [0] * (len(BOUNDS) + 1)  # the last bucket is above BOUNDS[-1]
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        index = bisect_left(BOUNDS, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def _copy(self) -> Tuple[List[int], int, float, float]:
+        with self._lock:
+            return list(self._counts), self._count, self._sum, self._max
+
+    @staticmethod
+    def _percentile(counts: List[int], count: int, maximum: float, fraction: float) -> float:
+        """Interpolated within the bucket holding the rank, capped at the largest sample"""
+        rank = fraction * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BOUNDS[index] if index < len(BOUNDS) else maximum
+                value = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(value, maximum)
+            cumulative += bucket_count
+        return maximum
+
+    def summary(self) -> Dict[str, float]:
+        counts, count, total, maximum = self._copy()
+        summary = {"count": count, "mean": total / count if count else 0.0, "max": maximum}
+        for name, fraction in PERCENTILES:
+            summary[name] = self._percentile(counts, count, maximum, fraction) if count else 0.0
+        return summary
+
+    def prometheus_lines(self, name: str, labels: str) -> Iterator[str]:
+        """Cumulative buckets at every doubling (exact, as they are bucket bounds), sum and count"""
+        counts, count, total, _ = self._copy()
+        separator = "," if labels else ""
+        cumulative = 0
+        for index, bound in enumerate(BOUNDS):
+            cumulative += counts[index]
+            if index % BUCKETS_PER_DOUBLING == 0:
+                yield f'{name}_bucket{{{labels}{separator}le="{bound:.6g}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}{separator}le="+Inf"}} {count}'
+        yield f'{name}_sum{{{labels}}} {total:.6f}'
+        yield f'{name}_count{{{labels}}} {count}'
+
+
+class HistogramSet:
+    """Histograms by name, created on first use"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> LatencyHistogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record(self, name: str, seconds: float) -> None:
+        self.get(name).record(seconds)
+
+    def items(self) -> List[Tuple[str, LatencyHistogram]]:
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def summaries(self) -> Dict[str, Dict[str, float]]:
+        return {name: histogram.summary() for name, histogram in self.items()}
+
+
+class CounterSet:
+    """Integer counters by key"""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, key, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + amount
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self._counts)
+
+
+# Process-wide engine stage timings
+_stages = HistogramSet()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    _stages.record(stage, seconds)
+
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    return _stages.summaries()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class SimpleMetrics:
+    """Per-endpoint request and error counters and latency histograms"""
+
+    def __init__(self):
+        self.request_count = CounterSet()
+        self.error_count = CounterSet()
+        self.response_times = HistogramSet()
+
+    def record_request(self, endpoint):
+        self.request_count.increment(endpoint)
+
+    def record_error(self, endpoint, error_type):
+        self.error_count.increment((endpoint, error_type))
+
+    def record_response_time(self, endpoint, duration):
+        self.response_times.record(endpoint, duration)
+
+    def get_stats(self):
+        latency = self.response_times.summaries()
+        return {
+            'requests': self.request_count.snapshot(),
+            'errors': {f"{endpoint}_{error_type}": count
+                       for (endpoint, error_type), count in self.error_count.snapshot().items()},
+            'avg_response_times': {endpoint: summary['mean'] for endpoint, summary in latency.items()
+                                   if summary['count']},
+            'latency': latency,
+            'engine_stages': stage_stats()
+        }
+
+    def prometheus_text(self, prefix: str = 'horary') -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [f'# HELP {prefix}_requests_total API requests by endpoint',
+                 f'# TYPE {prefix}_requests_total counter']
+        for endpoint, count in sorted(self.request_count.snapshot().items()):
+            lines.append(f'{prefix}_requests_total{{endpoint="{_escape(endpoint)}"}} {count}')
+
+        lines += [f'# HELP {prefix}_errors_total API errors by endpoint and error type',
+                  f'# TYPE {prefix}_errors_total counter']
+        for (endpoint, error_type), count in sorted(self.error_count.snapshot().items()):
+            lines.append(f'{prefix}_errors_total{{endpoint="{_escape(endpoint)}",'
+                         f'error_type="{_escape(error_type)}"}} {count}')
+
+        for name, label, help_text, histograms in (
+                (f'{prefix}_request_duration_seconds', 'endpoint', 'API response time', self.response_times),
+                (f'{prefix}_engine_stage_duration_seconds', 'stage', 'Horary engine stage time', _stages)):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for key, histogram in histograms.items():
+                lines.extend(histogram.prometheus_lines(name, f'{label}="{_escape(key)}"'))
+
+        lines.extend(self._extra_prometheus_lines(prefix))
+        return "\n".join(lines) + "\n"
+
+    def _extra_prometheus_lines(self, prefix: str) -> List[str]:
+        """Subclasses add their own counters here"""
+        return []
+
+
+def component_prometheus_lines(prefix: str, component: str, stats: Dict) -> List[str]:
+    """
+    Numeric values of a component's stats() dict (response cache, geocode
+    queue, ...) as untyped samples; nested dicts become a "group" label.
+    """
+    lines = []
+    for key, value in sorted(stats.items()):
+        if isinstance(value, dict):
+            for name, number in sorted(value.items()):
+                if isinstance(number, (int, float)) and not isinstance(number, bool):
+                    lines.append(f'{prefix}_{component}_{name}{{group="{_escape(key)}"}} {number}')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f'{prefix}_{component}_{key} {value}')
+    return lines
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Perfection Solver
+Exact aspect perfection times from the ephemeris
+
+An aspect perfects when the elongation between two planets reaches the
+aspect angle. Rather than dividing the orb by the current relative speed,
+the solver samples the real motion, splits the search at relative stations
+(where the elongation can touch the aspect angle and turn back) and refines
+each crossing with Brent's method.
+
+Results are cached per (planet pair, aspect, JD bucket). Each entry holds
+the perfections found so far from the start of the bucket and how far the
+scan has got; a query only extends the scan when the cached part cannot
+answer it. Batches and time sweeps repeat the same pairs bucket after bucket.
+
+Created for horary_engine.py performance work
+"""
+
+import bisect
+import datetime
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import swisseph as swe
+
+from _horary_math import find_root_brent
+from horary_ephemeris import get_ephemeris_backend
+
+
+# Sampling step (days) per planet; a pair uses the smaller of its two. Small
+# enough that the elongation moves well under 180 degrees per step and the
+# relative speed of the pair changes sign at most once per step
+SCAN_STEPS = {
+    swe.MOON: 0.5,
+    swe.MERCURY: 4.0,
+    swe.VENUS: 4.0
+}
+DEFAULT_SCAN_STEP = 8.0
+
+# Perfection times are refined to about 1 second
+PERFECTION_TIME_TOLERANCE = 1e-5
+
+DEFAULT_BUCKET_DAYS = 1.0
+DEFAULT_CACHE_SIZE = 4096
+
+J2000_JD = 2451545.0
+J2000_UTC = datetime.datetime(2000, 1, 1, 12, 0, 0)
+
+
+def jd_to_datetime(jd: float) -> datetime.datetime:
+    """Naive UTC datetime for a Julian Day, to the second"""
+    return J2000_UTC + datetime.timedelta(seconds=round((jd - J2000_JD) * 86400.0))
+
+
+def _wrap180(degrees: float) -> float:
+    return (degrees + 180.0) % 360.0 - 180.0
+
+
+class PerfectionSolver:
+    """Next exact perfection of an aspect between two planets, with a bucketed cache"""
+
+    def __init__(self, ephemeris=None, bucket_days: float = DEFAULT_BUCKET_DAYS,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.ephemeris = ephemeris or get_ephemeris_backend()
+        self.bucket_days = bucket_days
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def next_perfection(self, planet_id1: int, planet_id2: int, aspect_degrees: float,
+                        jd_ut: float, max_days: float) -> Optional[float]:
+        """
+        Julian Day of the first perfection after jd_ut and within max_days.
+
+        Args:
+            planet_id1, planet_id2: Swiss Ephemeris planet IDs
+            aspect_degrees: Aspect angle (0, 60, 90, 120 or 180)
+            jd_ut: Start of the search
+            max_days: Search horizon
+
+        Returns:
+            Julian Day of perfection, or None if the aspect does not perfect in time
+        """
+        if planet_id2 < planet_id1:
+            planet_id1, planet_id2 = planet_id2, planet_id1
+
+        bucket = math.floor(jd_ut / self.bucket_days)
+        key = (planet_id1, planet_id2, aspect_degrees, bucket)
+        horizon = jd_ut + max_days
+
+        # Swiss Ephemeris is not thread-safe, so scans are serialized anyway
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = _ScanState(bucket * self.bucket_days)
+                self._cache[key] = entry
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(key)
+
+            perfection = entry.first_after(jd_ut)
+            if perfection is None and entry.scanned_until < horizon:
+                self.misses += 1
+                self._scan(entry, planet_id1, planet_id2, aspect_degrees, jd_ut, horizon)
+                perfection = entry.first_after(jd_ut)
+            else:
+                self.hits += 1
+
+        return perfection if perfection is not None and perfection <= horizon else None
+
+    def cache_info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def _scan(self, entry: "_ScanState", planet_id1: int, planet_id2: int, aspect_degrees: float,
+              jd_ut: float, horizon: float) -> None:
+        """Extend a scan until it finds a perfection after jd_ut or passes the horizon"""
+        targets = [aspect_degrees] if aspect_degrees in (0, 180) else [aspect_degrees, -aspect_degrees]
+        step = min(SCAN_STEPS.get(planet_id1, DEFAULT_SCAN_STEP), SCAN_STEPS.get(planet_id2, DEFAULT_SCAN_STEP))
+        position = self.ephemeris.position
+
+        def sample(jd: float) -> Tuple[float, float]:
+            lon1, _, speed1 = position(jd, planet_id1)
+            lon2, _, speed2 = position(jd, planet_id2)
+            return lon1 - lon2, speed1 - speed2
+
+        def elongation(jd: float) -> float:
+            return sample(jd)[0]
+
+        def relative_speed(jd: float) -> float:
+            return sample(jd)[1]
+
+        jd_before = entry.scanned_until
+        elongation_before, speed_before = sample(jd_before)
+
+        while jd_before < horizon:
+            jd_after = jd_before + step
+            elongation_after, speed_after = sample(jd_after)
+
+            # Split at a relative station so each piece is monotonic
+            pieces = [(jd_before, elongation_before, jd_after, elongation_after)]
+            if (speed_before > 0) != (speed_after > 0) and speed_before != 0 and speed_after != 0:
+                jd_turn = find_root_brent(relative_speed, jd_before, jd_after, speed_before, speed_after,
+                                          tolerance=PERFECTION_TIME_TOLERANCE)
+                elongation_turn = elongation(jd_turn)
+                pieces = [(jd_before, elongation_before, jd_turn, elongation_turn),
+                          (jd_turn, elongation_turn, jd_after, elongation_after)]
+
+            found = []
+            for a, elongation_a, b, elongation_b in pieces:
+                for target in targets:
+                    miss_a = _wrap180(elongation_a - target)
+                    miss_b = _wrap180(elongation_b - target)
+                    # A sign change across the +-180 wrap is not a perfection
+                    if (miss_a > 0) != (miss_b > 0) and abs(miss_a) + abs(miss_b) < 180:
+                        found.append(find_root_brent(
+                            lambda jd, t=target: _wrap180(elongation(jd) - t), a, b, miss_a, miss_b,
+                            tolerance=PERFECTION_TIME_TOLERANCE))
+
+            entry.perfections.extend(jd for jd in sorted(found) if jd > entry.start_jd)
+            entry.scanned_until = jd_after
+            jd_before, elongation_before, speed_before = jd_after, elongation_after, speed_after
+
+            if entry.perfections and entry.perfections[-1] > jd_ut:
+                return
+
+
+class _ScanState:
+    """Perfections found from start_jd up to scanned_until"""
+
+    __slots__ = ("start_jd", "scanned_until", "perfections")
+
+    def __init__(self, start_jd: float):
+        self.start_jd = start_jd
+        self.scanned_until = start_jd
+        self.perfections = []
+
+    def first_after(self, jd: float) -> Optional[float]:
+        index = bisect.bisect_right(self.perfections, jd)
+        return self.perfections[index] if index < len(self.perfections) else None
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Chart Worker Pool
+Judges batches of chart requests on a pool of pre-warmed worker processes
+
+Each worker process builds one HoraryEngine and preloads the shared
+services when it starts, then judges chunks of requests for the lifetime
+of the pool. Every item succeeds or fails on its own: invalid input, a
+location that cannot be resolved, an engine error or even a crashed
+worker only marks the affected items as failed. When no chunk finishes
+within chunk_timeout_seconds, the chunks in flight fail as WorkerTimeout
+and the workers are replaced, so a stuck worker cannot hang a request.
+
+Workers start from a forkserver by default: forking the request process
+itself, with the geocoding queue, health prober and request threads
+running, can copy a lock another thread holds and deadlock the child.
+
+Locations are resolved in the parent process before dispatch, so web
+lookups go through the one rate-limited geocoding queue and into the
+shared geocode cache, where the workers find them (keep
+geocoding.cache_path set, or every worker repeats the web lookup).
+
+Usage:
+    pool = get_chart_pool()
+    outcomes = pool.judge_batch([(question, settings), ...])
+    for index, outcome in pool.iter_batch(requests):   # as items finish
+        ...
+
+Configure it in horary_constants.yaml:
+    chart_pool:
+      enabled: true
+      workers: 0
+      chunk_size: 4
+      max_batch_size: 5000
+      start_method: "forkserver"
+      prewarm: false
+      chunk_timeout_seconds: 120
+
+Created for horary_engine.py performance work
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from horary_config import cfg
+from horary_requests import ChartRequest
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHUNK_SIZE = 4
+DEFAULT_MAX_BATCH_SIZE = 5000
+DEFAULT_START_METHOD = "forkserver"
+DEFAULT_CHUNK_TIMEOUT = 120.0
+
+# Chunks queued per worker while streaming a batch
+MAX_CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _error_outcome(error: str, error_type: str, judgment: str = 'ERROR') -> Dict[str, Any]:
+    return {
+        'status': 'error',
+        'error': error,
+        'error_type': error_type,
+        'judgment': judgment,
+        'confidence': 0,
+        'reasoning': [error]
+    }
+
+
+# Worker process state, set up once by _init_worker
+_worker_engine = None
+
+
+def _init_worker() -> None:
+    """Build the worker's engine and load shared services before the first chunk"""
+    global _worker_engine
+    from horary_engine import HoraryEngine
+    from horary_services import get_services
+    get_services().preload()
+    _worker_engine = HoraryEngine()
+
+
+def _judge_one(engine, question: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        result = engine.judge(question, settings)
+    except Exception as e:
+        logger.error(f"Batch item failed: {e}")
+        return _error_outcome(str(e), type(e).__name__)
+
+    seconds = time.perf_counter() - started
+    if result.get('error'):
+        outcome = _error_outcome(result['error'], result.get('error_type', 'CalculationError'),
+                                 result.get('judgment', 'ERROR'))
+        outcome['reasoning'] = result.get('reasoning', outcome['reasoning'])
+    else:
+        outcome = {'status': 'success', 'result': result}
+    outcome['calculation_time_seconds'] = seconds
+    return outcome
+
+
+def _judge_chunk(chunk: List[Tuple[int, str, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+    """Runs in a worker process"""
+    if _worker_engine is None:
+        _init_worker()
+    return [(index, _judge_one(_worker_engine, question, settings)) for index, question, settings in chunk]
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ChartWorkerPool:
+    """Process pool judging chart requests; falls back to in-process judging when disabled"""
+
+    def __init__(self, workers: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 start_method: str = DEFAULT_START_METHOD, enabled: bool = True,
+                 chunk_timeout: float = DEFAULT_CHUNK_TIMEOUT):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.start_method = start_method
+        self.enabled = enabled
+        self.chunk_timeout = chunk_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local_engine = None
+        self._counters = {"batches": 0, "items": 0, "failed_items": 0, "worker_crashes": 0, "worker_timeouts": 0}
+        self._busy_seconds = 0.0
+
+    @property
+    def execution(self) -> str:
+        return "process_pool" if self.enabled else "in_process"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # A forked child cannot use its parent's executor
+                if start_method_available(self.start_method):
+                    context = multiprocessing.get_context(self.start_method)
+                else:
+                    context = multiprocessing.get_context()
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                                     initializer=_init_worker)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor, terminate: bool = False) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        # A stuck worker never exits on its own; shutdown() has no way to stop it
+        processes = list((getattr(executor, '_processes', None) or {}).values()) if terminate else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def warm(self) -> None:
+        """Start the worker processes now rather than on the first batch"""
+        if self.enabled:
+            executor = self._get_executor()
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+
+    def judge_batch(self, requests: List[ChartRequest]) -> List[Dict[str, Any]]:
+        """
+        Judge many (question, settings) pairs.
+
+        Returns:
+            One outcome per request, in order: {'status': 'success', 'result': ...}
+            or {'status': 'error', 'error': ..., 'error_type': ..., ...}
+        """
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        for index, outcome in self.iter_batch(requests):
+            outcomes[index] = outcome
+        return outcomes
+
+    def iter_batch(self, requests: List[ChartRequest]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Judge many (question, settings) pairs, yielding (index, outcome) as
+        each item finishes (not in request order).
+
+        At most MAX_CHUNKS_IN_FLIGHT_PER_WORKER chunks per worker are queued
+        at a time, so memory stays bounded however long the batch is.
+        Closing the generator (a client disconnecting mid-stream) cancels
+        the chunks not yet started.
+        """
+        started = time.perf_counter()
+        counts = {"items": 0, "failed_items": 0}
+        items = self._with_locations(requests)
+        outcomes = self._iter_pool(items) if self.enabled else self._iter_local(items)
+        try:
+            for index, outcome in outcomes:
+                counts["items"] += 1
+                counts["failed_items"] += outcome['status'] != 'success'
+                yield index, outcome
+        finally:
+            outcomes.close()
+            with self._lock:
+                self._counters["batches"] += 1
+                self._counters["items"] += counts["items"]
+                self._counters["failed_items"] += counts["failed_items"]
+                self._busy_seconds += time.perf_counter() - started
+
+    def _with_locations(self, requests: List[ChartRequest]) -> Iterator[Tuple[int, str, Dict[str, Any], Optional[Dict]]]:
+        """
+        Start geocoding every distinct location in this process, then yield
+        (index, question, settings, error_outcome) once each item's location
+        is resolved; error_outcome is None when the item can be judged.
+        """
+        from _horary_math import LocationError, safe_geocode_async, wait_for_geocode
+
+        futures = {}
+        for _, settings in requests:
+            location = settings.get("location")
+            if location not in futures:
+                futures[location] = safe_geocode_async(location)
+
+        errors = {}
+        for index, (question, settings) in enumerate(requests):
+            location = settings.get("location")
+            if location not in errors:
+                try:
+                    wait_for_geocode(futures[location], location)
+                    errors[location] = None
+                except LocationError as e:
+                    errors[location] = _error_outcome(str(e), type(e).__name__, 'LOCATION_ERROR')
+            error = errors[location]
+            yield index, question, settings, dict(error) if error else None
+
+    def _iter_local(self, items) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if self._local_engine is None:
+            from horary_engine import HoraryEngine
+            self._local_engine = HoraryEngine()
+        for index, question, settings, error in items:
+            yield index, error or _judge_one(self._local_engine, question, settings)
+
+    def _iter_pool(self, items) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        executor = self._get_executor()
+        max_in_flight = self.workers * MAX_CHUNKS_IN_FLIGHT_PER_WORKER
+        in_flight = {}
+        exhausted = False
+        try:
+            while True:
+                # Top up the workers; items with unresolved locations are answered here
+                while not exhausted and len(in_flight) < max_in_flight:
+                    chunk = []
+                    for index, question, settings, error in items:
+                        if error is not None:
+                            yield index, error
+                            continue
+                        chunk.append((index, question, settings))
+                        if len(chunk) >= self.chunk_size:
+                            break
+                    else:
+                        exhausted = True
+                    if chunk:
+                        try:
+                            in_flight[executor.submit(_judge_chunk, chunk)] = chunk
+                        except BrokenProcessPool as e:
+                            executor = self._restart_executor(executor)
+                            for index, _, _ in chunk:
+                                yield index, _error_outcome(f"Worker process failed: {e}", 'WorkerCrashed')
+
+                if not in_flight:
+                    return
+
+                done, _ = wait(in_flight, timeout=self.chunk_timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # No chunk finished in time: the workers are stuck, so fail what they hold
+                    executor = self._restart_executor(executor, "worker_timeouts", terminate=True)
+                    for chunk in in_flight.values():
+                        for index, _, _ in chunk:
+                            yield index, _error_outcome(
+                                f"Worker did not finish within {self.chunk_timeout:g}s", 'WorkerTimeout')
+                    in_flight.clear()
+                    continue
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool as e:
+                        # Every chunk in flight fails with the pool; later chunks get a new one
+                        executor = self._restart_executor(executor)
+                        results = [(index, _error_outcome(f"Worker process failed: {e}", 'WorkerCrashed'))
+                                   for index, _, _ in chunk]
+                    except Exception as e:
+                        results = [(index, _error_outcome(str(e), type(e).__name__)) for index, _, _ in chunk]
+                    for index, outcome in results:
+                        yield index, outcome
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def _restart_executor(self, executor: ProcessPoolExecutor, counter: str = "worker_crashes",
+                          terminate: bool = False) -> ProcessPoolExecutor:
+        """Replace a broken or stuck executor (once, however many chunks report it)"""
+        with self._lock:
+            current = self._executor
+        if current is executor or current is None:
+            logger.error(f"Chart worker pool {'timed out' if terminate else 'broke'}; restarting it")
+            with self._lock:
+                self._counters[counter] += 1
+            self._discard_executor(executor, terminate)
+        return self._get_executor()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["execution"] = self.execution
+            stats["workers"] = self.workers if self.enabled else 1
+            stats["items_per_second"] = round(stats["items"] / self._busy_seconds, 2) if self._busy_seconds else 0.0
+            return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def start_method_available(method: str) -> bool:
+    return method in multiprocessing.get_all_start_methods()
+
+
+def max_batch_size() -> int:
+    try:
+        return cfg().chart_pool.max_batch_size
+    except AttributeError:
+        return DEFAULT_MAX_BATCH_SIZE
+
+
+_pool: Optional[ChartWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_chart_pool() -> ChartWorkerPool:
+    """Get the process-wide chart worker pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    settings = cfg().chart_pool
+                    _pool = ChartWorkerPool(settings.workers, settings.chunk_size,
+                                            settings.start_method, settings.enabled,
+                                            getattr(settings, 'chunk_timeout_seconds', DEFAULT_CHUNK_TIMEOUT))
+                except AttributeError:
+                    _pool = ChartWorkerPool()
+    return _pool
+
+
+def reset_chart_pool() -> None:
+    """Shut down and drop the process-wide pool (after a configuration reload or in tests)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Request Profiling
+Profiles a single /api/calculate-chart request on demand
+
+A request carrying the X-Horary-Profile header is judged under a profiler
+when profiling is allowed: the header value matches the admin token
+(profiling.admin_token or the HORARY_PROFILE_TOKEN environment variable),
+or profiling.enabled is on (development only: any header value is then
+accepted). The profiled request bypasses the response cache and request
+coalescing, so the profile always shows the full computation.
+
+Two profilers (X-Horary-Profile-Mode, default profiling.mode):
+- deterministic: cProfile; stored as <request_id>.prof (load it with
+  pstats or snakeviz), top functions by cumulative time in the response;
+- sampling: samples the request thread's stack every sample_interval_ms;
+  stored as <request_id>.folded collapsed stacks (flamegraph.pl,
+  speedscope), heaviest stacks in the response.
+
+Both count the swe.calc_ut, swe.houses and geocoding calls the request
+thread made (web lookups themselves run on the geocoding queue's thread;
+safe_geocode/safe_geocode_async calls are what is counted). The response
+gets calculation_metadata['profile'] and the files are kept in
+profiling.output_dir (newest max_profiles), keyed by request ID: the
+X-Request-ID header when it is a safe name, otherwise a generated one.
+GET /api/profiles/<request_id> returns a stored profile.
+
+Usage:
+    mode = profiling_mode(request.headers.get(PROFILE_HEADER), request.headers.get(PROFILE_MODE_HEADER))
+    if mode:
+        result, profile = profile_call(lambda: engine._judge(question, settings), request_id, mode)
+        result['calculation_metadata']['profile'] = profile.metadata()
+
+Configure it in horary_constants.yaml:
+    profiling:
+      enabled: false
+      admin_token: ""
+      mode: "deterministic"
+      sample_interval_ms: 1
+      output_dir: "profiles"
+      max_profiles: 50
+
+Created for horary_engine.py performance work
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import swisseph as swe
+
+from horary_config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_HEADER = 'X-Horary-Profile'
+PROFILE_MODE_HEADER = 'X-Horary-Profile-Mode'
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+MODES = ('deterministic', 'sampling')
+DEFAULT_SAMPLE_INTERVAL_MS = 1.0
+DEFAULT_MAX_PROFILES = 50
+TOP_ENTRIES = 25
+
+# Geocoding entry points called on the request thread
+GEOCODE_FUNCTIONS = frozenset({'safe_geocode', 'safe_geocode_async'})
+
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def _setting(name: str, default):
+    try:
+        return getattr(cfg().profiling, name)
+    except AttributeError:
+        return default
+
+
+def profiling_mode(header_value: Optional[str], mode_value: Optional[str] = None) -> Optional[str]:
+    """
+    Profiler to run for a request, or None when it did not ask or is not allowed.
+
+    Args:
+        header_value: X-Horary-Profile header (the admin token)
+        mode_value: X-Horary-Profile-Mode header ("deterministic" or "sampling")
+    """
+    if not header_value:
+        return None
+    token = os.environ.get('HORARY_PROFILE_TOKEN') or _setting('admin_token', '')
+    allowed = bool(_setting('enabled', False)) or (
+        bool(token) and hmac.compare_digest(header_value.encode('utf-8'), str(token).encode('utf-8')))
+    if not allowed:
+        logger.warning("Profiling requested without a valid admin token")
+        return None
+    mode = (mode_value or _setting('mode', 'deterministic')).lower()
+    return mode if mode in MODES else 'deterministic'
+
+
+def request_id_for(header_value: Optional[str]) -> str:
+    """The caller's request ID when it is safe as a file name, else a new one"""
+    if header_value and _REQUEST_ID.match(header_value):
+        return header_value
+    return uuid.uuid4().hex
+
+
+def profile_dir() -> Path:
+    path = Path(_setting('output_dir', 'profiles'))
+    if not path.is_absolute():
+        path = Path(__file__).parent / path
+    return path
+
+
+class CallCounter:
+    """Counts ephemeris and geocoding calls on the current thread through sys.setprofile"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._previous = None
+
+    def _hook(self, frame, event, arg):
+        if event == 'c_call':
+            if arg is swe.calc_ut:
+                self.counts['swe.calc_ut'] += 1
+            elif arg is swe.houses:
+                self.counts['swe.houses'] += 1
+        elif event == 'call' and frame.f_code.co_name in GEOCODE_FUNCTIONS:
+            self.counts['geocode'] += 1
+
+    def __enter__(self):
+        self._previous = sys.getprofile()
+        sys.setprofile(self._hook)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        sys.setprofile(self._previous)
+        return False
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack from a background thread into
+    collapsed stacks, keeping only samples taken inside root_code's frame
+    (stacks start there).
+    """
+
+    def __init__(self, thread_id: int, interval: float, root_code):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    @staticmethod
+    def _label(code) -> str:
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self._label(frame.f_code))
+                if frame.f_code is self.root_code:
+                    break
+                frame = frame.f_back
+            if frame is None:
+                continue  # before or after the profiled call
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    """Outcome of one profiled request"""
+
+    def __init__(self, request_id: str, mode: str, seconds: float, call_counts: Dict[str, int],
+                 top: List[Dict[str, Any]], path: Optional[Path] = None, samples: Optional[int] = None):
+        self.request_id = request_id
+        self.mode = mode
+        self.seconds = seconds
+        self.call_counts = call_counts
+        self.top = top
+        self.path = path
+        self.samples = samples
+
+    def metadata(self) -> Dict[str, Any]:
+        """JSON form for calculation_metadata['profile']"""
+        metadata = {
+            'request_id': self.request_id,
+            'mode': self.mode,
+            'profiled_seconds': round(self.seconds, 6),
+            'call_counts': self.call_counts,
+            'top_stacks' if self.mode == 'sampling' else 'top_functions': self.top,
+            'stored': self.path is not None,
+            'download': f"/api/profiles/{self.request_id}" if self.path is not None else None
+        }
+        if self.samples is not None:
+            metadata['samples'] = self.samples
+        return metadata
+
+
+def _pstats_counts(stats: pstats.Stats) -> Dict[str, int]:
+    """Ephemeris and geocoding call counts from cProfile's own call counts"""
+    counts = Counter()
+    for (filename, _, name), (_, calls, _, _, _) in stats.stats.items():
+        if name == '<built-in method swisseph.calc_ut>':
+            counts['swe.calc_ut'] += calls
+        elif name == '<built-in method swisseph.houses>':
+            counts['swe.houses'] += calls
+        elif name in GEOCODE_FUNCTIONS and filename.endswith('_horary_math.py'):
+            counts['geocode'] += calls
+    return counts
+
+
+def _top_functions(stats: pstats.Stats) -> List[Dict[str, Any]]:
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_ENTRIES]
+    return [{
+        'function': f"{os.path.basename(filename)}:{lineno}({name})",
+        'calls': calls,
+        'total_ms': round(total * 1000, 3),
+        'cumulative_ms': round(cumulative * 1000, 3)
+    } for (filename, lineno, name), (_, calls, total, cumulative, _) in entries]
+
+
+def profile_call(func: Callable[[], Any], request_id: str, mode: str) -> Tuple[Any, RequestProfile]:
+    """
+    Run func() under the given profiler on the current thread and store the profile.
+
+    Returns:
+        (func's result, RequestProfile)
+    """
+    started = time.perf_counter()
+    if mode == 'sampling':
+        interval = _setting('sample_interval_ms', DEFAULT_SAMPLE_INTERVAL_MS) / 1000.0
+        with StackSampler(threading.get_ident(), interval, func.__code__) as sampler, CallCounter() as counter:
+            result = func()
+        seconds = time.perf_counter() - started
+        counts = dict(counter.counts)
+        top = [{'stack': stack, 'samples': count} for stack, count in sampler.stacks.most_common(TOP_ENTRIES)]
+        path = _store(request_id, '.folded', sampler.collapsed())
+        profile = RequestProfile(request_id, mode, seconds, counts, top, path, sampler.samples)
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = func()
+        finally:
+            profiler.disable()
+        seconds = time.perf_counter() - started
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        path = _store(request_id, '.prof', None, profiler)
+        profile = RequestProfile(request_id, mode, seconds, dict(_pstats_counts(stats)), _top_functions(stats), path)
+
+    if path is not None:
+        _store(request_id, '.json', json.dumps(profile.metadata(), indent=2))
+        _prune()
+    logger.info(f"Profiled request {request_id} ({mode}) in {seconds:.3f}s: {profile.call_counts}")
+    return result, profile
+
+
+def _store(request_id: str, suffix: str, text: Optional[str], profiler: Optional[cProfile.Profile] = None) -> Optional[Path]:
+    directory = profile_dir()
+    path = directory / f"{request_id}{suffix}"
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        if profiler is not None:
+            profiler.dump_stats(str(path))
+        else:
+            path.write_text(text, encoding='utf-8')
+        return path
+    except OSError as e:
+        logger.error(f"Could not store profile {path}: {e}")
+        return None
+
+
+def _prune() -> None:
+    """Keep the newest max_profiles profiles"""
+    keep = _setting('max_profiles', DEFAULT_MAX_PROFILES)
+    try:
+        summaries = sorted(profile_dir().glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for summary in summaries[keep:]:
+            for path in profile_dir().glob(f"{summary.stem}.*"):
+                path.unlink()
+    except OSError as e:
+        logger.warning(f"Could not prune stored profiles: {e}")
+
+
+def stored_profile(request_id: str) -> Optional[Path]:
+    """Path of a stored profile (.prof or .folded), or None"""
+    if not _REQUEST_ID.match(request_id or ''):
+        return None
+    for suffix in ('.prof', '.folded'):
+        path = profile_dir() / f"{request_id}{suffix}"
+        if path.is_file():
+            return path
+    return None
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Chart Requests
+Validation and response metadata shared by the chart endpoints
+
+parse_chart_request() turns a /api/calculate-chart JSON body into the
+(question, settings) pair HoraryEngine.judge() takes, raising
+ChartRequestError with the user-facing reason when a field is missing or
+malformed. calculation_metadata() builds the calculation_metadata block
+attached to every chart result. The Flask app, the ASGI app and the batch
+endpoints all use them, so every serving mode answers alike.
+
+Usage:
+    try:
+        question, settings = parse_chart_request(data)
+    except ChartRequestError as e:
+        return e.response(), 400
+    result = engine.judge(question, settings)
+    result['calculation_metadata'] = calculation_metadata(settings, seconds)
+
+A request body may also carry "trace": true (see horary_tracing.py); it is
+not part of the judge() settings.
+
+Created for horary_engine.py performance work
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from horary_tracing import Trace
+
+
+ChartRequest = Tuple[str, Dict[str, Any]]
+
+
+class ChartRequestError(ValueError):
+    """Invalid chart request; reason is the user-facing explanation"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+    def response(self) -> Dict[str, Any]:
+        return {
+            'error': str(self),
+            'judgment': 'ERROR',
+            'confidence': 0,
+            'reasoning': [self.reason]
+        }
+
+
+def parse_chart_request(data: Dict[str, Any]) -> ChartRequest:
+    """
+    Validate a /api/calculate-chart request body.
+
+    Returns:
+        (question, settings) for HoraryEngine.judge()
+
+    Raises:
+        ChartRequestError: for missing or malformed fields
+    """
+    if not isinstance(data, dict):
+        raise ChartRequestError('Chart request must be a JSON object', 'Invalid chart request')
+
+    question = data.get('question', '').strip()
+    location = data.get('location', 'London, UK').strip()
+    date_str = data.get('date')
+    time_str = data.get('time')
+    use_current_time = data.get('useCurrentTime', True)
+    manual_houses = data.get('manualHouses')
+
+    if not question:
+        raise ChartRequestError('Question is required', 'No horary question provided')
+
+    if not location:
+        raise ChartRequestError('Location is required', 'No location provided')
+
+    if not use_current_time and (not date_str or not time_str):
+        raise ChartRequestError('Date and time are required when not using current time',
+                                'Date and time must be provided for manual time entry')
+
+    houses_list = None
+    if manual_houses:
+        try:
+            houses_list = [int(h.strip()) for h in manual_houses.split(',') if h.strip()]
+        except ValueError:
+            raise ChartRequestError('Manual houses must be numbers separated by commas (e.g., "1,7")',
+                                    'Invalid manual house format')
+        if len(houses_list) < 2:
+            raise ChartRequestError(
+                'Manual houses must include at least querent and quesited houses (e.g., "1,7")',
+                'Invalid manual house specification')
+
+    settings = {
+        "location": location,
+        "date": date_str,
+        "time": time_str,
+        "timezone": data.get('timezone'),
+        "use_current_time": use_current_time,
+        "manual_houses": houses_list,
+        "ignore_radicality": data.get('ignoreRadicality', False),
+        "ignore_void_moon": data.get('ignoreVoidMoon', False),
+        "ignore_combustion": data.get('ignoreCombustion', False),
+        "ignore_saturn_7th": data.get('ignoreSaturn7th', False),
+        "exaltation_confidence_boost": data.get('exaltationConfidenceBoost', 15.0)
+    }
+    return question, settings
+
+
+def calculation_metadata(settings: Dict[str, Any], calculation_time: float,
+                         trace: Optional[Trace] = None) -> Dict[str, Any]:
+    """Enhanced calculation metadata attached to every chart result (with the request's trace if any)"""
+    metadata = {
+        'calculation_time_seconds': calculation_time,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'api_version': '2.0.0',  # Enhanced version
+        'engine_version': 'Enhanced Traditional Horary 2.0',
+        'enhanced_features_used': {
+            'future_retrograde_checks': True,
+            'directional_motion_awareness': True,
+            'sequence_enforcement': True,
+            'enhanced_denial_conditions': True,
+            'reception_weighting_nuance': True,
+            'solar_condition_enhancements': True,
+            'variable_moon_timing': True,
+            'fail_fast_geocoding': True
+        },
+        'override_flags_applied': {
+            'ignore_radicality': settings['ignore_radicality'],
+            'ignore_void_moon': settings['ignore_void_moon'],
+            'ignore_combustion': settings['ignore_combustion'],
+            'ignore_saturn_7th': settings['ignore_saturn_7th']
+        },
+        'enhanced_parameters': {
+            'exaltation_confidence_boost': settings['exaltation_confidence_boost']
+        }
+    }
+    if trace is not None:
+        metadata['trace'] = trace.summary()
+    return metadata
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Response Cache
+Content-addressed LRU cache of HoraryEngine.judge() results
+
+The key is a SHA-256 of the normalized request (stripped question,
+normalized location, date, time, timezone, manual houses,
+override flags and reception boost) together with the content hash of the
+configuration snapshot the engine judges with, so a configuration change
+can never serve a stale judgment. The whole cache is also dropped when
+the configuration is reset (reloaded).
+
+Results are stored pickled: every hit is a fresh copy the caller may
+modify, and the stored size is known exactly. Least recently used entries
+are evicted once the cache holds more than max_bytes.
+
+"Current time" requests are keyed on the current UTC minute and expire
+when that minute ends, so re-renders within the minute share one
+judgment and nothing older is ever served.
+
+Usage:
+    cache = get_response_cache()
+    key, expires = response_key(question, settings)
+    result = cache.get(key)
+    if result is None:
+        result = engine.judge(question, settings)
+        cache.put(key, result, expires)
+
+Configure it in horary_constants.yaml:
+    response_cache:
+      enabled: true
+      max_bytes: 67108864
+
+Created for horary_engine.py performance work
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from horary_config import ConfigSnapshot, cfg, config_snapshot, on_config_reset
+from horary_geocache import normalize_location_key
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def response_key(question: str, settings: Dict[str, Any],
+                 now: Optional[datetime.datetime] = None,
+                 config: Optional[ConfigSnapshot] = None) -> Tuple[str, Optional[float]]:
+    """
+    Cache key of a judge() request, and when its entry expires.
+
+    config is the snapshot the judgment is computed with (default: the
+    current one); its content hash is part of the key.
+
+    Returns:
+        (hex key, expiry as time.time() seconds or None for no expiry)
+    """
+    use_current_time = settings.get("use_current_time", True)
+    boost = settings.get("exaltation_confidence_boost")
+    normalized = {
+        "question": question.strip(),
+        "location": normalize_location_key(settings.get("location", "London, England")),
+        "manual_houses": settings.get("manual_houses"),
+        "ignore_radicality": bool(settings.get("ignore_radicality", False)),
+        "ignore_void_moon": bool(settings.get("ignore_void_moon", False)),
+        "ignore_combustion": bool(settings.get("ignore_combustion", False)),
+        "ignore_saturn_7th": bool(settings.get("ignore_saturn_7th", False)),
+        "exaltation_confidence_boost": float(boost) if boost is not None else None,
+        "config": (config or config_snapshot()).content_hash
+    }
+
+    expires = None
+    if use_current_time:
+        # Only shared within the current minute
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        minute = now.replace(second=0, microsecond=0)
+        normalized["now"] = minute.isoformat()
+        expires = (minute + datetime.timedelta(minutes=1)).timestamp()
+    else:
+        normalized["date"] = (settings.get("date") or "").strip()
+        normalized["time"] = (settings.get("time") or "").strip()
+        normalized["timezone"] = (settings.get("timezone") or "").strip()
+
+    blob = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest(), expires
+
+
+class ResponseCache:
+    """Thread-safe LRU of pickled results with a byte budget"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0,
+                          "too_large": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """A fresh copy of the cached result, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            blob, expires = entry
+            if expires is not None and time.time() >= expires:
+                self._remove(key)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+        return pickle.loads(blob)
+
+    def put(self, key: str, result: Any, expires: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if len(blob) > self.max_bytes:
+                self._counters["too_large"] += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (blob, expires)
+            self._bytes += len(blob)
+            self._counters["stores"] += 1
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        """Lock held"""
+        blob, _ = self._entries.pop(key)
+        self._bytes -= len(blob)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["hits"] + stats["misses"]
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            return stats
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    settings = cfg().response_cache
+                    _cache = ResponseCache(settings.max_bytes, settings.enabled)
+                except AttributeError:
+                    _cache = ResponseCache()
+    return _cache
+
+
+def reset_response_cache() -> None:
+    """Drop the process-wide cache; runs on every configuration reset"""
+    global _cache
+    with _cache_lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.clear()
+        logger.info("Response cache invalidated")
+
+
+on_config_reset(reset_response_cache)
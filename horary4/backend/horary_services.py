@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Service Registry
+Process-wide shared services injected into the engine classes
+
+The geocoder client, timezone finder and grid, ephemeris backend and
+perfection solver are expensive to construct or hold caches
+that should outlive a single request. The registry creates each of them
+lazily, once per process, and every engine built without an explicit
+registry shares the default one.
+
+Call preload() in the parent process before worker processes fork (for
+example gunicorn --preload, or services.preload in horary_constants.yaml)
+so the read-only data is loaded once and shared copy-on-write:
+    from horary_services import get_services
+    get_services().preload()
+
+Created for horary_engine.py performance work
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from horary_config import cfg, config_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_USER_AGENT = "horary_astrology_precise"
+
+
+class ServiceRegistry:
+    """Lazily created shared services; safe to use from several threads"""
+
+    def __init__(self):
+        self._services: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory) -> Any:
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = factory()
+                    self._services[name] = service
+        return service
+
+    @property
+    def geocoder(self):
+        """Nominatim client, reused across requests (geopy's requests adapter pools its connections)"""
+        def create():
+            from geopy.geocoders import Nominatim
+            try:
+                user_agent = cfg().geocoding.user_agent
+            except AttributeError:
+                user_agent = DEFAULT_USER_AGENT
+            return Nominatim(user_agent=user_agent)
+        return self._get("geocoder", create)
+
+    @property
+    def timezone_finder(self):
+        from horary_timezones import get_timezone_finder
+        return self._get("timezone_finder", get_timezone_finder)
+
+    @property
+    def timezone_grid(self):
+        from horary_timezones import get_timezone_grid
+        return self._get("timezone_grid", get_timezone_grid)
+
+    @property
+    def timezone_manager(self):
+        """One TimezoneManager for all engines and endpoints"""
+        def create():
+            from horary_engine import TimezoneManager
+            return TimezoneManager(self)
+        return self._get("timezone_manager", create)
+
+    @property
+    def ephemeris(self):
+        def create():
+            import swisseph as swe
+            from horary_ephemeris import get_ephemeris_backend
+            swe.set_ephe_path('')
+            return get_ephemeris_backend()
+        return self._get("ephemeris", create)
+
+    @property
+    def perfection_solver(self):
+        """Exact perfection times, cached across charts and engines"""
+        def create():
+            from horary_perfection import PerfectionSolver
+            return PerfectionSolver(self.ephemeris)
+        return self._get("perfection_solver", create)
+
+    def preload(self) -> Dict[str, float]:
+        """
+        Load every service and the on-disk indexes now rather than on the
+        first request. Returns seconds spent per item.
+        """
+        from horary_events import get_station_calendar, get_ingress_index, get_lunar_aspect_index
+        from horary_gazetteer import get_gazetteer
+        from horary_geocache import get_geocode_cache
+
+        steps = {
+            "config": config_snapshot,
+            "ephemeris": lambda: self.ephemeris,
+            "perfection_solver": lambda: self.perfection_solver,
+            "timezone_finder": lambda: self.timezone_finder,
+            "timezone_grid": lambda: self.timezone_grid,
+            "timezone_manager": lambda: self.timezone_manager,
+            "geocoder": lambda: self.geocoder,
+            "gazetteer": get_gazetteer,
+            "geocode_cache": get_geocode_cache,
+            "station_calendar": get_station_calendar,
+            "ingress_index": get_ingress_index,
+            "lunar_aspect_index": get_lunar_aspect_index
+        }
+
+        timings = {}
+        for name, load in steps.items():
+            started = time.perf_counter()
+            try:
+                load()
+            except Exception as e:
+                logger.warning(f"Preloading {name} failed: {e}")
+            timings[name] = round(time.perf_counter() - started, 4)
+        logger.info(f"Services preloaded in {sum(timings.values()):.2f}s")
+        return timings
+
+    def loaded(self) -> Dict[str, bool]:
+        return {name: name in self._services for name in (
+            "geocoder", "timezone_finder", "timezone_grid",
+            "timezone_manager", "ephemeris", "perfection_solver")}
+
+
+_services: Optional[ServiceRegistry] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> ServiceRegistry:
+    """Get the process-wide default service registry"""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = ServiceRegistry()
+    return _services
+
+
+def reset_services() -> None:
+    """Drop the default registry (after a configuration reload or in tests)"""
+    global _services
+    with _services_lock:
+        _services = None
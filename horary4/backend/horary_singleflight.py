@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Request Coalescing
+Single-flight execution of identical concurrent computations
+
+When several threads ask for the same key at once (a retrying client, a
+UI firing the same request twice), the first becomes the leader and runs
+the computation; the others wait for it and receive a copy of its result,
+or its exception. A finished result is kept for result_ttl_seconds so
+retries arriving just after completion are answered too. Followers never
+wait longer than wait_timeout_seconds; after that they compute on their
+own.
+
+Usage:
+    flight = get_singleflight("judge")
+    result = flight.do(request_key(question, settings), lambda: engine.judge(question, settings))
+
+Configure it in horary_constants.yaml:
+    singleflight:
+      enabled: true
+      wait_timeout_seconds: 30
+      result_ttl_seconds: 2
+
+Created for horary_engine.py performance work
+"""
+
+import copy
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from horary_config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WAIT_TIMEOUT = 30.0
+DEFAULT_RESULT_TTL = 2.0
+
+# Finished calls are swept once the table grows past this
+SWEEP_THRESHOLD = 1024
+
+
+class _Call:
+    """One computation and the threads waiting on it"""
+
+    __slots__ = ("event", "result", "error", "finished_at")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys into one computation"""
+
+    def __init__(self, name: str, wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+                 result_ttl: float = DEFAULT_RESULT_TTL, enabled: bool = True):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0, "replayed": 0, "wait_timeouts": 0, "errors": 0}
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _expired(self, call: _Call, now: float, ttl: float) -> bool:
+        return call.finished_at is not None and (call.error is not None or now - call.finished_at >= ttl)
+
+    def do(self, key: Hashable, compute: Callable[[], Any], result_ttl: Optional[float] = None) -> Any:
+        """
+        Run compute() once for all concurrent callers with this key.
+
+        Args:
+            key: Hashable request key (see request_key())
+            compute: The computation; its result should be deep-copyable
+            result_ttl: Override of how long a finished result is reused
+                (0 for answers that must not be replayed, e.g. "now" charts)
+
+        Returns:
+            The computation's result; every caller gets its own copy
+        """
+        if not self.enabled:
+            return compute()
+
+        ttl = self.result_ttl if result_ttl is None else result_ttl
+        now = time.monotonic()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and self._expired(call, now, ttl):
+                call = None
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters["leaders"] += 1
+                if len(self._calls) > SWEEP_THRESHOLD:
+                    self._sweep(now, ttl)
+
+        if leader:
+            return self._lead(key, call, compute, ttl)
+
+        if not call.event.wait(self.wait_timeout):
+            self._count("wait_timeouts")
+            logger.warning(f"{self.name}: gave up waiting for an identical request after {self.wait_timeout}s")
+            return compute()
+
+        self._count("coalesced" if now < call.finished_at else "replayed")
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def _lead(self, key: Hashable, call: _Call, compute: Callable[[], Any], ttl: float) -> Any:
+        try:
+            result = compute()
+        except BaseException as e:
+            call.error = e
+            self._count("errors")
+            raise
+        else:
+            # Followers read the stored result; the leader's caller gets its own copy to mutate
+            call.result = result
+            return copy.deepcopy(result)
+        finally:
+            call.finished_at = time.monotonic()
+            call.event.set()
+            if call.error is not None or ttl <= 0:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+
+    def _sweep(self, now: float, ttl: float) -> None:
+        """Drop finished calls past their reuse window (lock held)"""
+        for key in [key for key, call in self._calls.items() if self._expired(call, now, ttl)]:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = sum(1 for call in self._calls.values() if call.finished_at is None)
+            return stats
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for JSON-like request parameters (dict order does not matter)"""
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """Get the process-wide single-flight group for a computation name"""
+    flight = _flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = _flights.get(name)
+            if flight is None:
+                try:
+                    settings = cfg().singleflight
+                    flight = SingleFlight(name, settings.wait_timeout_seconds,
+                                          settings.result_ttl_seconds, settings.enabled)
+                except AttributeError:
+                    flight = SingleFlight(name)
+                _flights[name] = flight
+    return flight
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every single-flight group, for /api/metrics"""
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
+
+
+def reset_singleflight() -> None:
+    """Drop all groups (after a configuration reload or in tests)"""
+    with _flights_lock:
+        _flights.clear()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Timezone Resolution
+Grid-quantized timezone lookup over one process-wide TimezoneFinder
+
+Coordinates are quantized into cells (cell_degrees on a side). The first
+lookup in a cell classifies it: when every corner lies in a region that
+the finder's own index marks as single-zone (unique_timezone_at), the
+whole cell is that zone and later lookups in it are a dictionary hit.
+Otherwise the cell straddles a border (or a coastline) and each point in it
+is resolved by the finder's polygon lookup.
+
+The TimezoneFinder is created once per process in in-memory mode, so it
+can be loaded before worker processes fork and shared copy-on-write.
+
+Usage:
+    grid = get_timezone_grid()
+    grid.timezone_at(51.5074, -0.1278)              # "Europe/London"
+    grid.timezones_at(latitudes, longitudes)        # one name per point
+
+Configure it in horary_constants.yaml:
+    timezones:
+      cell_degrees: 0.1
+      max_cells: 200000
+
+Created for horary_engine.py performance work
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from horary_config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CELL_DEGREES = 0.1
+DEFAULT_MAX_CELLS = 200000
+
+# Cell classification marker for cells that need per-point lookups
+BORDER = object()
+
+
+_finder = None
+_finder_lock = threading.Lock()
+
+
+def get_timezone_finder():
+    """Get the process-wide TimezoneFinder, loaded in in-memory mode"""
+    global _finder
+    if _finder is None:
+        with _finder_lock:
+            if _finder is None:
+                from timezonefinder import TimezoneFinder
+                try:
+                    _finder = TimezoneFinder(in_memory=True)
+                except TypeError:
+                    _finder = TimezoneFinder()
+    return _finder
+
+
+class TimezoneGrid:
+    """Timezone names by quantized coordinate cell, with per-point lookups near borders"""
+
+    def __init__(self, finder=None, cell_degrees: float = DEFAULT_CELL_DEGREES,
+                 max_cells: int = DEFAULT_MAX_CELLS):
+        self.finder = finder or get_timezone_finder()
+        self.cell_degrees = cell_degrees
+        self.max_cells = max_cells
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+        self.cell_hits = 0
+        self.border_lookups = 0
+        self.cells_classified = 0
+
+    def _cell(self, lat: float, lon: float):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _polygon_lookup(self, lat: float, lon: float) -> Optional[str]:
+        try:
+            return self.finder.timezone_at(lat=lat, lng=lon)
+        except Exception as e:
+            logger.error(f"Error getting timezone for {lat}, {lon}: {e}")
+            return None
+
+    def _classify(self, cell) -> object:
+        """Zone name for an interior cell, BORDER otherwise"""
+        row, column = cell
+        south, west = row * self.cell_degrees, column * self.cell_degrees
+        north = min(south + self.cell_degrees, 90.0)
+        east = west + self.cell_degrees
+        if east > 180.0:
+            east -= 360.0
+
+        zones = set()
+        for lat, lon in ((south, west), (south, east), (north, west), (north, east)):
+            try:
+                zones.add(self.finder.unique_timezone_at(lat=lat, lng=lon))
+            except Exception:
+                return BORDER
+            if None in zones or len(zones) > 1:
+                return BORDER
+        return zones.pop()
+
+    def _cell_zone(self, cell) -> object:
+        with self._lock:
+            zone = self._cells.get(cell)
+            if zone is not None:
+                self._cells.move_to_end(cell)
+                return zone
+
+        zone = self._classify(cell)
+        with self._lock:
+            self.cells_classified += 1
+            self._cells[cell] = zone
+            if len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+        return zone
+
+    def timezone_at(self, lat: float, lon: float) -> Optional[str]:
+        """Timezone name at a point, or None where the finder has none"""
+        zone = self._cell_zone(self._cell(lat, lon))
+        if zone is BORDER:
+            self.border_lookups += 1
+            return self._polygon_lookup(lat, lon)
+        self.cell_hits += 1
+        return zone
+
+    def timezones_at(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> List[Optional[str]]:
+        """
+        Timezone names for many points: each distinct cell is classified
+        once, and only points in border cells get a polygon lookup.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        rows = np.floor(latitudes / self.cell_degrees).astype(np.int64)
+        columns = np.floor(longitudes / self.cell_degrees).astype(np.int64)
+
+        zones: Dict[tuple, object] = {}
+        results = []
+        for lat, lon, row, column in zip(latitudes.tolist(), longitudes.tolist(),
+                                         rows.tolist(), columns.tolist()):
+            cell = (row, column)
+            zone = zones.get(cell)
+            if zone is None:
+                zone = zones[cell] = self._cell_zone(cell)
+            if zone is BORDER:
+                self.border_lookups += 1
+                results.append(self._polygon_lookup(lat, lon))
+            else:
+                self.cell_hits += 1
+                results.append(zone)
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            border_cells = sum(1 for zone in self._cells.values() if zone is BORDER)
+            return {
+                "cells": len(self._cells),
+                "border_cells": border_cells,
+                "cells_classified": self.cells_classified,
+                "cell_hits": self.cell_hits,
+                "border_lookups": self.border_lookups
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cells.clear()
+            self.cell_hits = self.border_lookups = self.cells_classified = 0
+
+
+_grid: Optional[TimezoneGrid] = None
+_grid_lock = threading.Lock()
+
+
+def get_timezone_grid() -> TimezoneGrid:
+    """Get the process-wide timezone grid"""
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None:
+                try:
+                    cell_degrees = cfg().timezones.cell_degrees
+                    max_cells = cfg().timezones.max_cells
+                except AttributeError:
+                    cell_degrees, max_cells = DEFAULT_CELL_DEGREES, DEFAULT_MAX_CELLS
+                _grid = TimezoneGrid(None, cell_degrees, max_cells)
+    return _grid
+
+
+def reset_timezone_grid() -> None:
+    """Drop the process-wide grid (after a configuration reload or in tests)"""
+    global _grid
+    _grid = None
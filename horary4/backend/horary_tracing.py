@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Horary Span Tracing
+Named timing spans through judgment and chart calculation
+
+span("chart") times the enclosed block. Every span is aggregated into the
+engine stage histograms of horary_metrics (p50/p95/p99 per stage in
+/api/metrics and /api/metrics/prometheus). Inside start_trace() the spans
+of that one request are also collected, in order and with their nesting
+depth, for its calculation_metadata.
+
+With tracing.enabled off, span() returns a shared no-op context manager
+unless a request trace is active, so the instrumentation costs a flag and
+a context variable lookup per span.
+
+The trace follows the request's context: it covers spans run in the
+calling thread (or task), not work handed to other threads or processes.
+Coalesced requests only see their own spans; the leader's computation is
+traced once.
+
+Usage:
+    with span("chart.houses"):
+        houses = ...
+
+    with start_trace() as trace:
+        result = engine.judge(question, settings)
+    metadata['trace'] = trace.summary()
+
+    @traced("judgment")
+    def judge(...): ...
+
+Request a trace with "trace": true in a /api/calculate-chart body or with
+?trace=1.
+
+Configure it in horary_constants.yaml:
+    tracing:
+      enabled: true
+
+Created for horary_engine.py performance work
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from horary_config import cfg, on_config_reset
+from horary_metrics import record_stage
+
+
+# Spans kept per request trace; further spans are only counted in the stages
+MAX_TRACE_SPANS = 500
+
+
+class Trace:
+    """Spans of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.depth = 0
+        self.dropped = 0
+
+    def add(self, name: str, started: float, seconds: float, depth: int) -> None:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'count': 0, 'total_ms': 0.0}
+        stage['count'] += 1
+        stage['total_ms'] += seconds * 1000
+        if len(self.spans) < MAX_TRACE_SPANS:
+            self.spans.append({
+                'name': name,
+                'start_ms': round((started - self.started) * 1000, 3),
+                'duration_ms': round(seconds * 1000, 3),
+                'depth': depth
+            })
+        else:
+            self.dropped += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON form for calculation_metadata['trace']"""
+        summary = {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'stages': {name: {'count': stage['count'], 'total_ms': round(stage['total_ms'], 3)}
+                       for name, stage in self.stages.items()},
+            'spans': sorted(self.spans, key=lambda entry: entry['start_ms'])
+        }
+        if self.dropped:
+            summary['spans_dropped'] = self.dropped
+        return summary
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('horary_trace', default=None)
+_enabled: Optional[bool] = None
+
+
+def tracing_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        try:
+            _enabled = bool(cfg().tracing.enabled)
+        except AttributeError:
+            _enabled = True
+    return _enabled
+
+
+def _reset_enabled() -> None:
+    global _enabled
+    _enabled = None
+
+
+on_config_reset(_reset_enabled)
+
+
+class _Span:
+    __slots__ = ('name', 'trace', 'started', 'depth', 'record')
+
+    def __init__(self, name: str, trace: Optional[Trace], record: bool):
+        self.name = name
+        self.trace = trace
+        self.record = record
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        if self.trace is not None:
+            self.depth = self.trace.depth
+            self.trace.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        if self.record:
+            record_stage(self.name, seconds)
+        if self.trace is not None:
+            self.trace.depth -= 1
+            self.trace.add(self.name, self.started, seconds, self.depth)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """Context manager timing a named stage (also when the block raises)"""
+    trace = _current_trace.get()
+    enabled = _enabled if _enabled is not None else tracing_enabled()
+    if not enabled and trace is None:
+        return _NULL_SPAN
+    return _Span(name, trace, enabled)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running the function in a span (named after the function by default)"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def start_trace() -> Iterator[Trace]:
+    """Collect the spans of the enclosed block (one request) into a Trace"""
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def wants_trace(data: Optional[Dict[str, Any]] = None, query_value: Optional[str] = None) -> bool:
+    """Whether a request asked for a trace ("trace": true in the body or ?trace=1)"""
+    if isinstance(data, dict) and data.get('trace') in (True, 1, '1', 'true'):
+        return True
+    return (query_value or '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Shared test setup: import the backend modules from the directory above"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HORARY_DISABLE_AUTO_LOGGING', 'true')
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Engines follow configuration resets instead of keeping the settings they were built with"""
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from horary_config import HoraryConfig, config_hash, config_snapshot
+from horary_engine import HoraryEngine, Planet, Sign
+from horary_response_cache import response_key
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "horary_constants.yaml"
+
+
+@pytest.fixture
+def reconfigure(tmp_path, monkeypatch):
+    """Load a copy of the default configuration with the given changes applied"""
+    def apply(changes):
+        config = yaml.safe_load(DEFAULT_CONFIG.read_text(encoding="utf-8"))
+        for section, values in changes.items():
+            config[section].update(values)
+        path = tmp_path / "horary_constants.yaml"
+        path.write_text(yaml.safe_dump(config), encoding="utf-8")
+        monkeypatch.setenv("HORARY_CONFIG", str(path))
+        HoraryConfig.reset()
+
+    yield apply
+    monkeypatch.delenv("HORARY_CONFIG", raising=False)
+    HoraryConfig.reset()
+
+
+def test_engine_takes_the_new_snapshot_on_reset(reconfigure):
+    engine = HoraryEngine()
+    calculator = engine.engine.calculator
+    assert calculator.settings is config_snapshot()
+
+    reconfigure({"orbs": {"conjunction": 3.0, "moon_orb_bonus": 2.5}, "dignity": {"rulership": 7}})
+
+    settings = config_snapshot()
+    assert settings.orbs.by_aspect["conjunction"] == 3.0
+    assert calculator.settings is settings
+    assert engine.engine.settings is settings
+    assert calculator.settings.orbs.moon_orb_bonus == 2.5
+    assert calculator.dignity_table[calculator._planet_index[Planet.MARS],
+                                    calculator._sign_index[Sign.ARIES], 0] == 7
+    assert calculator._calculate_enhanced_dignity(Planet.MARS, Sign.ARIES, 0) == 7
+
+
+def test_engine_returns_to_the_default_configuration(reconfigure):
+    engine = HoraryEngine()
+    calculator = engine.engine.calculator
+    reconfigure({"dignity": {"rulership": 7}})
+    assert calculator._calculate_enhanced_dignity(Planet.MARS, Sign.ARIES, 0) == 7
+
+    reconfigure({})
+    assert calculator.settings is config_snapshot()
+    assert calculator._calculate_enhanced_dignity(Planet.MARS, Sign.ARIES, 0) == 5
+
+
+def test_response_key_follows_the_engine_snapshot(reconfigure):
+    engine = HoraryEngine()
+    settings = {"location": "London, England", "use_current_time": False,
+                "date": "2024-03-01", "time": "12:00", "timezone": "Europe/London"}
+    before = engine.engine.settings
+    old_key, _ = response_key("Will I get the job?", settings, config=before)
+
+    reconfigure({"orbs": {"conjunction": 3.0}})
+
+    assert engine.engine.settings.content_hash == config_hash() != before.content_hash
+    new_key, _ = response_key("Will I get the job?", settings, config=engine.engine.settings)
+    assert new_key == response_key("Will I get the job?", settings)[0]
+    assert new_key != old_key
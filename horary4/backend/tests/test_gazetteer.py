@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Gazetteer lookups against a small GeoNames-style dump"""
+
+import pytest
+
+from horary_gazetteer import Gazetteer, build_gazetteer
+
+
+# geonameid, name, asciiname, alternatenames, lat, lon, class, code, country, cc2, admin1, ..., population
+CITIES = [
+    ("4781708", "Richmond", "Richmond", "", "37.55376", "-77.46026", "US", "VA", "226610"),
+    ("2639389", "Richmond", "Richmond", "", "51.46171", "-0.30323", "GB", "ENG", "21469"),
+    ("2988507", "Paris", "Paris", "", "48.85341", "2.3488", "FR", "11", "2138551"),
+    ("4717560", "Paris", "Paris", "", "33.66094", "-95.55551", "US", "TX", "24782"),
+]
+
+COUNTRIES = [("US", "USA", "840", "US", "United States"),
+             ("GB", "GBR", "826", "UK", "United Kingdom"),
+             ("FR", "FRA", "250", "FR", "France")]
+
+ADMIN1 = [("US.VA", "Virginia"), ("US.TX", "Texas"), ("GB.ENG", "England"), ("FR.11", "Ile-de-France")]
+
+
+@pytest.fixture(scope="module")
+def gazetteer(tmp_path_factory) -> Gazetteer:
+    directory = tmp_path_factory.mktemp("geonames")
+    cities = directory / "cities.txt"
+    cities.write_text("".join(
+        "\t".join([geonameid, name, ascii_name, alternates, lat, lon, "P", "PPL", country, "", admin1,
+                   "", "", "", population, "", "0", "UTC", "2024-01-01"]) + "\n"
+        for geonameid, name, ascii_name, alternates, lat, lon, country, admin1, population in CITIES),
+        encoding="utf-8")
+    countries = directory / "countryInfo.txt"
+    countries.write_text("".join("\t".join(row) + "\n" for row in COUNTRIES), encoding="utf-8")
+    admin1 = directory / "admin1CodesASCII.txt"
+    admin1.write_text("".join(f"{key}\t{name}\t{name}\t0\n" for key, name in ADMIN1), encoding="utf-8")
+    return build_gazetteer(cities, countries, admin1)
+
+
+@pytest.mark.parametrize("query, country", [
+    ("Paris", "FR"),
+    ("Paris, France", "FR"),
+    ("Paris, TX", "US"),
+    ("Paris, Texas, USA", "US"),
+    ("Paris TX", "US"),
+    ("Richmond", "US"),
+    ("Richmond, UK", "GB"),
+    ("Richmond, England", "GB"),
+])
+def test_known_qualifiers_pick_the_place(gazetteer, query, country):
+    assert gazetteer.lookup(query).country_code == country
+
+
+@pytest.mark.parametrize("query", [
+    "Richmond, Surrey",
+    "Richmond, Greater London",
+    "Richmond upon Thames",
+    "Paris, Lamar County",
+    "Paris, 75460",
+    "Paris, Texas, Lamar County",
+])
+def test_unknown_qualifiers_are_left_to_the_web_geocoder(gazetteer, query):
+    assert gazetteer.lookup(query) is None
+
+
+def test_known_qualifier_without_a_matching_place(gazetteer):
+    assert gazetteer.lookup("Paris, England") is None